@@ -5,11 +5,14 @@ Format: ODS (OpenDocument Spreadsheet) - requires special handling
 Complex: Manual download required, multiple monthly reports
 """
 
-import pandas as pd
 import logging
-from io import StringIO
+import timing
 from pathlib import Path
-from utils import get_connection, clean_text, safe_int, log_progress, try_decode_csv
+from column_resolver import resolve_mapping
+from db_schema import writing
+from orchestrator import check_cancelled
+from table_sync import TableSync
+from utils import clean_text, safe_int, log_progress, read_workbooks
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,75 +21,148 @@ logger = logging.getLogger(__name__)
 # The website provides monthly reports that need to be downloaded individually
 # URL pattern: https://e-household.hccg.gov.tw/downloadfile/[YEAR][MONTH]-新竹市東區-區域年齡層月報表.ods
 
+# Source column(s) -> (DB column, converter); header names vary between reports
+COLUMN_MAPPING = {
+    ('行政區', '區別'): ('district', clean_text),
+    ('里別', '里名'): ('neighborhood', clean_text),
+    ('年齡層', '年齡組別'): ('age_group', clean_text),
+    ('男性人數', '男'): ('male_count', safe_int),
+    ('女性人數', '女'): ('female_count', safe_int),
+    ('總人數', '合計'): ('total_count', safe_int),
+}
 
-def parse_ods_file(ods_path: str):
-    """Parse ODS file and insert data into database"""
-    logger.info(f"Parsing ODS file: {ods_path}")
+POPULATION_COLUMNS = [
+    'district', 'neighborhood', 'age_group', 'male_count', 'female_count',
+    'total_count', 'report_year_month'
+]
 
-    try:
-        # Read ODS file using pandas (requires odfpy library)
-        df = pd.read_excel(ods_path, engine='odf')
 
-        logger.info(f"Loaded {len(df)} rows from ODS file")
+def load_report(conn, ods_path, sheets):
+    """
+    Load one parsed ODS report into the database
 
-        # Connect to database
-        conn = get_connection()
-        cursor = conn.cursor()
+    Rows of every sheet with a neighborhood column are loaded; the report
+    replaces its month's rows. Commits once the whole report is in.
 
-        records_processed = 0
-        records_inserted = 0
-        errors = 0
+    Args:
+        conn: Bulk-load connection holding the write lock (db_schema.writing())
+        ods_path: Path of the report, whose file name carries the month
+        sheets: (sheet name, Chunk) list from utils.read_workbook()
 
-        # Extract year-month from filename
-        filename = Path(ods_path).name
-        report_year_month = filename.split('-')[0] if '-' in filename else None
-
-        for idx, row in df.iterrows():
-            try:
-                # Parse columns (adjust based on actual ODS structure)
-                # Expected structure: District, Neighborhood, Age Group, Male Count, Female Count, Total Count
-
-                district = clean_text(row.get('行政區') or row.get('區別'))
-                neighborhood = clean_text(row.get('里別') or row.get('里名'))
-                age_group = clean_text(row.get('年齡層') or row.get('年齡組別'))
-                male_count = safe_int(row.get('男性人數') or row.get('男'))
-                female_count = safe_int(row.get('女性人數') or row.get('女'))
-                total_count = safe_int(row.get('總人數') or row.get('合計'))
-
-                # Skip header rows or empty rows
-                if not neighborhood or neighborhood in ['里別', '里名', '合計']:
-                    continue
-
-                # Insert into database
-                cursor.execute("""
-                    INSERT INTO population_age_by_neighborhood (
+    Returns:
+        Tuple of (processed, written, errors)
+    """
+    records_processed = 0
+    errors = 0
+
+    # Extract year-month from filename
+    filename = Path(ods_path).name
+    report_year_month = filename.split('-')[0] if '-' in filename else None
+
+    # Each report owns its month: upsert by natural key within that month only
+    sync = TableSync(conn, 'population_age_by_neighborhood', POPULATION_COLUMNS,
+                     scope={'report_year_month': report_year_month})
+    rows = []
+    row_ids = []
+
+    for sheet_name, chunk in sheets:
+        # Resolve columns once per sheet; headers may differ between sheets
+        with timing.stage('map'):
+            plan = resolve_mapping(chunk.columns, COLUMN_MAPPING, exact=True)
+        if 'neighborhood' not in plan.matched:
+            logger.info(f"{filename} [{sheet_name}]: no neighborhood column, skipped")
+            continue
+        plan.log(f"{filename} [{sheet_name}]")
+
+        with timing.stage('convert', rows=len(chunk)):
+            for idx, values in zip(chunk.index, chunk.rows):
+                try:
+                    data = plan.convert_row(values)
+                    district = data['district']
+                    neighborhood = data['neighborhood']
+                    age_group = data['age_group']
+                    male_count = data['male_count']
+                    female_count = data['female_count']
+                    total_count = data['total_count']
+
+                    # Skip header rows or empty rows
+                    if not neighborhood or neighborhood in ['里別', '里名', '合計']:
+                        continue
+
+                    rows.append((
                         district, neighborhood, age_group, male_count, female_count,
                         total_count, report_year_month
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    district, neighborhood, age_group, male_count, female_count,
-                    total_count, report_year_month
-                ))
+                    ))
+                    row_ids.append(f"{sheet_name}:{idx}")
 
-                records_inserted += 1
+                except Exception as e:
+                    logger.error(f"Error processing row {sheet_name}:{idx}: {e}")
+                    errors += 1
 
-            except Exception as e:
-                logger.error(f"Error processing row {idx}: {e}")
-                errors += 1
+                records_processed += 1
 
-            records_processed += 1
+    with timing.stage('insert', rows=len(rows)):
+        records_written, failed = sync.apply(rows, row_ids)
+        errors += failed
+        stats = sync.finish(delete_missing=errors == 0)
 
+    with timing.stage('commit'):
+        check_cancelled()
         conn.commit()
-        conn.close()
 
-        log_progress(__name__, records_processed, records_inserted, errors)
+    logger.info(f"{filename}: {stats}")
+    return records_processed, records_written, errors
 
-    except Exception as e:
-        logger.error(f"Error parsing ODS file: {e}")
-        raise
 
+@timing.timed_run('population')
+def load_reports(ods_files, workers: int = None):
+    """
+    Parse ODS reports in a process pool and load them one by one as they are parsed
 
-def scrape_population_manual(ods_directory: str = None):
+    A report that fails to parse or load is logged and skipped; the others
+    are still loaded.
+
+    Args:
+        ods_files: Report paths
+        workers: Parser processes (default: one per CPU)
+
+    Returns:
+        Number of reports that failed
+    """
+    processed = written = errors = failed = 0
+    for ods_path, sheets, error in read_workbooks(ods_files, workers):
+        check_cancelled()
+        filename = Path(ods_path).name
+        if error:
+            logger.error(f"Failed to parse {filename}: {error}")
+            failed += 1
+            continue
+        logger.info(f"Loaded {sum(len(chunk) for _, chunk in sheets)} rows "
+                    f"from {len(sheets)} sheets of {filename}")
+        # The write lock is held per report, so other loads get in between reports
+        try:
+            with writing() as conn:
+                counts = load_report(conn, ods_path, sheets)
+        except Exception as e:
+            logger.error(f"Failed to process {filename}: {e}")
+            failed += 1
+            continue
+        processed += counts[0]
+        written += counts[1]
+        errors += counts[2]
+
+    log_progress(__name__, processed, written, errors)
+    return failed
+
+
+def parse_ods_file(ods_path: str):
+    """Parse ODS file and insert data into database"""
+    logger.info(f"Parsing ODS file: {ods_path}")
+    if load_reports([ods_path], workers=1):
+        raise ValueError(f"Could not load {ods_path}")
+
+
+def scrape_population_manual(ods_directory: str = None, workers: int = None):
     """
     Process all ODS files in a directory
 
@@ -96,6 +172,7 @@ def scrape_population_manual(ods_directory: str = None):
 
     Args:
         ods_directory: Path to directory containing downloaded ODS files
+        workers: Parser processes (default: one per CPU)
     """
     if not ods_directory:
         logger.warning("""
@@ -118,7 +195,7 @@ def scrape_population_manual(ods_directory: str = None):
         return
 
     # Find all ODS files
-    ods_files = list(ods_dir.glob('*.ods'))
+    ods_files = sorted(ods_dir.glob('*.ods'))
 
     if not ods_files:
         logger.warning(f"No ODS files found in {ods_directory}")
@@ -126,23 +203,23 @@ def scrape_population_manual(ods_directory: str = None):
 
     logger.info(f"Found {len(ods_files)} ODS files to process")
 
-    # Process each file
-    for ods_file in ods_files:
-        logger.info(f"Processing: {ods_file.name}")
-        try:
-            parse_ods_file(str(ods_file))
-        except Exception as e:
-            logger.error(f"Failed to process {ods_file.name}: {e}")
-
-    logger.info("✅ All ODS files processed")
+    failed = load_reports(ods_files, workers)
+    if failed:
+        logger.warning(f"⚠️  {failed} of {len(ods_files)} ODS files could not be loaded")
+    else:
+        logger.info("✅ All ODS files processed")
 
 
 if __name__ == "__main__":
-    import sys
-
-    if len(sys.argv) > 1:
-        # Directory path provided
-        scrape_population_manual(sys.argv[1])
-    else:
-        # Show usage instructions
-        scrape_population_manual()
+    import argparse
+    import profiling
+
+    parser = argparse.ArgumentParser(description='Load population ODS reports from a directory')
+    parser.add_argument('ods_directory', nargs='?', help='Directory of downloaded ODS files')
+    parser.add_argument('--workers', type=int, help='Parser processes (default: one per CPU)')
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+
+    # Without a directory this shows the download instructions
+    with profiling.from_args(args, 'population'):
+        scrape_population_manual(args.ods_directory, args.workers)
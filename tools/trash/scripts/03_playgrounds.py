@@ -4,101 +4,147 @@ Source: https://opendata.hccg.gov.tw/OpenDataDetail.aspx?n=13&s=571
 Formats: CSV, JSON, XML, XLSX
 """
 
-import pandas as pd
 import logging
-from utils import get_connection, download_file, clean_text, log_progress, read_excel_file
+import timing
+from column_resolver import resolve_rules
+from datasets import source_url
+from db_schema import NATURAL_KEYS, writing
+from orchestrator import check_cancelled
+from profiling import run_entry_point
+from staging import LoadValidationError, StagingTable, table_is_empty
+from table_sync import TableSync, row_hash
+from utils import (
+    download_dataset, mark_dataset_loaded, clean_text, log_progress,
+    iter_excel_chunks, force_refresh
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Data URL (XLSX format)
-DATA_URL = "https://opendata.hccg.gov.tw/OpenDataFileHit.ashx?ID=50C98A734B0BEAB2&u=77DFE16E459DFCE30371C36CCE30AFF2620C9FA93F99248767110C1E4071F137C5FBEE507EBE009F2A6AFAF641DA977ACB55B9BDD072809E2C76D702854B23CDBD584A089A5E292D071B25CB692E4CA59FBF9D20F09051B5266EC5815DD090C419E56FED6734D895DCD4E3491303783240E1FA37697F82EA"
+# Header rules, checked in order for every source column (first match wins)
+COLUMN_RULES = [
+    ('serial_number', lambda c, l: '編號' in c, clean_text),
+    ('park_name', lambda c, l: '公園' in c or 'park' in l, clean_text),
+    ('district', lambda c, l: '行政區' in c or 'district' in l or '區' in c, clean_text),
+    ('area_code', lambda c, l: 'areacode' in l or '區域代碼' in c, clean_text),
+    ('facility_content', lambda c, l: '設施' in c or 'facility' in l or 'equipment' in l, clean_text),
+]
 
 
-def scrape_playgrounds():
-    """Scrape playgrounds data and insert into database"""
+@timing.timed_run('playgrounds')
+def scrape_playgrounds(url: str = None):
+    """Scrape playgrounds data and insert into database (from url, default: the registered download URL)"""
     logger.info("Starting playgrounds data scraping...")
 
-    # Download file
-    content = download_file(DATA_URL)
-    if not content:
+    # Download file (skipped when unchanged since the last successful load)
+    download = download_dataset('playgrounds', url or source_url('playgrounds'), table='playgrounds')
+    if not download:
         logger.error("Failed to download playgrounds data")
         return
+    if not download.changed:
+        logger.info("Playgrounds data unchanged since last load, skipping")
+        return
 
-    try:
-        # Parse XLSX (not CSV!)
-        df = read_excel_file(content)
-
-        logger.info(f"Downloaded {len(df)} playground records")
-        logger.info(f"Columns: {df.columns.tolist()}")
-
-        # Connect to database
-        conn = get_connection()
-        cursor = conn.cursor()
-
-        records_processed = 0
-        records_inserted = 0
-        playground_records = 0
-        facility_records = 0
-        errors = 0
-
-        for idx, row in df.iterrows():
-            try:
-                # Flexible column mapping
-                serial_number = None
-                park_name = None
-                district = None
-                area_code = None
-                facility_content = None
-
-                for col in df.columns:
-                    col_lower = str(col).lower()
-                    if '編號' in str(col):
-                        serial_number = clean_text(row[col])
-                    elif '公園' in str(col) or 'park' in col_lower:
-                        park_name = clean_text(row[col])
-                    elif '行政區' in str(col) or 'district' in col_lower or '區' in str(col):
-                        district = clean_text(row[col])
-                    elif 'areacode' in col_lower or '區域代碼' in str(col):
-                        area_code = clean_text(row[col])
-                    elif '設施' in str(col) or 'facility' in col_lower or 'equipment' in col_lower:
-                        facility_content = clean_text(row[col])
-
-                # Insert playground record
-                cursor.execute("""
-                    INSERT INTO playgrounds (serial_number, park_name, district, area_code)
-                    VALUES (?, ?, ?, ?)
-                """, (serial_number, park_name, district, area_code))
-
-                playground_id = cursor.lastrowid
-                playground_records += 1
-
-                # Insert facility content if available
-                if facility_content:
-                    cursor.execute("""
-                        INSERT INTO playground_facilities (playground_id, facility_content)
-                        VALUES (?, ?)
-                    """, (playground_id, facility_content))
-                    facility_records += 1
-
-                records_inserted += 1
-
-            except Exception as e:
-                logger.error(f"Error processing row {idx}: {e}")
-                errors += 1
-
-            records_processed += 1
-
-        conn.commit()
-        conn.close()
-
-        logger.info(f"Inserted {playground_records} playgrounds, {facility_records} facilities")
-        log_progress(__name__, records_processed, records_inserted, errors)
-
-    except Exception as e:
-        logger.error(f"Error parsing playgrounds data: {e}")
-        raise
+    # Bulk-load profile; both tables go in as one transaction, one writer at a time
+    with writing() as conn:
+        try:
+            cursor = conn.cursor()
+
+            # Full reloads fill staging copies of both tables, swapped in at the end
+            staged = {}
+            if force_refresh() or table_is_empty(conn, 'playgrounds'):
+                staged = {table: StagingTable(conn, table) for table in ('playgrounds', 'playground_facilities')}
+                for staging in staged.values():
+                    staging.create()
+            playgrounds = staged['playgrounds'].name if staged else 'playgrounds'
+            facilities = staged['playground_facilities'].name if staged else 'playground_facilities'
+
+            # Playgrounds are upserted by natural key; facilities follow their playground
+            sync = TableSync(conn, playgrounds, ['serial_number', 'park_name', 'district', 'area_code'],
+                             key_columns=NATURAL_KEYS['playgrounds'])
+
+            records_processed = 0
+            records_written = 0
+            facility_records = 0
+            errors = 0
+
+            # Parse and insert chunk by chunk so memory stays bounded
+            plan = None
+            total_rows = 0
+            for chunk in timing.timed_chunks(iter_excel_chunks(download.path, dataset=download.dataset)):
+                check_cancelled()
+                if plan is None:
+                    # Resolve columns once for the whole file
+                    with timing.stage('map'):
+                        plan = resolve_rules(chunk.columns, COLUMN_RULES)
+                    plan.log('playgrounds')
+                total_rows += len(chunk)
+
+                # Conversion is interleaved with the per-row upserts and counted as insert time
+                with timing.stage('insert', rows=len(chunk)):
+                    for idx, values in zip(chunk.index, chunk.rows):
+                        try:
+                            data = plan.convert_row(values)
+                            serial_number = data['serial_number']
+                            park_name = data['park_name']
+                            district = data['district']
+                            area_code = data['area_code']
+                            facility_content = data['facility_content']
+
+                            # Upsert playground record; the hash covers its facilities too
+                            row = (serial_number, park_name, district, area_code)
+                            status, playground_id = sync.upsert(row, row_hash((*row, facility_content)))
+                            if status != 'unchanged':
+                                if status == 'changed':
+                                    cursor.execute(f"DELETE FROM {facilities} WHERE playground_id = ?",
+                                                   (playground_id,))
+
+                                # Insert facility content if available
+                                if facility_content:
+                                    cursor.execute(f"""
+                                        INSERT INTO {facilities} (playground_id, facility_content)
+                                        VALUES (?, ?)
+                                    """, (playground_id, facility_content))
+                                    facility_records += 1
+
+                                records_written += 1
+
+                        except Exception as e:
+                            logger.error(f"Error processing row {idx}: {e}")
+                            errors += 1
+
+                        records_processed += 1
+
+            # Never replace or prune the tables from a file that yielded nothing
+            if not records_processed:
+                raise LoadValidationError("playgrounds: no usable rows in source file")
+
+            with timing.stage('insert'):
+                # Drop playgrounds gone from the source, and their facilities
+                stats = sync.finish(delete_missing=errors == 0)
+                cursor.execute(f"""
+                    DELETE FROM {facilities}
+                    WHERE playground_id NOT IN (SELECT id FROM {playgrounds})
+                """)
+
+                if staged:
+                    staged['playgrounds'].validate()
+                    for staging in staged.values():
+                        staging.swap()
+
+            with timing.stage('commit'):
+                mark_dataset_loaded(conn, download)
+                check_cancelled()
+                conn.commit()
+
+            logger.info(f"Parsed {total_rows} playground records")
+            logger.info(f"Playgrounds: {stats}; {facility_records} facilities written")
+            log_progress(__name__, records_processed, records_written, errors)
+
+        except Exception as e:
+            logger.error(f"Error parsing playgrounds data: {e}")
+            raise
 
 
 if __name__ == "__main__":
-    scrape_playgrounds()
+    run_entry_point(scrape_playgrounds, 'playgrounds')
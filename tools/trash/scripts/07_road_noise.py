@@ -5,130 +5,191 @@ Formats: XLSX, CSV, XML, JSON
 Complex: 24 hourly noise measurement columns
 """
 
-import pandas as pd
 import logging
-from utils import get_connection, download_file, clean_text, safe_int, safe_float, log_progress, read_excel_file
+import timing
+from column_resolver import resolve_mapping
+from datasets import source_url
+from db_schema import NATURAL_KEYS, ensure_road_noise_dates, fill_road_noise_dates, writing
+from orchestrator import check_cancelled
+from profiling import run_entry_point
+from staging import LoadValidationError, StagingTable, table_is_empty
+from table_sync import SyncStats, TableSync
+from utils import (
+    download_dataset, mark_dataset_loaded, clean_text, safe_int, safe_float,
+    log_progress, iter_excel_chunks
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Data URL (XLSX format)
-DATA_URL = "https://opendata.hccg.gov.tw/OpenDataFileHit.ashx?ID=E739987206DDFCFD&u=77DFE16E459DFCE30371C36CCE30AFF2620C9FA93F99248767110C1E4071F137C5FBEE507EBE009F2A6AFAF641DA977AE8AC30B810A9A58282DDD8971AE0EF8F3729E0F3B63E4744DE091B937320E401E73CCC9EB9D84DEA8C5921CE0AEC7D3C9F7F4702E6A118B1E1F59A575AC01FF8CB65C4CCCCCC09B7"
+# Source column -> (DB column, converter)
+COLUMN_MAPPING = {
+    '監測站名': ('station_name', clean_text),
+    '監測站編號': ('station_id', clean_text),
+    '道路寬度': ('road_width', safe_float),
+    '管制區類別': ('control_zone', clean_text),
+    '年': ('measurement_year', safe_int),
+    '月': ('measurement_month', safe_int),
+    '日': ('measurement_day', safe_int),
+}
 
+# 24 hourly columns: '0-1時' -> hour_00_01 ... '23-24時' -> hour_23_24
+HOUR_COLUMNS = [f"hour_{h:02d}_{h + 1:02d}" for h in range(24)]
+COLUMN_MAPPING.update({f"{h}-{h + 1}時": (HOUR_COLUMNS[h], safe_float) for h in range(24)})
 
-def scrape_road_noise():
-    """Scrape road noise monitoring data with 24 hourly columns and insert into database"""
+STATION_COLUMNS = ['station_id', 'station_name', 'road_width', 'control_zone']
+MEASUREMENT_COLUMNS = ['station_id', 'measurement_year', 'measurement_month', 'measurement_day', *HOUR_COLUMNS]
+
+# A load owns the station-months its file covers; the portal file is a rolling
+# window, so earlier months are history that must survive the next load
+MONTH_COLUMNS = ['station_id', 'measurement_year', 'measurement_month']
+
+
+@timing.timed_run('road_noise')
+def scrape_road_noise(url: str = None):
+    """Scrape road noise monitoring data with 24 hourly columns and insert into database (from url, default: the registered download URL)"""
     logger.info("Starting road noise monitoring data scraping...")
 
-    # Download file
-    content = download_file(DATA_URL)
-    if not content:
+    # Download file (skipped when unchanged since the last successful load)
+    download = download_dataset('road_noise', url or source_url('road_noise'), table='road_noise_measurements')
+    if not download:
         logger.error("Failed to download road noise data")
         return
+    if not download.changed:
+        logger.info("Road noise data unchanged since last load, skipping")
+        return
 
-    try:
-        # Parse CSV
-                # Parse XLSX (not CSV!)
-        df = read_excel_file(content)
-        logger.info(f"Columns: {df.columns.tolist()}")
-
-        logger.info(f"Columns: {df.columns.tolist()}")
-
-        logger.info(f"Downloaded {len(df)} road noise monitoring records")
-
-        # Connect to database
-        conn = get_connection()
-        cursor = conn.cursor()
-
-        # Track unique stations
-        stations_added = set()
-        records_processed = 0
-        measurement_records = 0
-        errors = 0
-
-        for idx, row in df.iterrows():
-            try:
-                # Station info
-                station_name = clean_text(row.get('監測站名'))
-                station_id = clean_text(row.get('監測站編號'))
-                road_width = safe_float(row.get('道路寬度'))
-                control_zone = clean_text(row.get('管制區類別'))
-
-                # Date info
-                measurement_year = safe_int(row.get('年'))
-                measurement_month = safe_int(row.get('月'))
-                measurement_day = safe_int(row.get('日'))
-
-                # Insert station if not already added
-                if station_id and station_id not in stations_added:
-                    cursor.execute("""
-                        INSERT OR IGNORE INTO road_noise_monitoring_stations (
-                            station_id, station_name, road_width, control_zone
-                        ) VALUES (?, ?, ?, ?)
-                    """, (station_id, station_name, road_width, control_zone))
-                    stations_added.add(station_id)
-
-                # Extract 24 hourly measurements
-                hour_00_01 = safe_float(row.get('0-1時'))
-                hour_01_02 = safe_float(row.get('1-2時'))
-                hour_02_03 = safe_float(row.get('2-3時'))
-                hour_03_04 = safe_float(row.get('3-4時'))
-                hour_04_05 = safe_float(row.get('4-5時'))
-                hour_05_06 = safe_float(row.get('5-6時'))
-                hour_06_07 = safe_float(row.get('6-7時'))
-                hour_07_08 = safe_float(row.get('7-8時'))
-                hour_08_09 = safe_float(row.get('8-9時'))
-                hour_09_10 = safe_float(row.get('9-10時'))
-                hour_10_11 = safe_float(row.get('10-11時'))
-                hour_11_12 = safe_float(row.get('11-12時'))
-                hour_12_13 = safe_float(row.get('12-13時'))
-                hour_13_14 = safe_float(row.get('13-14時'))
-                hour_14_15 = safe_float(row.get('14-15時'))
-                hour_15_16 = safe_float(row.get('15-16時'))
-                hour_16_17 = safe_float(row.get('16-17時'))
-                hour_17_18 = safe_float(row.get('17-18時'))
-                hour_18_19 = safe_float(row.get('18-19時'))
-                hour_19_20 = safe_float(row.get('19-20時'))
-                hour_20_21 = safe_float(row.get('20-21時'))
-                hour_21_22 = safe_float(row.get('21-22時'))
-                hour_22_23 = safe_float(row.get('22-23時'))
-                hour_23_24 = safe_float(row.get('23-24時'))
-
-                # Insert measurement record
-                cursor.execute("""
-                    INSERT INTO road_noise_measurements (
-                        station_id, measurement_year, measurement_month, measurement_day,
-                        hour_00_01, hour_01_02, hour_02_03, hour_03_04, hour_04_05, hour_05_06,
-                        hour_06_07, hour_07_08, hour_08_09, hour_09_10, hour_10_11, hour_11_12,
-                        hour_12_13, hour_13_14, hour_14_15, hour_15_16, hour_16_17, hour_17_18,
-                        hour_18_19, hour_19_20, hour_20_21, hour_21_22, hour_22_23, hour_23_24
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    station_id, measurement_year, measurement_month, measurement_day,
-                    hour_00_01, hour_01_02, hour_02_03, hour_03_04, hour_04_05, hour_05_06,
-                    hour_06_07, hour_07_08, hour_08_09, hour_09_10, hour_10_11, hour_11_12,
-                    hour_12_13, hour_13_14, hour_14_15, hour_15_16, hour_16_17, hour_17_18,
-                    hour_18_19, hour_19_20, hour_20_21, hour_21_22, hour_22_23, hour_23_24
-                ))
-
-                measurement_records += 1
-
-            except Exception as e:
-                logger.error(f"Error processing row {idx}: {e}")
-                errors += 1
-
-            records_processed += 1
-
-        conn.commit()
-        conn.close()
-
-        logger.info(f"Inserted {len(stations_added)} stations, {measurement_records} measurements")
-        log_progress(__name__, records_processed, measurement_records, errors)
-
-    except Exception as e:
-        logger.error(f"Error parsing road noise data: {e}")
-        raise
+    # Bulk-load profile; stations, measurements and indicators go in as one transaction, one writer at a time
+    with writing() as conn:
+        try:
+            ensure_road_noise_dates(conn)
+
+            # First loads fill staging copies of both tables, swapped in at the end. Forced
+            # reloads sync in place too: a swap would drop the months before the file's window
+            staged = {}
+            if table_is_empty(conn, 'road_noise_measurements'):
+                staged = {table: StagingTable(conn, table)
+                          for table in ('road_noise_monitoring_stations', 'road_noise_measurements')}
+                for staging in staged.values():
+                    staging.create()
+
+            station_table = 'road_noise_monitoring_stations'
+            measurement_table = 'road_noise_measurements'
+            if staged:
+                station_table = staged[station_table].name
+                measurement_table = staged[measurement_table].name
+
+            # Both tables are upserted by natural key; only new or changed rows are written.
+            # Measurements get one sync per station-month in the file, scoped to it the way
+            # each population report owns its month, so only those months are pruned
+            stations = TableSync(conn, station_table, STATION_COLUMNS,
+                                 key_columns=NATURAL_KEYS['road_noise_monitoring_stations'])
+            months_loaded = {}
+
+            def month_sync(month: tuple) -> TableSync:
+                if month not in months_loaded:
+                    months_loaded[month] = TableSync(conn, measurement_table, MEASUREMENT_COLUMNS,
+                                                     key_columns=NATURAL_KEYS['road_noise_measurements'],
+                                                     scope=dict(zip(MONTH_COLUMNS, month)))
+                return months_loaded[month]
+
+            # Track unique stations
+            stations_added = set()
+            records_processed = 0
+            measurement_records = 0
+            errors = 0
+
+            # Parse and insert chunk by chunk so memory stays bounded
+            plan = None
+            total_rows = 0
+            for chunk in timing.timed_chunks(iter_excel_chunks(download.path, dataset=download.dataset)):
+                check_cancelled()
+                if plan is None:
+                    # Resolve columns once for the whole file
+                    with timing.stage('map'):
+                        plan = resolve_mapping(chunk.columns, COLUMN_MAPPING, exact=True)
+                    plan.log('road_noise')
+                total_rows += len(chunk)
+
+                # Converted rows and their ids per station-month
+                batches = {}
+                with timing.stage('convert', rows=len(chunk)):
+                    for idx, values in zip(chunk.index, chunk.rows):
+                        try:
+                            data = plan.convert_row(values)
+                            station_id = data['station_id']
+
+                            # Sync each station once, from its first row
+                            if station_id and station_id not in stations_added:
+                                stations.upsert(tuple(data[col] for col in STATION_COLUMNS))
+                                stations_added.add(station_id)
+
+                            rows, row_ids = batches.setdefault(tuple(data[col] for col in MONTH_COLUMNS), ([], []))
+                            rows.append(tuple(data[col] for col in MEASUREMENT_COLUMNS))
+                            row_ids.append(idx)
+
+                        except Exception as e:
+                            logger.error(f"Error processing row {idx}: {e}")
+                            errors += 1
+
+                        records_processed += 1
+
+                # Measurement records for the whole chunk
+                with timing.stage('insert', rows=sum(len(rows) for rows, _ in batches.values())):
+                    for month, (rows, row_ids) in batches.items():
+                        written, failed = month_sync(month).apply(rows, row_ids)
+                        measurement_records += written
+                        errors += failed
+
+            # Never replace or prune the tables from a file that yielded nothing
+            if not records_processed:
+                raise LoadValidationError("road noise: no usable rows in source file")
+
+            with timing.stage('insert'):
+                # Measurements gone from the file's station-months. Stations are never pruned:
+                # one missing from the window still owns its earlier measurements
+                measurement_stats = SyncStats()
+                for sync in months_loaded.values():
+                    measurement_stats += sync.finish(delete_missing=errors == 0)
+                station_stats = stations.finish(delete_missing=False)
+
+                # Date key of the new rows, derived in SQL from year / month / day
+                fill_road_noise_dates(conn, measurement_table)
+
+                if staged:
+                    for staging in staged.values():
+                        staging.validate()
+                        staging.swap()
+
+                # Long-form readings and indicators follow the measurements in the
+                # same transaction; only the months in this file are rebuilt (deletes
+                # stay within them too) unless the tables were replaced
+                import noise_indicators  # NumPy is only needed once the file is parsed
+                noise_indicators.ensure_tables(conn)
+                if staged or table_is_empty(conn, 'road_noise_daily'):
+                    derived = noise_indicators.refresh(conn)
+                elif measurement_stats.written or measurement_stats.deleted:
+                    derived = noise_indicators.refresh(conn, months_loaded)
+                else:
+                    derived = None
+
+            with timing.stage('commit'):
+                mark_dataset_loaded(conn, download)
+                check_cancelled()
+                conn.commit()
+
+            logger.info(f"Parsed {total_rows} road noise monitoring records")
+            logger.info(f"Stations: {station_stats}")
+            logger.info(f"Measurements: {measurement_stats}")
+            if derived:
+                logger.info(f"Indicators: {derived['road_noise_daily']} station-days, "
+                            f"{derived['road_noise_monthly']} station-months rebuilt")
+            log_progress(__name__, records_processed, measurement_records, errors)
+
+        except Exception as e:
+            logger.error(f"Error parsing road noise data: {e}")
+            raise
 
 
 if __name__ == "__main__":
-    scrape_road_noise()
+    run_entry_point(scrape_road_noise, 'road_noise')
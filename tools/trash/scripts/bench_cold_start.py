@@ -0,0 +1,106 @@
+"""
+Cold-start benchmark of the scrapers
+Times, in fresh interpreters, how long a dataset's loader takes to import and
+to get its first parsed chunk of a recorded fixture, and which heavy libraries
+(pandas, numpy, openpyxl, requests) each one ends up loading
+
+Usage:
+    uv run python scripts/bench_cold_start.py
+    uv run python scripts/bench_cold_start.py --datasets cctv evacuation --repeat 10 --output cold.json
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+from bench_pipeline import FIXTURES_DIR, load_manifest
+
+SCRIPTS_DIR = Path(__file__).parent
+
+HEAVY_MODULES = ['pandas', 'numpy', 'openpyxl', 'requests']
+
+DEFAULT_REPEAT = 5
+
+# Runs in the child interpreter: argv[1] is the dataset, argv[2] the fixture
+CHILD_CODE = """
+import json, sys, time
+start = time.perf_counter()
+import datasets
+spec = datasets.get(sys.argv[1])
+if spec.loader:
+    spec.load_function()
+imported = time.perf_counter()
+from utils import iter_excel_chunks
+chunks = iter_excel_chunks(sys.argv[2])
+first = next(chunks, None)
+first_chunk = time.perf_counter()
+rows = (len(first) if first is not None else 0) + sum(len(chunk) for chunk in chunks)
+parsed = time.perf_counter()
+print(json.dumps({
+    'import_s': imported - start,
+    'first_chunk_s': first_chunk - start,
+    'parse_s': parsed - start,
+    'rows': rows,
+    'loaded': [name for name in %r if name in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def measure(dataset: str, fixture: Path) -> dict:
+    """One cold start in a fresh interpreter"""
+    proc = subprocess.run([sys.executable, '-c', CHILD_CODE, dataset, str(fixture)],
+                          cwd=SCRIPTS_DIR, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'child failed')
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def bench_dataset(dataset: str, entry: dict, repeat: int) -> dict:
+    """Median timings over repeat cold starts"""
+    runs = [measure(dataset, FIXTURES_DIR / entry['file']) for _ in range(repeat)]
+    result = {key: round(statistics.median(run[key] for run in runs), 4)
+              for key in ['import_s', 'first_chunk_s', 'parse_s']}
+    result['rows'] = runs[0]['rows']
+    result['loaded'] = runs[0]['loaded']
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time scraper imports and first chunks in fresh interpreters')
+    parser.add_argument('--datasets', nargs='+', help='Datasets to run (default: all in the manifest)')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help=f'Cold starts per dataset; the median is reported (default: {DEFAULT_REPEAT})')
+    parser.add_argument('--output', type=Path, help='Write results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    manifest = load_manifest()
+    datasets = args.datasets or list(manifest)
+    unknown = [d for d in datasets if d not in manifest]
+    if unknown:
+        parser.error(f"unknown datasets: {', '.join(unknown)}")
+
+    print(f"{'dataset':<24}{'import s':>10}{'1st chunk s':>13}{'parse s':>10}{'rows':>8}  loaded")
+    results = {}
+    failed = 0
+    for dataset in datasets:
+        try:
+            result = bench_dataset(dataset, manifest[dataset], args.repeat)
+        except Exception as e:
+            print(f"❌ {dataset}: {e}")
+            failed += 1
+            continue
+        results[dataset] = result
+        print(f"{dataset:<24}{result['import_s']:>10.3f}{result['first_chunk_s']:>13.3f}"
+              f"{result['parse_s']:>10.3f}{result['rows']:>8}  {', '.join(result['loaded']) or '-'}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + '\n', encoding='utf-8')
+        print(f"Results written to {args.output}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""
+Benchmark the download layer against a local portal stand-in
+Compares one bare requests.get per file against the pooled concurrent client
+
+Usage:
+    uv run python scripts/bench_downloads.py --files 17 --size 512 --latency 0.2
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import requests
+
+from fixture_server import FixtureServer
+from http_client import DownloadClient
+
+
+def bench_sequential(urls):
+    """Baseline: what utils.download_file used to do, one fresh connection per file"""
+    total = 0
+    for url in urls:
+        response = requests.get(url, timeout=30)
+        response.raise_for_status()
+        total += len(response.content)
+    return total
+
+
+def bench_pooled(urls, per_host_limit):
+    """Shared keep-alive pool, all files requested at once"""
+    client = DownloadClient(per_host_limit=per_host_limit)
+    try:
+        bodies = client.fetch_many(urls)
+    finally:
+        client.close()
+    return sum(len(body) for body in bodies.values() if body)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark sequential vs pooled downloads')
+    parser.add_argument('--files', type=int, default=17, help='Number of fixture files (default: 17)')
+    parser.add_argument('--size', type=int, default=512, help='Size of each file in KiB (default: 512)')
+    parser.add_argument('--latency', type=float, default=0.2,
+                        help='Simulated server latency per response in seconds (default: 0.2)')
+    parser.add_argument('--per-host', type=int, default=4, help='Per-host concurrency cap (default: 4)')
+    args = parser.parse_args(argv)
+
+    files = {f"dataset_{i:02d}.xlsx": os.urandom(args.size * 1024) for i in range(args.files)}
+    total_mb = args.files * args.size / 1024
+
+    print(f"Serving {args.files} files x {args.size} KiB with {args.latency}s latency")
+    print('=' * 80)
+
+    results = []
+    for label, func, extra in [
+        ('sequential requests.get', bench_sequential, ()),
+        (f'pooled client (per-host {args.per_host})', bench_pooled, (args.per_host,)),
+    ]:
+        with FixtureServer(files, latency=args.latency) as server:
+            urls = [server.url(name) for name in files]
+            start = time.perf_counter()
+            downloaded = func(urls, *extra)
+            elapsed = time.perf_counter() - start
+            connections = server.connection_count
+
+        assert downloaded == args.files * args.size * 1024, f"{label}: short download"
+        results.append(elapsed)
+        print(f"{label:<32} {elapsed:7.2f}s  {total_mb / elapsed:8.1f} MB/s  "
+              f"{args.files / elapsed:6.1f} files/s  {connections} connections")
+
+    print('=' * 80)
+    print(f"Speedup: {results[0] / results[1]:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
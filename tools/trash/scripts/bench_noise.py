@@ -0,0 +1,138 @@
+"""
+Benchmark road noise queries over years of synthetic measurements
+Fills a scratch database with hourly readings for every station over many
+years, then times station/date-range queries through the (station_id,
+measurement_date) index against the old three-integer filter, the
+noise_series / noise_profile API and the monthly indicator reads
+
+Usage:
+    uv run python scripts/bench_noise.py
+    uv run python scripts/bench_noise.py --years 12 --stations 30 --repeat 50
+"""
+
+import argparse
+import contextlib
+import io
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+import db_schema
+import noise_indicators
+from noise_indicators import HOUR_COLUMNS, monthly_indicators, noise_profile, noise_series
+
+DEFAULT_YEARS = 10
+DEFAULT_STATIONS = 20
+DEFAULT_REPEAT = 20
+FIRST_DAY = date(2014, 1, 1)
+
+# How station-date ranges were queried before the date key: three integer
+# columns, no usable index
+LEGACY_QUERY = f"""
+    SELECT measurement_year, measurement_month, measurement_day, {', '.join(HOUR_COLUMNS)}
+    FROM road_noise_measurements NOT INDEXED
+    WHERE station_id = ?
+      AND measurement_year * 10000 + measurement_month * 100 + measurement_day BETWEEN ? AND ?
+"""
+
+
+def fill(conn, stations: int, days: int, seed: int = 0) -> int:
+    """Insert one row per station and day with a daily curve plus noise; returns rows inserted"""
+    rng = np.random.default_rng(seed)
+    curve = 60 + 8 * np.sin((np.arange(24) - 9) / 24 * 2 * np.pi)
+    dates = [FIRST_DAY + timedelta(days=i) for i in range(days)]
+    conn.executemany("INSERT INTO road_noise_monitoring_stations (station_id, station_name) VALUES (?, ?)",
+                     [(f"N{s:02d}", f"Station {s}") for s in range(stations)])
+    sql = (f"INSERT INTO road_noise_measurements (station_id, measurement_year, measurement_month, "
+           f"measurement_day, {', '.join(HOUR_COLUMNS)}) VALUES ({', '.join('?' for _ in range(28))})")
+    for s in range(stations):
+        levels = np.round(curve + rng.normal(0, 3, (days, 24)), 1).tolist()
+        conn.executemany(sql, [(f"N{s:02d}", d.year, d.month, d.day, *row) for d, row in zip(dates, levels)])
+    db_schema.fill_road_noise_dates(conn)
+    return stations * days
+
+
+def timed(fn, repeat: int) -> float:
+    """Median wall time of fn in milliseconds"""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        runs.append((time.perf_counter() - start) * 1000)
+    return statistics.median(runs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time road noise range queries on synthetic data')
+    parser.add_argument('--years', type=int, default=DEFAULT_YEARS,
+                        help=f'Years of daily measurements (default: {DEFAULT_YEARS})')
+    parser.add_argument('--stations', type=int, default=DEFAULT_STATIONS,
+                        help=f'Monitoring stations (default: {DEFAULT_STATIONS})')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help=f'Runs per query; the median is reported (default: {DEFAULT_REPEAT})')
+    parser.add_argument('--dir', type=Path, default=None,
+                        help='Directory for the scratch database (default: system temp dir)')
+    args = parser.parse_args(argv)
+
+    days = (date(FIRST_DAY.year + args.years, 1, 1) - FIRST_DAY).days
+    last = FIRST_DAY + timedelta(days=days - 1)
+    year_start, year_end = date(last.year, 1, 1), last
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp, db_schema.use_database(Path(tmp) / 'bench.db'):
+        with contextlib.redirect_stdout(io.StringIO()):
+            db_schema.create_tables()
+        conn = db_schema.get_connection('bulk')
+
+        start = time.perf_counter()
+        rows = fill(conn, args.stations, days)
+        conn.commit()
+        print(f"Loaded {rows} station-days ({args.stations} stations x {args.years} years, "
+              f"{rows * 24} readings) in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        noise_indicators.refresh(conn)
+        conn.commit()
+        print(f"Rebuilt indicators in {time.perf_counter() - start:.1f}s")
+        conn.close()
+
+        conn = db_schema.get_connection()
+        station = 'N00'
+        as_int = lambda d: d.year * 10000 + d.month * 100 + d.day
+        queries = [
+            ('1 station, 1 year, 3-int filter (old)',
+             lambda: conn.execute(LEGACY_QUERY, (station, as_int(year_start), as_int(year_end))).fetchall()),
+            ('1 station, 1 year, date index',
+             lambda: noise_series(station, year_start, year_end, conn=conn)),
+            ('1 station, 1 month, date index',
+             lambda: noise_series(station, date(last.year, 6, 1), date(last.year, 6, 30), conn=conn)),
+            (f'1 station, {args.years} years, night hours',
+             lambda: noise_series(station, hours='night', conn=conn)),
+            (f'profile, all stations, {args.years} years',
+             lambda: noise_profile(conn=conn)),
+            ('profile, all stations, 1 year weekdays',
+             lambda: noise_profile(start=year_start, end=year_end, weekdays=range(5), conn=conn)),
+            ('monthly indicators, all stations',
+             lambda: monthly_indicators(conn)),
+        ]
+
+        print('=' * 80)
+        print(f"{'query':<48}{'median ms':>12}")
+        results = {}
+        for name, query in queries:
+            results[name] = timed(query, args.repeat)
+            print(f"{name:<48}{results[name]:>12.2f}")
+        conn.close()
+
+    print('=' * 80)
+    old, new = results[queries[0][0]], results[queries[1][0]]
+    print(f"Date index vs 3-int filter: {old / new:.1f}x faster")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,332 @@
+"""
+Offline benchmark of the scraper pipeline
+Serves the recorded fixtures in fixtures/ (optionally scaled up) from a local
+stand-in for the portal, runs each scraper against a scratch database in its
+own process and reports throughput and peak RSS, with a baseline check
+
+Usage:
+    uv run python scripts/bench_pipeline.py --scales 1 100 --output results.json
+    uv run python scripts/bench_pipeline.py --scales 1 100 --update-baseline
+    uv run python scripts/bench_pipeline.py --record    # refresh fixtures from the portal
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+MANIFEST_PATH = FIXTURES_DIR / "manifest.json"
+BASELINE_PATH = FIXTURES_DIR / "bench_baseline.json"
+
+# Per-scraper time limit in seconds
+CHILD_TIMEOUT = 1800
+
+# Metrics checked against the baseline: name -> True if higher is better
+CHECKED_METRICS = {'rows_per_s': True, 'peak_rss_mb': False}
+
+
+def load_manifest():
+    return json.loads(MANIFEST_PATH.read_text(encoding='utf-8'))
+
+
+def fixture_as_csv(content: bytes) -> str:
+    """Fixture text as CSV; recorded XLSX fixtures are converted (needs pandas)"""
+    if content[:4] == b'PK\x03\x04':
+        import pandas as pd
+        return pd.read_excel(io.BytesIO(content), dtype=str).to_csv(index=False)
+    from text_encoding import detect_encoding
+    return content.decode(detect_encoding(content[:64 * 1024]) or 'utf-8')
+
+
+def _typed(value: str):
+    """A text cell as a portal XLSX export holds it: numbers as numbers, blanks empty"""
+    if value == '':
+        return None
+    for convert in (int, float):
+        try:
+            number = convert(value)
+        except ValueError:
+            continue
+        # Only when the text comes back unchanged, so codes like '007' stay text
+        if str(number) == value:
+            return number
+    return value
+
+
+def xlsx_fixture(sheets) -> bytes:
+    """
+    Write text rows as an XLSX workbook with typed cells (needs openpyxl)
+
+    Args:
+        sheets: (sheet title, rows) pairs, header row first, in sheet order
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    for title, rows in sheets:
+        sheet = workbook.create_sheet(title)
+        for row in rows:
+            sheet.append([_typed(value) for value in row])
+    out = io.BytesIO()
+    workbook.save(out)
+    return out.getvalue()
+
+
+def scale_fixture(content: bytes, factor: int, unique_columns) -> bytes:
+    """
+    Repeat a fixture's rows factor times, in the fixture's own format
+
+    CSV fixtures become UTF-8-BOM CSV. XLSX fixtures stay XLSX, so the
+    streaming XLSX reader is what gets measured at scale; only their first
+    sheet, the one the scrapers read, is kept. Copies after the first get a
+    '-<n>' suffix in unique_columns so natural keys and UNIQUE constraints
+    still hold.
+    """
+    if factor == 1:
+        return content
+
+    rows = list(csv.reader(io.StringIO(fixture_as_csv(content))))
+    header, body = rows[0], rows[1:]
+    unique_idx = [header.index(col) for col in unique_columns if col in header]
+
+    scaled = [header]
+    for copy in range(factor):
+        for row in body:
+            if copy:
+                row = list(row)
+                for i in unique_idx:
+                    row[i] = f"{row[i]}-{copy}"
+            scaled.append(row)
+
+    if content[:4] == b'PK\x03\x04':
+        return xlsx_fixture([('Sheet1', scaled)])
+    out = io.StringIO()
+    csv.writer(out, lineterminator='\r\n').writerows(scaled)
+    return out.getvalue().encode('utf-8-sig')
+
+
+def served_name(dataset: str, entry: dict, scale: int) -> str:
+    """File name a fixture is served under (scaled variants keep the fixture's format)"""
+    return entry['file'] if scale == 1 else f"{dataset}-x{scale}{Path(entry['file']).suffix}"
+
+
+def run_child(spec: dict) -> dict:
+    """
+    Benchmark one scraper in this process (database and cache come from the environment)
+
+    The scraper runs once, cold, and its own stage timings (see timing.py)
+    give the download, parse, map, convert, insert and commit split.
+    """
+    import db_schema
+    import timing
+    with redirect_stdout(io.StringIO()):
+        db_schema.create_tables()
+
+    from datasets import load
+
+    sink = timing.add_sink(timing.MemorySink())
+    load(spec['dataset'], url=spec['url'])
+    timing.remove_sink(sink)
+
+    events = sink.for_dataset(spec['dataset'])
+    if 'total' not in events:
+        raise RuntimeError(f"no timings recorded for {spec['dataset']}")
+
+    conn = sqlite3.connect(db_schema.DB_PATH)
+    loaded = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in spec['tables']}
+    conn.close()
+
+    def seconds(stage):
+        return events[stage].wall_s if stage in events else 0.0
+
+    total = events['total']
+    rows = total.rows
+    size_mb = total.bytes / (1024 * 1024)
+    download_s = max(seconds('resolve') + seconds('download'), 1e-9)
+    parse_s = max(seconds('parse'), 1e-9)
+    load_s = max(seconds('map') + seconds('convert') + seconds('insert') + seconds('commit'), 1e-9)
+    return {
+        'rows': rows,
+        'bytes': total.bytes,
+        'loaded': loaded,
+        'stages': {name: {'wall_s': round(e.wall_s, 4), 'cpu_s': round(e.cpu_s, 4), 'calls': e.calls}
+                   for name, e in events.items() if name != 'total'},
+        'download_s': round(download_s, 4),
+        'parse_s': round(parse_s, 4),
+        'load_s': round(load_s, 4),
+        'total_s': round(total.wall_s, 4),
+        'download_mb_s': round(size_mb / download_s, 2),
+        'parse_mb_s': round(size_mb / parse_s, 2),
+        'parse_rows_s': round(rows / parse_s, 1),
+        'load_rows_s': round(rows / load_s, 1),
+        'rows_per_s': round(rows / total.wall_s, 1),
+        'peak_rss_mb': total.attrs['peak_rss_mb'],
+    }
+
+
+def run_isolated(spec: dict, workdir: Path) -> dict:
+    """Run one scraper benchmark in a fresh interpreter with a scratch database and cache"""
+    env = dict(os.environ,
+               HSINCHU_DB_PATH=str(workdir / 'bench.db'),
+               HSINCHU_CACHE_DIR=str(workdir / 'cache'),
+               HSINCHU_FORCE_REFRESH='')
+    try:
+        proc = subprocess.run(
+            [sys.executable, __file__, '--child', json.dumps(spec)],
+            cwd=Path(__file__).parent, env=env, capture_output=True, text=True, timeout=CHILD_TIMEOUT
+        )
+    except subprocess.TimeoutExpired:
+        return {'status': 'timeout'}
+
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        return {'status': 'failed', 'error': (proc.stderr or proc.stdout)[-500:]}
+    return {'status': 'ok', **json.loads(lines[-1])}
+
+
+def compare(results, baseline, tolerance):
+    """
+    Check results against a baseline
+
+    Returns:
+        List of regression messages
+    """
+    reference = {(r['dataset'], r['scale']): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        if result['status'] != 'ok':
+            regressions.append(f"{result['dataset']} x{result['scale']}: {result['status']}")
+            continue
+        base = reference.get((result['dataset'], result['scale']))
+        if not base or base.get('status') != 'ok':
+            continue
+        for metric, higher_is_better in CHECKED_METRICS.items():
+            old, new = base[metric], result[metric]
+            if higher_is_better and new < old * (1 - tolerance):
+                regressions.append(f"{result['dataset']} x{result['scale']}: {metric} {new} < baseline {old}")
+            elif not higher_is_better and new > old * (1 + tolerance):
+                regressions.append(f"{result['dataset']} x{result['scale']}: {metric} {new} > baseline {old}")
+    return regressions
+
+
+def record_fixtures(manifest, datasets):
+    """Download the live portal files into fixtures/ (needs network access)"""
+    from http_client import get_client
+
+    urls = json.loads((Path(__file__).parent / "data_urls.json").read_text(encoding='utf-8'))
+    for dataset in datasets:
+        content = get_client().fetch(urls[dataset], timeout=60)
+        if not content:
+            print(f"❌ {dataset}: download failed")
+            continue
+        suffix = 'xlsx' if content[:4] == b'PK\x03\x04' else 'csv'
+        (FIXTURES_DIR / manifest[dataset]['file']).unlink(missing_ok=True)
+        manifest[dataset]['file'] = f"{dataset}.{suffix}"
+        (FIXTURES_DIR / manifest[dataset]['file']).write_bytes(content)
+        print(f"✅ {dataset}: {len(content)} bytes")
+    MANIFEST_PATH.write_text(json.dumps(manifest, ensure_ascii=False, indent=2) + '\n', encoding='utf-8')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline benchmark of all scrapers against recorded fixtures')
+    parser.add_argument('--datasets', nargs='+', help='Datasets to run (default: all in the manifest)')
+    parser.add_argument('--scales', nargs='+', type=int, default=[1],
+                        help='Row multipliers applied to each fixture (default: 1)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Simulated server latency in seconds')
+    parser.add_argument('--output', type=Path, help='Write results as JSON to this file')
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH, help='Baseline results file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed relative regression before failing (default: 0.25)')
+    parser.add_argument('--update-baseline', action='store_true', help='Store these results as the new baseline')
+    parser.add_argument('--record', action='store_true', help='Re-record fixtures from the live portal and exit')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_child(json.loads(args.child))))
+        return 0
+
+    manifest = load_manifest()
+    datasets = args.datasets or list(manifest)
+    unknown = [d for d in datasets if d not in manifest]
+    if unknown:
+        parser.error(f"unknown datasets: {', '.join(unknown)}")
+
+    if args.record:
+        record_fixtures(manifest, datasets)
+        return 0
+
+    from fixture_server import FixtureServer
+
+    print(f"Benchmarking {len(datasets)} datasets at scales {args.scales}")
+    print('=' * 100)
+    print(f"{'dataset':<24}{'scale':>6}{'rows':>10}{'MB':>8}{'dl MB/s':>10}{'parse r/s':>12}"
+          f"{'load r/s':>12}{'total r/s':>12}{'RSS MB':>8}")
+
+    results = []
+    for scale in args.scales:
+        files = {}
+        for dataset in datasets:
+            entry = manifest[dataset]
+            content = (FIXTURES_DIR / entry['file']).read_bytes()
+            files[served_name(dataset, entry, scale)] = scale_fixture(content, scale, entry['unique_columns'])
+
+        with FixtureServer(files, latency=args.latency) as server:
+            for dataset in datasets:
+                entry = manifest[dataset]
+                spec = dict(entry, dataset=dataset, url=server.url(served_name(dataset, entry, scale)))
+                with tempfile.TemporaryDirectory() as tmp:
+                    result = {'dataset': dataset, 'scale': scale, **run_isolated(spec, Path(tmp))}
+                results.append(result)
+
+                if result['status'] == 'ok':
+                    print(f"{dataset:<24}{scale:>6}{result['rows']:>10}{result['bytes'] / 1048576:>8.2f}"
+                          f"{result['download_mb_s']:>10.1f}{result['parse_rows_s']:>12.0f}"
+                          f"{result['load_rows_s']:>12.0f}{result['rows_per_s']:>12.0f}{result['peak_rss_mb']:>8.1f}")
+                else:
+                    print(f"{dataset:<24}{scale:>6}  ❌ {result['status']}: {result.get('error', '')[-200:]}")
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scales': args.scales,
+        'results': results,
+    }
+    print('=' * 100)
+
+    if args.output:
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"Results written to {args.output}")
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"Baseline updated: {args.baseline}")
+        return 0 if all(r['status'] == 'ok' for r in results) else 1
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0 if all(r['status'] == 'ok' for r in results) else 1
+
+    regressions = compare(results, json.loads(args.baseline.read_text(encoding='utf-8')), args.tolerance)
+    if regressions:
+        print(f"❌ {len(regressions)} regressions against {args.baseline}:")
+        for message in regressions:
+            print(f"  {message}")
+        return 1
+    print(f"✅ No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+Benchmark street light spatial queries
+Fills a scratch database with synthetic street lights spread over Hsinchu,
+builds the R*Tree and times bbox, radius and k-nearest queries against a
+full scan with haversine in Python
+
+Usage:
+    uv run python scripts/bench_spatial.py
+    uv run python scripts/bench_spatial.py --lights 2000000 --queries 500
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import db_schema
+import spatial_index
+from spatial_index import haversine_m, lights_in_bbox, lights_within, nearest_lights
+
+DEFAULT_LIGHTS = 1_000_000
+DEFAULT_QUERIES = 200
+# Full scans are slow, so only this many are timed
+SCAN_QUERIES = 3
+
+# Roughly the city limits
+MIN_LAT, MAX_LAT = 24.72, 24.86
+MIN_LON, MAX_LON = 120.88, 121.03
+
+
+def random_point(rng):
+    return rng.uniform(MIN_LAT, MAX_LAT), rng.uniform(MIN_LON, MAX_LON)
+
+
+def fill(conn, lights: int, seed: int = 0):
+    """Insert synthetic lights in batches (the R*Tree triggers fire for each)"""
+    rng = random.Random(seed)
+    sql = "INSERT INTO street_lights (light_code, wgs84_latitude, wgs84_longitude) VALUES (?, ?, ?)"
+    batch = 100_000
+    for start in range(0, lights, batch):
+        conn.executemany(sql, [(f"L{i:08d}", *random_point(rng)) for i in range(start, min(start + batch, lights))])
+
+
+def scan_within(conn, lat: float, lon: float, radius_m: float):
+    """The unindexed way: every light through haversine"""
+    found = [(haversine_m(lat, lon, light_lat, light_lon), light_id, code, light_lat, light_lon)
+             for light_id, code, light_lat, light_lon in conn.execute(
+                 "SELECT id, light_code, wgs84_latitude, wgs84_longitude FROM street_lights "
+                 "WHERE wgs84_latitude IS NOT NULL AND wgs84_longitude IS NOT NULL")]
+    return sorted(row for row in found if row[0] <= radius_m)
+
+
+def timed(fn, points) -> float:
+    """Median wall time in milliseconds of fn over the points"""
+    runs = []
+    for lat, lon in points:
+        start = time.perf_counter()
+        fn(lat, lon)
+        runs.append((time.perf_counter() - start) * 1000)
+    return statistics.median(runs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time R*Tree street light queries on synthetic data')
+    parser.add_argument('--lights', type=int, default=DEFAULT_LIGHTS,
+                        help=f'Synthetic lights (default: {DEFAULT_LIGHTS})')
+    parser.add_argument('--queries', type=int, default=DEFAULT_QUERIES,
+                        help=f'Random query points per query type (default: {DEFAULT_QUERIES})')
+    parser.add_argument('--dir', type=Path, default=None,
+                        help='Directory for the scratch database (default: system temp dir)')
+    args = parser.parse_args(argv)
+
+    rng = random.Random(1)
+    points = [random_point(rng) for _ in range(args.queries)]
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp, db_schema.use_database(Path(tmp) / 'bench.db'):
+        with contextlib.redirect_stdout(io.StringIO()):
+            db_schema.create_tables()
+        conn = db_schema.get_connection('bulk')
+
+        start = time.perf_counter()
+        fill(conn, args.lights)
+        conn.commit()
+        print(f"Inserted {args.lights} lights, R*Tree kept by triggers, in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        spatial_index.rebuild(conn)
+        conn.commit()
+        print(f"Rebuilt the R*Tree (as after a staging swap) in {time.perf_counter() - start:.1f}s")
+        conn.close()
+
+        conn = db_schema.get_connection()
+        # Check the index against the scan before timing it
+        lat, lon = points[0]
+        if lights_within(lat, lon, 200, conn=conn) != scan_within(conn, lat, lon, 200):
+            print("❌ R*Tree and full scan disagree")
+            return 1
+
+        queries = [
+            ('full scan + haversine, 50 m', lambda lat, lon: scan_within(conn, lat, lon, 50), points[:SCAN_QUERIES]),
+            ('R*Tree radius 50 m', lambda lat, lon: lights_within(lat, lon, 50, conn=conn), points),
+            ('R*Tree radius 500 m', lambda lat, lon: lights_within(lat, lon, 500, conn=conn), points),
+            ('R*Tree bbox ~200 m', lambda lat, lon: lights_in_bbox(lat, lon, lat + 0.0018, lon + 0.002,
+                                                                  conn=conn), points),
+            ('R*Tree 1 nearest', lambda lat, lon: nearest_lights(lat, lon, 1, conn=conn), points),
+            ('R*Tree 10 nearest', lambda lat, lon: nearest_lights(lat, lon, 10, conn=conn), points),
+        ]
+
+        print('=' * 80)
+        print(f"{'query':<40}{'runs':>6}{'median ms':>12}")
+        results = {}
+        for name, query, run_points in queries:
+            results[name] = timed(query, run_points)
+            print(f"{name:<40}{len(run_points):>6}{results[name]:>12.3f}")
+        conn.close()
+
+    print('=' * 80)
+    speedup = results['full scan + haversine, 50 m'] / results['R*Tree radius 50 m']
+    print(f"R*Tree vs full scan, 50 m radius: {speedup:,.0f}x faster")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
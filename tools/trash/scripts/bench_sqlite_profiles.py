@@ -0,0 +1,113 @@
+"""
+Benchmark SQLite connection profiles for ETL loads
+Inserts synthetic rows into the largest tables of a scratch database with the
+default ('read') and bulk-load connection profiles and compares throughput
+
+Usage:
+    uv run python scripts/bench_sqlite_profiles.py --rows 200000 --commit-every 5000
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import db_schema
+
+# Largest tables by source row count
+TABLES = ['street_lights', 'land_prices', 'road_noise_measurements']
+
+SKIP_COLUMNS = {'id', 'created_at', 'updated_at'}
+
+
+def table_columns(conn, table):
+    """Insertable (name, type) pairs for a table"""
+    return [(name, col_type) for _, name, col_type, _, _, _ in conn.execute(f"PRAGMA table_info({table})")
+            if name not in SKIP_COLUMNS]
+
+
+def synthetic_rows(columns, count, seed=0):
+    """Deterministic rows of plausible values; TEXT values are unique per row"""
+    rng = random.Random(seed)
+    for i in range(count):
+        row = []
+        for name, col_type in columns:
+            if col_type == 'INTEGER':
+                row.append(rng.randint(0, 5000))
+            elif col_type == 'REAL':
+                row.append(rng.uniform(0, 300000))
+            else:
+                row.append(f"{name}-{i:08d}")
+        yield tuple(row)
+
+
+def create_scratch_db(path):
+    """Create the full schema in a scratch file"""
+    db_schema.DB_PATH = path
+    with contextlib.redirect_stdout(io.StringIO()):
+        db_schema.create_tables()
+
+
+def load(profile, table, make_rows, commit_every):
+    """Insert rows with one connection; commit_every=0 means one transaction for the table"""
+    conn = db_schema.get_connection(profile)
+    columns = table_columns(conn, table)
+    sql = (f"INSERT INTO {table} ({', '.join(name for name, _ in columns)}) "
+           f"VALUES ({', '.join('?' for _ in columns)})")
+    batch_size = commit_every or 5000
+    rows = list(make_rows(columns))  # build outside the timed section
+
+    start = time.perf_counter()
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            conn.executemany(sql, batch)
+            batch.clear()
+            if commit_every:
+                conn.commit()
+    if batch:
+        conn.executemany(sql, batch)
+    conn.commit()
+    elapsed = time.perf_counter() - start
+
+    conn.close()
+    return elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare insert throughput of SQLite connection profiles')
+    parser.add_argument('--rows', type=int, default=200000, help='Rows per table (default: 200000)')
+    parser.add_argument('--commit-every', type=int, default=5000,
+                        help='Rows per transaction; 0 for one transaction per table (default: 5000)')
+    parser.add_argument('--tables', nargs='+', default=TABLES, help='Tables to load')
+    parser.add_argument('--dir', type=Path, default=None,
+                        help='Directory for scratch databases (default: system temp dir)')
+    args = parser.parse_args(argv)
+
+    per_txn = f"{args.commit_every} rows" if args.commit_every else "whole table"
+    print(f"Loading {args.rows} rows into {len(args.tables)} tables, {per_txn} per transaction")
+    print('=' * 80)
+
+    totals = {}
+    for profile in ['read', 'bulk']:
+        with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+            create_scratch_db(Path(tmp) / 'bench.db')
+            for table in args.tables:
+                elapsed = load(profile, table, lambda cols: synthetic_rows(cols, args.rows), args.commit_every)
+                totals[profile] = totals.get(profile, 0.0) + elapsed
+                print(f"{profile:<5} {table:<26} {elapsed:7.2f}s  {args.rows / elapsed:10.0f} rows/s")
+
+    print('=' * 80)
+    for profile, elapsed in totals.items():
+        print(f"{profile:<5} total {elapsed:7.2f}s  {args.rows * len(args.tables) / elapsed:10.0f} rows/s")
+    print(f"Speedup: {totals['read'] / totals['bulk']:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
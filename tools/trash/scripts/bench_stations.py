@@ -0,0 +1,150 @@
+"""
+Benchmark nearest YouBike station queries
+Fills a scratch database with synthetic stations spread over Hsinchu, then
+times the station grid (build, single kNN and radius queries, batches of
+points) against haversine over every station
+
+Usage:
+    uv run python scripts/bench_stations.py
+    uv run python scripts/bench_stations.py --stations 5000 --points 20000
+"""
+
+import argparse
+import contextlib
+import io
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+import db_schema
+from spatial_index import haversine_m
+from station_index import station_index
+
+DEFAULT_STATIONS = 1_500
+DEFAULT_POINTS = 5_000
+DEFAULT_QUERIES = 1_000
+# Queries against every station are slow, so only this many are timed
+SCAN_QUERIES = 50
+
+# Roughly the city limits
+MIN_LAT, MAX_LAT = 24.72, 24.86
+MIN_LON, MAX_LON = 120.88, 121.03
+
+
+def random_points(rng, count: int):
+    return rng.uniform(MIN_LAT, MAX_LAT, count), rng.uniform(MIN_LON, MAX_LON, count)
+
+
+def fill(conn, stations: int, seed: int = 0):
+    """Insert synthetic stations, a third of them packed around the city centre"""
+    rng = np.random.default_rng(seed)
+    lat, lon = random_points(rng, stations)
+    centre = stations // 3
+    lat[:centre] = 24.804 + rng.normal(0, 0.004, centre)
+    lon[:centre] = 120.971 + rng.normal(0, 0.004, centre)
+    conn.executemany("INSERT INTO youbike_stations (station_name, latitude, longitude) VALUES (?, ?, ?)",
+                     [(f"Station {i}", a, b) for i, (a, b) in enumerate(zip(lat.tolist(), lon.tolist()))])
+
+
+def scan_nearest(stations, lat: float, lon: float, k: int):
+    """The unindexed way: every station through haversine"""
+    return sorted((haversine_m(lat, lon, a, b), station_id) for station_id, a, b in stations)[:k]
+
+
+def timed(fn, points) -> float:
+    """Median wall time in microseconds of fn over the points"""
+    runs = []
+    for lat, lon in points:
+        start = time.perf_counter()
+        fn(lat, lon)
+        runs.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(runs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time nearest YouBike station queries on synthetic data')
+    parser.add_argument('--stations', type=int, default=DEFAULT_STATIONS,
+                        help=f'Synthetic stations (default: {DEFAULT_STATIONS})')
+    parser.add_argument('--points', type=int, default=DEFAULT_POINTS,
+                        help=f'Points in one batch query, e.g. every park (default: {DEFAULT_POINTS})')
+    parser.add_argument('--queries', type=int, default=DEFAULT_QUERIES,
+                        help=f'Random query points per single-point query type (default: {DEFAULT_QUERIES})')
+    parser.add_argument('--dir', type=Path, default=None,
+                        help='Directory for the scratch database (default: system temp dir)')
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(1)
+    points = list(zip(*(values.tolist() for values in random_points(rng, args.queries))))
+    batch_lat, batch_lon = random_points(rng, args.points)
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp, db_schema.use_database(Path(tmp) / 'bench.db'):
+        with contextlib.redirect_stdout(io.StringIO()):
+            db_schema.create_tables()
+        conn = db_schema.get_connection('bulk')
+        fill(conn, args.stations)
+        conn.commit()
+        stations = conn.execute("SELECT id, latitude, longitude FROM youbike_stations").fetchall()
+        conn.close()
+
+        start = time.perf_counter()
+        index = station_index()
+        built = (time.perf_counter() - start) * 1000
+        lookups = []
+        for _ in range(100):
+            start = time.perf_counter()
+            cached = station_index()
+            lookups.append((time.perf_counter() - start) * 1e6)
+        lookup = statistics.median(lookups)
+        print(f"Built the grid over {index.size} stations ({index.rows}x{index.cols} cells of "
+              f"{index.cell_m:.0f} m) in {built:.1f} ms; cached lookup {lookup:.0f} us")
+        if cached is not index:
+            print("❌ Unchanged database rebuilt the index")
+            return 1
+
+        # Check the grid against the scan before timing it
+        for lat, lon in points[:SCAN_QUERIES]:
+            expected = [station_id for _, station_id in scan_nearest(stations, lat, lon, 5)]
+            if [row[1] for row in index.nearest(lat, lon, 5)] != expected:
+                print("❌ Grid and full scan disagree")
+                return 1
+
+        queries = [
+            ('full scan + haversine, 5 nearest', lambda lat, lon: scan_nearest(stations, lat, lon, 5),
+             points[:SCAN_QUERIES]),
+            ('grid 1 nearest', lambda lat, lon: index.nearest(lat, lon, 1), points),
+            ('grid 5 nearest', lambda lat, lon: index.nearest(lat, lon, 5), points),
+            ('grid radius 300 m', lambda lat, lon: index.within(lat, lon, 300), points),
+            ('grid radius 1000 m', lambda lat, lon: index.within(lat, lon, 1000), points),
+        ]
+
+        print('=' * 80)
+        print(f"{'query':<40}{'runs':>8}{'median us':>12}")
+        results = {}
+        for name, query, run_points in queries:
+            results[name] = timed(query, run_points)
+            print(f"{name:<40}{len(run_points):>8}{results[name]:>12.1f}")
+
+        batches = [
+            ('batch 5 nearest', lambda: index.nearest_many(batch_lat, batch_lon, 5)),
+            ('batch radius 300 m', lambda: index.within_many(batch_lat, batch_lon, 300)),
+        ]
+        print('=' * 80)
+        print(f"{'batch query':<40}{'points':>8}{'total ms':>12}{'us/point':>12}")
+        for name, query in batches:
+            start = time.perf_counter()
+            query()
+            elapsed = time.perf_counter() - start
+            print(f"{name:<40}{args.points:>8}{elapsed * 1000:>12.1f}{elapsed * 1e6 / args.points:>12.1f}")
+
+    print('=' * 80)
+    speedup = results['full scan + haversine, 5 nearest'] / results['grid 5 nearest']
+    print(f"Grid vs full scan, 5 nearest: {speedup:,.0f}x faster")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+Column resolution for spreadsheet sources
+Works out which source column feeds each DB column once per file header,
+so row and batch processing only do positional lookups
+"""
+
+import logging
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# A rule maps header text to a DB column: (db_col, predicate(col, col_lower), converter)
+Rule = Tuple[str, Callable[[str, str], bool], Optional[Callable]]
+
+
+class ColumnPlan:
+    """
+    Resolved source-to-DB column plan for one header
+
+    Attributes:
+        fields: List of (db_col, source column name or None, header position or None, converter)
+    """
+
+    def __init__(self, header: Sequence, fields: List[tuple]):
+        self.header = list(header)
+        self.fields = fields
+
+    @property
+    def columns(self) -> List[str]:
+        """DB columns in insert order"""
+        return [db_col for db_col, _, _, _ in self.fields]
+
+    @property
+    def matched(self) -> Dict[str, str]:
+        return {db_col: str(source) for db_col, source, _, _ in self.fields if source is not None}
+
+    @property
+    def unmatched(self) -> List[str]:
+        return [db_col for db_col, source, _, _ in self.fields if source is None]
+
+    @property
+    def unused(self) -> List[str]:
+        """Source columns that feed no DB column"""
+        used = {pos for _, _, pos, _ in self.fields if pos is not None}
+        return [str(col) for pos, col in enumerate(self.header) if pos not in used]
+
+    def convert_row(self, values: Sequence) -> dict:
+        """
+        Convert one positional row, e.g. from a Chunk's rows
+
+        Returns:
+            Dict of DB column -> converted value (None for unmatched columns)
+        """
+        data = {}
+        for db_col, _, pos, converter in self.fields:
+            if pos is None:
+                data[db_col] = None
+            else:
+                data[db_col] = converter(values[pos]) if converter else values[pos]
+        return data
+
+    def report(self) -> str:
+        lines = [f"  {db_col} <- {source}" for db_col, source in self.matched.items()]
+        if self.unmatched:
+            lines.append(f"  unmatched: {', '.join(self.unmatched)}")
+        if self.unused:
+            lines.append(f"  unused source columns: {', '.join(self.unused)}")
+        return '\n'.join(lines)
+
+    def log(self, name: str):
+        logger.info(f"{name} column plan ({len(self.matched)}/{len(self.fields)} matched):\n{self.report()}")
+
+
+def _find(header: List[str], names: Tuple[str, ...], exact: bool) -> Optional[int]:
+    """Position of the first name present in the header, optionally by substring"""
+    for name in names:
+        if name in header:
+            return header.index(name)
+
+    if not exact:
+        # Flexible matching (contains, case-insensitive)
+        for name in names:
+            for pos, col in enumerate(header):
+                if name.lower() in col.lower():
+                    return pos
+    return None
+
+
+def resolve_mapping(header: Sequence, column_mapping: dict, exact: bool = False) -> ColumnPlan:
+    """
+    Resolve a {source: (db_col, converter)} mapping against a header
+
+    A source may be a tuple of alternative names; the first one present wins.
+    Without exact=True, a source not found verbatim falls back to the first
+    header containing it (case-insensitive). If several sources map to the
+    same DB column the last one wins, as with a dict.
+
+    Args:
+        header: Source column names, e.g. a Chunk's columns
+        column_mapping: Dict mapping source column(s) to (db_col, converter)
+        exact: Only accept exact header matches
+
+    Returns:
+        ColumnPlan
+    """
+    names = [str(col) for col in header]
+    resolved = {}
+    for source, (db_col, converter) in column_mapping.items():
+        alternatives = source if isinstance(source, tuple) else (source,)
+        pos = _find(names, alternatives, exact)
+        resolved[db_col] = (header[pos] if pos is not None else None, pos, converter)
+
+    return ColumnPlan(header, [(db_col, *spec) for db_col, spec in resolved.items()])
+
+
+def resolve_rules(header: Sequence, rules: List[Rule]) -> ColumnPlan:
+    """
+    Resolve predicate rules against a header
+
+    Each header column is assigned to the first rule whose predicate accepts
+    it (like an if/elif chain); when several columns land on one DB column,
+    the last one wins. DB columns keep the rule order.
+
+    Args:
+        header: Source column names, e.g. a Chunk's columns
+        rules: List of (db_col, predicate(col, col_lower), converter)
+
+    Returns:
+        ColumnPlan
+    """
+    assigned = {}
+    for pos, col in enumerate(header):
+        text = str(col)
+        lowered = text.lower()
+        for db_col, predicate, _ in rules:
+            if predicate(text, lowered):
+                assigned[db_col] = pos
+                break
+
+    fields = []
+    seen = set()
+    for db_col, _, converter in rules:
+        if db_col in seen:
+            continue
+        seen.add(db_col)
+        pos = assigned.get(db_col)
+        fields.append((db_col, header[pos] if pos is not None else None, pos, converter))
+
+    return ColumnPlan(header, fields)
+
+
+def resolve_columns(header: Sequence, mapping: Union[dict, List[Rule]], exact: bool = False) -> ColumnPlan:
+    """Resolve either a source mapping (dict) or a rule list against a header"""
+    if isinstance(mapping, dict):
+        return resolve_mapping(header, mapping, exact=exact)
+    return resolve_rules(header, mapping)
@@ -0,0 +1,343 @@
+"""
+Dataset registry
+Declares every dataset the pipeline loads: its portal page, target table,
+column mapping and load options, and loads any of them with one engine
+(universal_scraper.scrape_data) or, for the few datasets whose shape needs
+it, the dataset's own loader
+
+Adding a dataset is one Dataset(...) entry below plus its table in
+db_schema.py; `fetch_urls.py` then picks up its download URL.
+"""
+
+import importlib
+import json
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+from db_schema import NATURAL_KEYS
+from universal_scraper import scrape_data
+from utils import clean_text, safe_int, safe_float
+
+logger = logging.getLogger(__name__)
+
+# Download URLs by dataset key, written by fetch_urls.py (the portal's file links carry tokens)
+URLS_PATH = Path(__file__).parent / "data_urls.json"
+
+PORTAL_PAGE = "https://opendata.hccg.gov.tw/OpenDataDetail.aspx?n={category}&s={source_id}"
+
+
+def _import(ref: str):
+    """Function named by 'module:function'"""
+    module_name, func_name = ref.split(':')
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """
+    One dataset on the open data portal and how it is loaded
+
+    The file format (XLSX, XLS or CSV) is not declared: the portal changes
+    it now and then, so the reader sniffs it from the downloaded bytes.
+
+    Args:
+        key: Dataset name, used for the download cache, timings and run history
+        name: Display name
+        source_id: Portal dataset id (the s= parameter of its detail page)
+        table: Target table
+        columns: Source column(s) -> (DB column, converter) dict, or a list of
+            (db_col, predicate(col, col_lower), converter) header rules
+        category: Portal category (the n= parameter of its detail page)
+        required_columns: DB columns a row must have a value in to be loaded
+        exact: Match mapping headers exactly instead of by substring
+        loader: 'module:function' of a dataset-specific loader, for datasets
+            that are not one table per file; it is called with the download URL
+        transform: 'module:function' applied to each chunk's converted columns,
+            as transform(names, columns) -> columns, to fill in derived values
+        after_load: 'module:function' run in the load's transaction once the
+            table is written, with (conn, replaced); replaced is True when a
+            staging table was swapped in. For indexes kept beside the table.
+    """
+    key: str
+    name: str
+    source_id: int
+    table: str
+    columns: Union[dict, list, None] = None
+    category: int = 1
+    required_columns: Tuple[str, ...] = ()
+    exact: bool = False
+    loader: Optional[str] = None
+    transform: Optional[str] = None
+    after_load: Optional[str] = None
+
+    @property
+    def page(self) -> str:
+        """The dataset's detail page on the portal"""
+        return PORTAL_PAGE.format(category=self.category, source_id=self.source_id)
+
+    @property
+    def url(self) -> str:
+        return source_url(self.key)
+
+    @property
+    def natural_key(self) -> Tuple[str, ...]:
+        """Key rows are matched on across reloads (kept with the schema, see db_schema.NATURAL_KEYS)"""
+        return NATURAL_KEYS[self.table]
+
+    def load_function(self):
+        """The dataset-specific loader, imported on first use"""
+        return _import(self.loader)
+
+    def transform_function(self):
+        """The column transform, imported on first use (None without one)"""
+        return _import(self.transform) if self.transform else None
+
+    def after_load_function(self):
+        """The after_load hook, imported on first use (None without one)"""
+        return _import(self.after_load) if self.after_load else None
+
+    def column_spec(self) -> Union[dict, list]:
+        """Column mapping or header rules, including those of a dataset-specific loader"""
+        if self.columns is not None:
+            return self.columns
+        module = importlib.import_module(self.loader.split(':')[0])
+        return getattr(module, 'COLUMN_MAPPING', None) or module.COLUMN_RULES
+
+
+DATASETS = {spec.key: spec for spec in [
+    Dataset('parks', 'Parks', 71, 'parks', [
+        ('park_id', lambda c, l: '編號' in c and '都計' not in c and '區域' not in c, clean_text),
+        ('city', lambda c, l: '新竹市' in c or c == '市', clean_text),
+        ('postal_code', lambda c, l: '郵遞區號' in c or '郵政' in c, clean_text),
+        ('park_name', lambda c, l: '公園名稱' in c or (('公園' in c or 'park' in l) and '名' in c), clean_text),
+        ('urban_planning_code', lambda c, l: '都計編號' in c, clean_text),
+        ('location', lambda c, l: '地點' in c or '位置' in c or 'location' in l, clean_text),
+        ('area_code', lambda c, l: '區域代碼' in c or 'area' in l and 'code' in l, clean_text),
+        ('district', lambda c, l: '區別' in c or 'district' in l, clean_text),
+        ('neighborhood', lambda c, l: '里別' in c or '里名' in c, clean_text),
+        ('population_served', lambda c, l: '人數' in c or 'population' in l, safe_int),
+        ('area_hectares', lambda c, l: '面積' in c or 'area' in l, safe_float),
+        ('remarks', lambda c, l: '備註' in c or 'remark' in l or 'note' in l, clean_text),
+    ], required_columns=('park_name',)),
+
+    Dataset('playgrounds', 'Playgrounds', 571, 'playgrounds', category=13,
+            loader='03_playgrounds:scrape_playgrounds'),
+
+    Dataset('public_toilets', 'Public Toilets', 904, 'public_toilets', {
+        '公廁編號': ('toilet_id', clean_text),
+        '公廁名稱': ('toilet_name', clean_text),
+        '地址或地點描述': ('address_or_location', clean_text),
+        '管理單位名稱': ('managing_organization', clean_text),
+        '最新公廁級別': ('facility_grade', clean_text),
+        '公廁類型': ('toilet_type', clean_text),
+        '縣市別代碼': ('county_code', clean_text),
+        '行政區域代碼': ('district_code', clean_text),
+        '村里名稱': ('village_name', clean_text),
+    }, exact=True),
+
+    Dataset('street_lights', 'Street Lights', 159, 'street_lights', {
+        '路燈編碼': ('light_code', clean_text),
+        '燈具種類': ('fixture_type', clean_text),
+        '燈具廠商': ('fixture_manufacturer', clean_text),
+        '燈桿類別': ('pole_category', clean_text),
+        '燈桿種類': ('pole_type', clean_text),
+        '燈桿高度': ('pole_height', safe_float),
+        '瓦數': ('wattage', safe_int),
+        '行政區代碼': ('district_code', clean_text),
+        '所屬鄉鎮': ('township', clean_text),
+        '所屬村里': ('village', clean_text),
+        '縣市別代碼': ('county_code', clean_text),
+        '地址': ('address', clean_text),
+        'TWD97座標X': ('twd97_x', safe_float),
+        'TWD97座標Y': ('twd97_y', safe_float),
+        'WGS84座標東經度': ('wgs84_longitude', safe_float),
+        'WGS84座標北緯度': ('wgs84_latitude', safe_float),
+    }, exact=True, transform='coordinates:fill_street_light_columns', after_load='spatial_index:after_load'),
+
+    Dataset('bridge_inspections', 'Bridge Inspections', 430, 'bridge_inspections', {
+        '縣市別': ('county_code', clean_text),
+        '縣市名稱': ('county_name', clean_text),
+        '檢測日期': ('inspection_date', clean_text),
+        '檢測單位': ('inspection_unit', clean_text),
+        '橋梁名稱': ('bridge_name', clean_text),
+    }, exact=True),
+
+    Dataset('road_noise', 'Road Noise', 302, 'road_noise_measurements',
+            loader='07_road_noise:scrape_road_noise'),
+
+    Dataset('sidewalks', 'Sidewalks', 280, 'sidewalks', {
+        '人行道最小調查單元流水號': ('survey_serial', clean_text),
+        '道路名稱': ('road_name', clean_text),
+        '道路起點': ('road_start', clean_text),
+        '道路迄點': ('road_end', clean_text),
+        '人行道方向': ('sidewalk_direction', clean_text),
+        '道路長度中心線長度公尺': ('road_centerline_length_m', safe_float),
+        '道路寬度包含雙向人行道公尺': ('road_width_with_sidewalks_m', safe_float),
+        '車道寬度不含人行道公尺': ('lane_width_without_sidewalks_m', safe_float),
+        '人行道長度公尺': ('sidewalk_length_m', safe_float),
+        '人行道總寬度公尺': ('sidewalk_total_width_m', safe_float),
+        '人行道公共設施帶寬度公尺': ('public_facility_belt_width_m', safe_float),
+        '行人通行總寬度公尺': ('pedestrian_passage_width_m', safe_float),
+        '人行道淨寬公尺': ('sidewalk_net_width_m', safe_float),
+        '鋪面類型': ('pavement_type', clean_text),
+        '人行道面積平方公尺': ('sidewalk_area_sqm', safe_float),
+    }, exact=True),
+
+    Dataset('youbike', 'YouBike Stations', 59, 'youbike_stations', {
+        '站點名稱': ('station_name', clean_text),
+        '站點位置': ('station_location', clean_text),
+        '緯度': ('latitude', safe_float),
+        '經度': ('longitude', safe_float),
+        '圖片': ('photo_url', clean_text),
+    }, exact=True),
+
+    Dataset('fire_hazards', 'Fire Hazards', 916, 'fire_hazard_locations', {
+        '縣市別代碼': ('county_code', clean_text),
+        '民國年月日': ('roc_date', clean_text),
+        '場所名稱': ('facility_name', clean_text),
+        '地址': ('address', clean_text),
+        '說明': ('description', clean_text),
+    }, exact=True),
+
+    Dataset('cctv', 'CCTV Cameras', 155, 'cctv_cameras', {
+        '機關代碼': ('agency_code', clean_text),
+        '縣市別代碼': ('county_code', clean_text),
+        '分局': ('precinct', clean_text),
+        '攝影機名稱': ('camera_name', clean_text),
+        '資料更新日期': ('update_date', clean_text),
+    }, exact=True),
+
+    Dataset('evacuation', 'Evacuation Guides', 909, 'evacuation_guides', {
+        '縣市別代碼': ('county_code', clean_text),
+        '地址-行政區域代碼': ('district_code', clean_text),
+        '民國年': ('roc_year', safe_int),
+        '區別說明': ('district_description', clean_text),
+        '網址': ('url', clean_text),
+    }, exact=True),
+
+    Dataset('land_prices', 'Land Prices', 842, 'land_prices', {
+        '新竹市代碼': ('city_code', clean_text),
+        '段代碼': ('section_code', clean_text),
+        '地段': ('land_section', clean_text),
+        '地號': ('lot_number', clean_text),
+        '公告現值台幣': ('announced_value_twd', safe_float),
+    }, exact=True),
+
+    Dataset('building_permits', 'Building Permits', 948, 'building_permits', {
+        '序號': ('serial_number', clean_text),
+        '執照字號': ('permit_number', clean_text),
+        '建築地點': ('building_location', clean_text),
+        '門牌地址': ('address', clean_text),
+        '地上層數': ('above_ground_floors', safe_int),
+        '地下層數': ('below_ground_floors', safe_int),
+        '戶數': ('unit_count', safe_int),
+        '總樓地板面積': ('total_floor_area', safe_float),
+        '建築物用途': ('building_use', clean_text),
+        '監造人': ('supervisor', clean_text),
+        '承造人': ('contractor', clean_text),
+        '供公眾': ('public_access', clean_text),
+        '土地使用分區': ('land_use_zone', clean_text),
+        '棟數': ('building_count', safe_int),
+        '核准日期': ('approval_date', clean_text),
+        '領照日期': ('permit_date', clean_text),
+        '構造種類': ('construction_type', clean_text),
+    }, exact=True),
+
+    Dataset('construction_projects', 'Construction Projects', 956, 'construction_projects', {
+        '序號': ('serial_number', clean_text),
+        '工程名稱': ('project_name', clean_text),
+        '營造廠名稱': ('contractor_name', clean_text),
+        '簽證技師或建築師': ('certifying_engineer', clean_text),
+        '工程地點': ('project_location', clean_text),
+        '工程性質': ('project_type', clean_text),
+        '工程金額': ('project_amount', safe_float),
+        '簽證日期': ('certification_date', clean_text),
+    }, category=12, exact=True),
+
+    Dataset('garbage_collection', 'Garbage Collection', 165, 'garbage_collection_routes', {
+        '縣市別代碼': ('county_code', clean_text),
+        '班別': ('shift', clean_text),
+        '清運路線名稱': ('route_name', clean_text),
+        '順序': ('sequence', safe_int),
+        '清潔公車停置地點': ('stop_location', clean_text),
+        '預估到達時間': ('estimated_arrival', clean_text),
+        '預估離開時間': ('estimated_departure', clean_text),
+        '停留時間': ('duration', clean_text),
+        '車號': ('vehicle_number', clean_text),
+        '駕駛': ('driver', clean_text),
+        '隨車人員': ('crew', clean_text),
+        '回收日_星期幾': ('collection_day', clean_text),
+    }, exact=True),
+
+    Dataset('air_quality', 'Air Quality', 157, 'air_quality_monitoring', {
+        '測站名稱': ('station_name', clean_text),
+        '測站編號': ('station_id', clean_text),
+        '懸浮微粒開始檢測日期': ('particle_start_date', clean_text),
+        '懸浮微粒結束檢測日期': ('particle_end_date', clean_text),
+        '天候': ('weather', clean_text),
+        'TSP.微克每立方公尺': ('tsp_ug_m3', safe_float),
+        'PM10.微克每立方公尺': ('pm10_ug_m3', safe_float),
+        '正己烷抽出物.微克每立方公尺': ('hexane_extract_ug_m3', safe_float),
+        '氯鹽.微克每立方公尺': ('chloride_ug_m3', safe_float),
+        '硝酸鹽.微克每立方公尺': ('nitrate_ug_m3', safe_float),
+        '硫酸鹽.微克每立方公尺': ('sulfate_ug_m3', safe_float),
+        '鉛.微克每立方公尺': ('lead_ug_m3', safe_float),
+        '落塵量開始檢測日期': ('dust_fall_start_date', clean_text),
+        '落塵量結束檢測日期': ('dust_fall_end_date', clean_text),
+        '落塵量.噸每平方公里每月': ('dust_fall_ton_km2_month', safe_float),
+        '備註': ('remarks', clean_text),
+    }, exact=True),
+
+    Dataset('special_foods', 'Special Foods', 1550, 'special_foods', {
+        '名稱': ('name', clean_text),
+        '網址': ('website', clean_text),
+        '電話': ('phone', clean_text),
+        '行政區': ('district', clean_text),
+        'AreaCode': ('area_code', clean_text),
+        '地址': ('address', clean_text),
+        '介紹': ('introduction', clean_text),
+    }, exact=True),
+]}
+
+
+_urls = None
+
+
+def source_url(key: str) -> str:
+    """Current download URL of a dataset, from data_urls.json"""
+    global _urls
+    if _urls is None:
+        _urls = json.loads(URLS_PATH.read_text(encoding='utf-8'))
+    url = _urls.get(key)
+    if not url:
+        raise KeyError(f"No download URL for {key} in {URLS_PATH.name} (run fetch_urls.py)")
+    return url
+
+
+def get(key: str) -> Dataset:
+    try:
+        return DATASETS[key]
+    except KeyError:
+        raise KeyError(f"Unknown dataset: {key} (known: {', '.join(DATASETS)})") from None
+
+
+def load(dataset: Union[str, Dataset], url: Optional[str] = None):
+    """
+    Download and load one dataset
+
+    Args:
+        dataset: Dataset key or spec
+        url: Download URL to use instead of the registered one (e.g. a local fixture)
+
+    Returns:
+        Whatever the loader returns; scrape_data gives (processed, written, errors)
+    """
+    spec = get(dataset) if isinstance(dataset, str) else dataset
+    url = url or spec.url
+    if spec.loader:
+        return spec.load_function()(url)
+    return scrape_data(url, spec.table, spec.columns, required_columns=list(spec.required_columns) or None,
+                       dataset=spec.key, exact=spec.exact, transform=spec.transform_function(),
+                       after_load=spec.after_load_function())
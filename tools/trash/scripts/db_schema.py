@@ -5,15 +5,328 @@ Creates all necessary tables in SQLite database
 
 import sqlite3
 import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
 
-# Database path
-DB_PATH = Path(__file__).parent.parent / "hsinchu_data.db"
+from orchestrator import POLL_INTERVAL, check_cancelled
+
+# Database path (HSINCHU_DB_PATH points scripts at another database, e.g. for benchmarks)
+DB_PATH = Path(os.environ.get('HSINCHU_DB_PATH') or Path(__file__).parent.parent / "hsinchu_data.db")
+
+# Seconds a connection waits for the write lock held by another scraper
+DB_TIMEOUT = 60
+
+# Database of the current thread/context when set by use_database()
+_database: ContextVar = ContextVar('database', default=None)
+
+# One writer per database file: loads in this process queue on these locks
+_write_locks = {}
+_write_locks_guard = threading.Lock()
+
+
+def database_path() -> Path:
+    """Database that get_connection() opens in the current context"""
+    return _database.get() or DB_PATH
+
+
+@contextmanager
+def use_database(path):
+    """
+    Point get_connection() at another database file for the current context
+
+    Scrapers running in different threads can each load into their own
+    database, e.g. one scratch database per dataset in the test harness.
+    """
+    token = _database.set(Path(path))
+    try:
+        yield Path(path)
+    finally:
+        _database.reset(token)
+
+
+# Natural key of each loaded table: the columns identifying a source record
+# across reloads (see table_sync.TableSync). Keys need not be unique in the
+# source; rows sharing a key are matched one to one.
+NATURAL_KEYS = {
+    'population_age_by_neighborhood': ('report_year_month', 'district', 'neighborhood', 'age_group'),
+    'parks': ('park_id',),
+    'playgrounds': ('serial_number', 'park_name'),
+    'public_toilets': ('toilet_id',),
+    'street_lights': ('light_code',),
+    'bridge_inspections': ('bridge_name', 'inspection_date'),
+    'road_noise_monitoring_stations': ('station_id',),
+    'road_noise_measurements': ('station_id', 'measurement_year', 'measurement_month', 'measurement_day'),
+    'sidewalks': ('survey_serial',),
+    'youbike_stations': ('station_name',),
+    'fire_hazard_locations': ('facility_name', 'address'),
+    'cctv_cameras': ('agency_code', 'camera_name'),
+    'evacuation_guides': ('district_code', 'roc_year'),
+    'land_prices': ('section_code', 'lot_number'),
+    'building_permits': ('permit_number',),
+    'construction_projects': ('project_name', 'certification_date'),
+    'garbage_collection_routes': ('route_name', 'shift', 'collection_day', 'sequence'),
+    'air_quality_monitoring': ('station_id', 'particle_start_date'),
+    'special_foods': ('name', 'address'),
+}
+
+
+# Connection profile for ETL loads: WAL so readers aren't blocked, fsync only
+# at checkpoints, a 64 MB page cache, memory-mapped I/O and in-memory temp
+# tables. Durability of the last transaction is traded for insert speed,
+# which is fine for data that can be re-downloaded.
+BULK_LOAD_PRAGMAS = [
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('cache_size', -64000),
+    ('mmap_size', 256 * 1024 * 1024),
+    ('temp_store', 'MEMORY'),
+]
+
+
+# Run history written by run_all.py (see etl_history.py): one etl_runs row per
+# pipeline run, one etl_dataset_runs row per dataset in it. Stage columns hold
+# wall seconds per timing.STAGES stage.
+ETL_HISTORY_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS etl_runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        started_at TIMESTAMP NOT NULL,
+        finished_at TIMESTAMP,
+        duration_s REAL,
+        status TEXT NOT NULL DEFAULT 'running',
+        workers INTEGER,
+        forced INTEGER DEFAULT 0,
+        datasets_total INTEGER DEFAULT 0,
+        datasets_failed INTEGER DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS etl_dataset_runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        run_id INTEGER NOT NULL,
+        dataset TEXT NOT NULL,
+        name TEXT,
+        status TEXT NOT NULL,
+        error TEXT,
+        started_at TIMESTAMP,
+        finished_at TIMESTAMP,
+        duration_s REAL,
+        resolve_s REAL,
+        download_s REAL,
+        parse_s REAL,
+        map_s REAL,
+        convert_s REAL,
+        insert_s REAL,
+        commit_s REAL,
+        cpu_s REAL,
+        bytes_downloaded INTEGER,
+        rows_in INTEGER,
+        rows_out INTEGER,
+        rows_rejected INTEGER,
+        content_hash TEXT,
+        content_changed INTEGER,
+        peak_rss_mb REAL,
+        FOREIGN KEY (run_id) REFERENCES etl_runs(id) ON DELETE CASCADE
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_etl_dataset_runs_dataset ON etl_dataset_runs(dataset, run_id)",
+]
+
+
+# The version of each dataset's source file (its SHA-256) last loaded into this
+# database. Written in the load's own transaction, so it never outlives the
+# data, e.g. when the database is deleted or recreated.
+DATASET_LOADS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS dataset_loads (
+        dataset TEXT PRIMARY KEY,
+        sha256 TEXT NOT NULL,
+        loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+# R*Tree over the WGS84 position of each street light (see spatial_index.py),
+# keyed by street_lights.id. Triggers keep it in step with in-place writes;
+# a staging swap replaces every id, so the loader rebuilds it after one.
+STREET_LIGHTS_RTREE_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS street_lights_rtree
+    USING rtree(id, min_lat, max_lat, min_lon, max_lon)
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS street_lights_rtree_insert AFTER INSERT ON street_lights
+    WHEN NEW.wgs84_latitude IS NOT NULL AND NEW.wgs84_longitude IS NOT NULL
+    BEGIN
+        INSERT INTO street_lights_rtree VALUES (
+            NEW.id, NEW.wgs84_latitude, NEW.wgs84_latitude, NEW.wgs84_longitude, NEW.wgs84_longitude);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS street_lights_rtree_update
+    AFTER UPDATE OF id, wgs84_latitude, wgs84_longitude ON street_lights
+    BEGIN
+        DELETE FROM street_lights_rtree WHERE id = OLD.id;
+        INSERT INTO street_lights_rtree
+        SELECT NEW.id, NEW.wgs84_latitude, NEW.wgs84_latitude, NEW.wgs84_longitude, NEW.wgs84_longitude
+        WHERE NEW.wgs84_latitude IS NOT NULL AND NEW.wgs84_longitude IS NOT NULL;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS street_lights_rtree_delete AFTER DELETE ON street_lights
+    BEGIN
+        DELETE FROM street_lights_rtree WHERE id = OLD.id;
+    END
+    """,
+]
+
+
+# Sortable date key of road_noise_measurements, filled from the year / month /
+# day columns (ROC years before 1911 are converted); stays NULL for dates that
+# do not exist, which date(..., '+0 days') rolls over into the next month
+ROAD_NOISE_DATE_INDEX = """
+    CREATE INDEX IF NOT EXISTS idx_road_noise_station_date
+    ON road_noise_measurements(station_id, measurement_date)
+"""
+
+_ROAD_NOISE_DATE_SQL = """
+    printf('%04d-%02d-%02d',
+           measurement_year + CASE WHEN measurement_year < 1911 THEN 1911 ELSE 0 END,
+           measurement_month, measurement_day)
+"""
 
 
-def get_connection():
-    """Get database connection"""
-    return sqlite3.connect(DB_PATH)
+def fill_road_noise_dates(conn, table: str = 'road_noise_measurements') -> int:
+    """Set measurement_date on rows that don't have one yet; returns the rows updated"""
+    return conn.execute(f"""
+        UPDATE {table}
+        SET measurement_date = CASE WHEN date({_ROAD_NOISE_DATE_SQL}, '+0 days') = {_ROAD_NOISE_DATE_SQL}
+                                    THEN {_ROAD_NOISE_DATE_SQL} END
+        WHERE measurement_date IS NULL
+          AND measurement_year IS NOT NULL AND measurement_month IS NOT NULL AND measurement_day IS NOT NULL
+    """).rowcount
+
+
+def ensure_road_noise_dates(conn):
+    """Add, fill and index measurement_date in databases initialised before it existed"""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(road_noise_measurements)")]
+    if 'measurement_date' not in columns:
+        conn.execute("ALTER TABLE road_noise_measurements ADD COLUMN measurement_date TEXT")
+        fill_road_noise_dates(conn)
+    conn.execute(ROAD_NOISE_DATE_INDEX)
+
+
+# Road noise tables derived from road_noise_measurements (see noise_indicators.py):
+# the hourly readings in long form, one row per station, date and hour, and
+# energy-averaged indicators per station-day and station-month. Dates are ISO
+# 'YYYY-MM-DD', months 'YYYY-MM'; levels are dB(A).
+NOISE_INDICATOR_COLUMNS = """
+        hours INTEGER NOT NULL,
+        leq_24h REAL,
+        leq_day REAL,
+        leq_evening REAL,
+        leq_night REAL,
+        ldn REAL,
+        lden REAL,
+        loudest_hour INTEGER,
+        loudest_hour_db REAL
+"""
+
+ROAD_NOISE_DERIVED_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS road_noise_hourly (
+        station_id TEXT NOT NULL,
+        measurement_date TEXT NOT NULL,
+        hour INTEGER NOT NULL,
+        level_db REAL NOT NULL,
+        PRIMARY KEY (station_id, measurement_date, hour)
+    ) WITHOUT ROWID
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS road_noise_daily (
+        station_id TEXT NOT NULL,
+        measurement_date TEXT NOT NULL,{NOISE_INDICATOR_COLUMNS},
+        PRIMARY KEY (station_id, measurement_date)
+    ) WITHOUT ROWID
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS road_noise_monthly (
+        station_id TEXT NOT NULL,
+        month TEXT NOT NULL,
+        days INTEGER NOT NULL,{NOISE_INDICATOR_COLUMNS},
+        PRIMARY KEY (station_id, month)
+    ) WITHOUT ROWID
+    """,
+]
+
+
+def apply_bulk_load_pragmas(conn):
+    """Switch a connection to the bulk-load profile"""
+    for name, value in BULK_LOAD_PRAGMAS:
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+def get_connection(profile='read'):
+    """
+    Get database connection
+
+    Args:
+        profile: 'read' for SQLite defaults, 'bulk' for the ETL load profile
+    """
+    conn = sqlite3.connect(database_path(), timeout=DB_TIMEOUT)
+    if profile == 'bulk':
+        apply_bulk_load_pragmas(conn)
+    return conn
+
+
+def write_lock(path=None) -> threading.Lock:
+    """The lock that writers of a database file (default: the current one) hold in this process"""
+    path = Path(path or database_path()).resolve()
+    with _write_locks_guard:
+        return _write_locks.setdefault(path, threading.Lock())
+
+
+@contextmanager
+def writing(profile='bulk'):
+    """
+    A connection that holds the database's write lock until the block exits
+
+    Loads into one database run one at a time: threads of this process queue
+    on write_lock(), other processes on BEGIN IMMEDIATE and DB_TIMEOUT. A
+    deferred transaction that reads before it writes gets "database is
+    locked" straight away when another writer got in first, whatever the
+    timeout. Whatever the block did not commit is rolled back. A job that
+    times out while queued gives up its turn (orchestrator.check_cancelled()).
+    """
+    lock = write_lock()
+    while not lock.acquire(timeout=POLL_INTERVAL):
+        check_cancelled()
+    try:
+        check_cancelled()
+        conn = get_connection(profile)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+        finally:
+            conn.rollback()
+            conn.close()
+    finally:
+        lock.release()
+
+
+@contextmanager
+def reading(conn=None):
+    """The given connection, or a new read connection that is closed afterwards"""
+    if conn is not None:
+        yield conn
+        return
+    conn = get_connection()
+    try:
+        yield conn
+    finally:
+        conn.close()
 
 
 def create_tables():
@@ -38,6 +351,7 @@ def create_tables():
         total_count INTEGER,
         report_year_month TEXT,
         data_date DATE,
+        row_hash TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
@@ -60,6 +374,7 @@ def create_tables():
         population_served INTEGER,
         area_hectares REAL,
         remarks TEXT,
+        row_hash TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
@@ -74,6 +389,7 @@ def create_tables():
         park_name TEXT NOT NULL,
         district TEXT,
         area_code TEXT,
+        row_hash TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
@@ -104,6 +420,7 @@ def create_tables():
         county_code TEXT,
         district_code TEXT,
         village_name TEXT,
+        row_hash TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
@@ -130,12 +447,17 @@ def create_tables():
         twd97_y REAL,
         wgs84_longitude REAL,
         wgs84_latitude REAL,
+        row_hash TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
     """)
     print("✓ Created street_lights")
 
+    for statement in STREET_LIGHTS_RTREE_SCHEMA:
+        cursor.execute(statement)
+    print("✓ Created street_lights_rtree")
+
     # 6. Bridge Inspections
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS bridge_inspections (
@@ -145,6 +467,7 @@ def create_tables():
         inspection_date DATE,
         inspection_unit TEXT,
         bridge_name TEXT,
+        row_hash TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
@@ -159,6 +482,7 @@ def create_tables():
         station_name TEXT NOT NULL,
         road_width REAL,
         control_zone TEXT,
+        row_hash TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
@@ -172,6 +496,7 @@ def create_tables():
         measurement_year INTEGER,
         measurement_month INTEGER,
         measurement_day INTEGER,
+        measurement_date TEXT,
         hour_00_01 REAL,
         hour_01_02 REAL,
         hour_02_03 REAL,
@@ -196,12 +521,17 @@ def create_tables():
         hour_21_22 REAL,
         hour_22_23 REAL,
         hour_23_24 REAL,
+        row_hash TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         FOREIGN KEY(station_id) REFERENCES road_noise_monitoring_stations(station_id) ON DELETE CASCADE
     )
     """)
     print("✓ Created road_noise_measurements")
 
+    for statement in ROAD_NOISE_DERIVED_SCHEMA:
+        cursor.execute(statement)
+    print("✓ Created road_noise_hourly, road_noise_daily, road_noise_monthly")
+
     # 8. Sidewalks
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS sidewalks (
@@ -221,6 +551,7 @@ def create_tables():
         sidewalk_net_width_m REAL,
         pavement_type TEXT,
         sidewalk_area_sqm REAL,
+        row_hash TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
@@ -236,6 +567,7 @@ def create_tables():
         latitude REAL,
         longitude REAL,
         photo_url TEXT,
+        row_hash TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
@@ -251,6 +583,7 @@ def create_tables():
         facility_name TEXT NOT NULL,
         address TEXT,
         description TEXT,
+        row_hash TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
@@ -266,6 +599,7 @@ def create_tables():
         precinct TEXT,
         camera_name TEXT NOT NULL,
         update_date DATE,
+        row_hash TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
@@ -281,6 +615,7 @@ def create_tables():
         roc_year INTEGER,
         district_description TEXT,
         url TEXT,
+        row_hash TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
@@ -296,6 +631,7 @@ def create_tables():
         land_section TEXT,
         lot_number TEXT,
         announced_value_twd REAL,
+        row_hash TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
@@ -323,6 +659,7 @@ def create_tables():
         approval_date DATE,
         permit_date DATE,
         construction_type TEXT,
+        row_hash TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
@@ -341,6 +678,7 @@ def create_tables():
         project_type TEXT,
         project_amount REAL,
         certification_date DATE,
+        row_hash TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
@@ -363,6 +701,7 @@ def create_tables():
         driver TEXT,
         crew TEXT,
         collection_day TEXT,
+        row_hash TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
@@ -389,6 +728,7 @@ def create_tables():
         dust_fall_end_date DATE,
         dust_fall_ton_km2_month REAL,
         remarks TEXT,
+        row_hash TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
@@ -406,6 +746,7 @@ def create_tables():
         area_code TEXT,
         address TEXT,
         introduction TEXT,
+        row_hash TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
@@ -421,13 +762,22 @@ def create_tables():
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_youbike_station_name ON youbike_stations(station_name)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_building_permits_district ON building_permits(building_location)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_special_foods_district ON special_foods(district)")
+    cursor.execute(ROAD_NOISE_DATE_INDEX)
 
     print("✓ Created indexes")
 
+    # ETL run history
+    for statement in ETL_HISTORY_SCHEMA:
+        cursor.execute(statement)
+    print("✓ Created etl_runs, etl_dataset_runs")
+
+    cursor.execute(DATASET_LOADS_SCHEMA)
+    print("✓ Created dataset_loads")
+
     conn.commit()
     conn.close()
 
-    print(f"\n✅ Database initialized successfully at: {DB_PATH}")
+    print(f"\n✅ Database initialized successfully at: {database_path()}")
     print(f"📊 Total tables created: 18")
 
 
@@ -443,9 +793,13 @@ def drop_all_tables():
         'playground_facilities',
         'public_toilets',
         'street_lights',
+        'street_lights_rtree',
         'bridge_inspections',
         'road_noise_monitoring_stations',
         'road_noise_measurements',
+        'road_noise_hourly',
+        'road_noise_daily',
+        'road_noise_monthly',
         'sidewalks',
         'youbike_stations',
         'fire_hazard_locations',
@@ -456,7 +810,10 @@ def drop_all_tables():
         'construction_projects',
         'garbage_collection_routes',
         'air_quality_monitoring',
-        'special_foods'
+        'special_foods',
+        'etl_dataset_runs',
+        'etl_runs',
+        'dataset_loads'
     ]
 
     for table in tables:
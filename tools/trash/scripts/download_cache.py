@@ -0,0 +1,178 @@
+"""
+Content-addressed download cache with conditional requests
+Stores each dataset's file under its SHA-256 and remembers ETag/Last-Modified
+so unchanged portal files cost a 304 round trip instead of a full download
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import requests
+
+import timing
+from http_client import DownloadClient, get_client
+
+logger = logging.getLogger(__name__)
+
+# Cache location (next to the database; HSINCHU_CACHE_DIR moves the whole .cache tree)
+CACHE_DIR = Path(os.environ.get('HSINCHU_CACHE_DIR') or Path(__file__).parent.parent / ".cache") / "downloads"
+
+
+@dataclass
+class Download:
+    """A dataset file as seen by the cache"""
+    dataset: str
+    url: str
+    sha256: str
+    path: Path
+    changed: bool  # differs from the version the database last loaded (or a reload was forced)
+    not_modified: bool = False  # server answered 304
+
+    @property
+    def content(self) -> bytes:
+        return self.path.read_bytes()
+
+    @property
+    def size(self) -> int:
+        return self.path.stat().st_size
+
+
+def _write_atomic(path: Path, data: bytes):
+    """Write to a temp file in the same directory, then rename over the target"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class DownloadCache:
+    """
+    On-disk cache keyed by dataset name and content hash
+
+    Layout:
+        <cache_dir>/<dataset>.json      validators and current hash
+
+    Which version a database holds is recorded in that database
+    (dataset_loads, see utils.download_dataset), not here, so one cache can
+    serve any number of databases.
+        <cache_dir>/blobs/<sha256>      file contents
+    """
+
+    def __init__(self, cache_dir: Path = CACHE_DIR, client: Optional[DownloadClient] = None):
+        self.cache_dir = Path(cache_dir)
+        self.blob_dir = self.cache_dir / "blobs"
+        self.client = client
+
+    def _meta_path(self, dataset: str) -> Path:
+        return self.cache_dir / f"{dataset}.json"
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.blob_dir / sha256
+
+    def load_meta(self, dataset: str) -> dict:
+        path = self._meta_path(dataset)
+        if not path.exists():
+            return {}
+        try:
+            return json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            logger.warning(f"Ignoring unreadable cache metadata: {path}")
+            return {}
+
+    def _save_meta(self, dataset: str, meta: dict):
+        data = json.dumps(meta, ensure_ascii=False, indent=2).encode('utf-8')
+        _write_atomic(self._meta_path(dataset), data)
+
+    def _release_blob(self, sha256: str, dataset: str):
+        """Delete a blob no other dataset points at"""
+        for meta_path in self.cache_dir.glob('*.json'):
+            if meta_path.stem != dataset and self.load_meta(meta_path.stem).get('sha256') == sha256:
+                return
+        self.blob_path(sha256).unlink(missing_ok=True)
+
+    def fetch(self, dataset: str, url: str, timeout: int = 30, loaded: Optional[str] = None,
+              force: bool = False) -> Optional[Download]:
+        """
+        Download a dataset file, revalidating any cached copy
+
+        Args:
+            dataset: Dataset name, used as the cache key
+            url: Source URL
+            timeout: Request timeout in seconds
+            loaded: SHA-256 of the version the database holds, if any
+            force: Report the file as changed even if it was loaded before
+
+        Returns:
+            Download, or None if the request failed
+        """
+        with timing.stage('resolve'):
+            meta = self.load_meta(dataset)
+            cached_sha = meta.get('sha256')
+            have_blob = bool(cached_sha) and self.blob_path(cached_sha).exists()
+
+            headers = {}
+            if have_blob and meta.get('url') == url:
+                if meta.get('etag'):
+                    headers['If-None-Match'] = meta['etag']
+                if meta.get('last_modified'):
+                    headers['If-Modified-Since'] = meta['last_modified']
+
+        with timing.stage('download') as counter:
+            client = self.client or get_client()
+            try:
+                response = client.get(url, timeout=timeout, headers=headers)
+            except requests.RequestException as e:
+                logger.error(f"Failed to download from {url}: {e}")
+                return None
+
+            not_modified = response.status_code == 304 and have_blob
+            if not_modified:
+                sha256 = cached_sha
+                logger.info(f"{dataset}: not modified on server, using cached copy")
+            else:
+                content = response.content
+                counter.bytes = len(content)
+                sha256 = hashlib.sha256(content).hexdigest()
+                if not self.blob_path(sha256).exists():
+                    _write_atomic(self.blob_path(sha256), content)
+                if cached_sha and cached_sha != sha256:
+                    self._release_blob(cached_sha, dataset)
+
+        meta.update({
+            'url': url,
+            'sha256': sha256,
+            'etag': response.headers.get('ETag', meta.get('etag') if not_modified else None),
+            'last_modified': response.headers.get(
+                'Last-Modified', meta.get('last_modified') if not_modified else None),
+            'fetched_at': datetime.now().isoformat(timespec='seconds'),
+        })
+        self._save_meta(dataset, meta)
+
+        changed = force or sha256 != loaded
+        return Download(dataset, url, sha256, self.blob_path(sha256), changed, not_modified)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> DownloadCache:
+    """Return the process-wide download cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DownloadCache()
+        return _cache
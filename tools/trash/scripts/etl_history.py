@@ -0,0 +1,267 @@
+"""
+ETL run history
+Records every run_all.py run and its per-dataset metrics in etl_runs /
+etl_dataset_runs, and reports trends and outliers from them
+
+Usage:
+    uv run python scripts/etl_history.py runs --limit 10
+    uv run python scripts/etl_history.py trends --dataset street_lights
+    uv run python scripts/etl_history.py check --threshold 0.5
+"""
+
+import argparse
+import logging
+import statistics
+import sys
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+import timing
+from db_schema import ETL_HISTORY_SCHEMA, get_connection, write_lock
+
+logger = logging.getLogger(__name__)
+
+STAGE_COLUMNS = [f"{stage}_s" for stage in timing.STAGES]
+
+# Metrics compared by check(): a change beyond the threshold is flagged
+CHECKED_METRICS = ['duration_s', 'rows_in']
+
+DEFAULT_THRESHOLD = 0.5
+DEFAULT_WINDOW = 5
+
+
+def ensure_tables(conn):
+    """Create the history tables in databases initialised before they existed"""
+    for statement in ETL_HISTORY_SCHEMA:
+        conn.execute(statement)
+    conn.commit()
+
+
+def _now() -> str:
+    return datetime.now().isoformat(sep=' ', timespec='seconds')
+
+
+class RunHistory:
+    """
+    Writes one pipeline run to the history tables
+
+    Usage:
+        history = RunHistory(workers=8)
+        for result in run_jobs(jobs):
+            history.record(result, dataset)
+        history.finish()
+
+    Each record() is committed on its own short transaction as soon as no
+    load holds the database's write lock, so the history of a run that dies
+    half-way still shows the datasets that finished. record() never waits for
+    the lock (the caller is usually the loop watching the jobs' timeouts);
+    finish() writes whatever is still pending.
+
+    Args:
+        workers: Worker pool size of the run
+        forced: Whether unchanged datasets were reloaded anyway
+        conn: Connection to use (defaults to the pipeline database)
+    """
+
+    def __init__(self, workers: Optional[int] = None, forced: bool = False, conn=None):
+        self.conn = conn or get_connection()
+        self.started = datetime.now()
+        self.total = 0
+        self.failed = 0
+        self.pending = []
+        with write_lock():
+            ensure_tables(self.conn)
+            self.run_id = self.conn.execute(
+                "INSERT INTO etl_runs (started_at, workers, forced) VALUES (?, ?, ?)",
+                (self.started.isoformat(sep=' ', timespec='seconds'), workers, int(forced))
+            ).lastrowid
+            self.conn.commit()
+
+    def record(self, result, dataset: str):
+        """
+        Store one orchestrator JobResult
+
+        Successful jobs carry the dataset's timing.RunTimer as their result;
+        failed and timed-out jobs only have their status and duration.
+        """
+        timer = result.result if isinstance(result.result, timing.RunTimer) else None
+        total = timer.events[-1] if timer and timer.events else None
+        attrs = total.attrs if total else {}
+        finished = datetime.now()
+
+        row = {
+            'run_id': self.run_id,
+            'dataset': dataset,
+            'name': result.name,
+            'status': result.status,
+            'error': result.error,
+            'started_at': (finished - timedelta(seconds=result.duration)).isoformat(sep=' ', timespec='seconds'),
+            'finished_at': finished.isoformat(sep=' ', timespec='seconds'),
+            'duration_s': round(result.duration, 3),
+            'cpu_s': round(total.cpu_s, 3) if total else None,
+            'bytes_downloaded': total.bytes if total else None,
+            'rows_in': attrs.get('rows_in'),
+            'rows_out': attrs.get('rows_out'),
+            'rows_rejected': attrs.get('rows_rejected'),
+            'content_hash': attrs.get('content_hash'),
+            'content_changed': int(attrs['content_changed']) if 'content_changed' in attrs else None,
+            'peak_rss_mb': attrs.get('peak_rss_mb'),
+        }
+        if timer:
+            for stage, column in zip(timing.STAGES, STAGE_COLUMNS):
+                if stage in timer.stages:
+                    row[column] = round(timer.stages[stage].wall_s, 3)
+
+        self.total += 1
+        if not result.ok:
+            self.failed += 1
+
+        self.pending.append(row)
+        self._flush(wait=False)
+
+    def _flush(self, wait: bool):
+        """Write the pending rows; without wait, leave them pending while a load is writing"""
+        lock = write_lock()
+        if not lock.acquire(blocking=wait):
+            return
+        try:
+            for row in self.pending:
+                self.conn.execute(
+                    f"INSERT INTO etl_dataset_runs ({', '.join(row)}) VALUES ({', '.join('?' for _ in row)})",
+                    list(row.values())
+                )
+            self.conn.commit()
+            self.pending.clear()
+        finally:
+            lock.release()
+
+    def finish(self):
+        """Close the run with its totals and overall status"""
+        self._flush(wait=True)
+        with write_lock():
+            self.conn.execute("""
+                UPDATE etl_runs
+                SET finished_at = ?, duration_s = ?, status = ?, datasets_total = ?, datasets_failed = ?
+                WHERE id = ?
+            """, (_now(), round((datetime.now() - self.started).total_seconds(), 3),
+                  'success' if not self.failed else 'failed', self.total, self.failed, self.run_id))
+            self.conn.commit()
+        self.conn.close()
+
+
+def recent_runs(conn, limit: int = 10) -> List[tuple]:
+    return conn.execute("""
+        SELECT id, started_at, duration_s, status, datasets_total, datasets_failed, forced
+        FROM etl_runs ORDER BY id DESC LIMIT ?
+    """, (limit,)).fetchall()
+
+
+def dataset_trend(conn, dataset: str, limit: int = 10) -> List[tuple]:
+    return conn.execute("""
+        SELECT run_id, started_at, status, duration_s, download_s, parse_s, insert_s,
+               bytes_downloaded, rows_in, rows_out, rows_rejected, content_changed, peak_rss_mb
+        FROM etl_dataset_runs WHERE dataset = ? ORDER BY run_id DESC LIMIT ?
+    """, (dataset, limit)).fetchall()
+
+
+def check(conn, threshold: float = DEFAULT_THRESHOLD, window: int = DEFAULT_WINDOW) -> List[str]:
+    """
+    Compare each dataset's latest load with the median of its previous loads
+
+    Only successful runs that actually loaded new content are compared;
+    skipped (unchanged) runs would make every real load look slow.
+
+    Args:
+        threshold: Relative change that gets flagged, e.g. 0.5 for +/-50%
+        window: Number of earlier loads the median is taken over
+
+    Returns:
+        List of messages, one per flagged metric
+    """
+    flagged = []
+    datasets = [row[0] for row in conn.execute("SELECT DISTINCT dataset FROM etl_dataset_runs ORDER BY dataset")]
+    for dataset in datasets:
+        rows = conn.execute(f"""
+            SELECT run_id, {', '.join(CHECKED_METRICS)} FROM etl_dataset_runs
+            WHERE dataset = ? AND status = 'success' AND content_changed = 1
+            ORDER BY run_id DESC LIMIT ?
+        """, (dataset, window + 1)).fetchall()
+        if len(rows) < 2:
+            continue
+
+        latest, previous = rows[0], rows[1:]
+        for i, metric in enumerate(CHECKED_METRICS, 1):
+            history = [row[i] for row in previous if row[i] is not None]
+            if latest[i] is None or not history:
+                continue
+            median = statistics.median(history)
+            if not median:
+                continue
+            change = (latest[i] - median) / median
+            if abs(change) > threshold:
+                flagged.append(f"{dataset}: {metric} {latest[i]} vs median {median} ({change:+.0%}, run {latest[0]})")
+    return flagged
+
+
+def _fmt(value, spec: str = '') -> str:
+    return '-' if value is None else format(value, spec)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Show ETL run history and flag unusual loads')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    runs = commands.add_parser('runs', help='List recent pipeline runs')
+    runs.add_argument('--limit', type=int, default=10)
+
+    trends = commands.add_parser('trends', help='Per-dataset history of recent runs')
+    trends.add_argument('--dataset', nargs='+', help='Datasets to show (default: all)')
+    trends.add_argument('--limit', type=int, default=10)
+
+    checker = commands.add_parser('check', help='Flag datasets whose duration or row count moved')
+    checker.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                         help=f'Relative change to flag (default: {DEFAULT_THRESHOLD})')
+    checker.add_argument('--window', type=int, default=DEFAULT_WINDOW,
+                         help=f'Earlier loads to take the median over (default: {DEFAULT_WINDOW})')
+    args = parser.parse_args(argv)
+
+    conn = get_connection()
+    ensure_tables(conn)
+    try:
+        if args.command == 'runs':
+            print(f"{'run':>5}  {'started':<20}{'duration':>10}  {'status':<9}{'datasets':>9}{'failed':>8}")
+            for run_id, started, duration, status, total, failed, forced in recent_runs(conn, args.limit):
+                print(f"{run_id:>5}  {started:<20}{_fmt(duration, '.1f'):>10}  {status:<9}{total:>9}{failed:>8}"
+                      f"{'  (forced)' if forced else ''}")
+            return 0
+
+        if args.command == 'trends':
+            datasets = args.dataset or [row[0] for row in conn.execute(
+                "SELECT DISTINCT dataset FROM etl_dataset_runs ORDER BY dataset")]
+            for dataset in datasets:
+                print(f"\n{dataset}")
+                print(f"{'run':>5}  {'started':<20}{'status':<9}{'total s':>9}{'dl s':>8}{'parse s':>9}"
+                      f"{'insert s':>10}{'bytes':>12}{'in':>9}{'out':>9}{'rej':>6}{'RSS MB':>8}")
+                for (run_id, started, status, duration, download_s, parse_s, insert_s, size,
+                     rows_in, rows_out, rejected, changed, rss) in dataset_trend(conn, dataset, args.limit):
+                    status = 'skipped' if status == 'success' and changed == 0 else status
+                    print(f"{run_id:>5}  {started or '-':<20}{status:<9}{_fmt(duration, '.1f'):>9}"
+                          f"{_fmt(download_s, '.1f'):>8}{_fmt(parse_s, '.1f'):>9}{_fmt(insert_s, '.1f'):>10}"
+                          f"{_fmt(size):>12}{_fmt(rows_in):>9}{_fmt(rows_out):>9}{_fmt(rejected):>6}"
+                          f"{_fmt(rss, '.0f'):>8}")
+            return 0
+
+        flagged = check(conn, args.threshold, args.window)
+        if flagged:
+            print(f"⚠️  {len(flagged)} metrics moved more than {args.threshold:.0%}:")
+            for message in flagged:
+                print(f"  {message}")
+            return 1
+        print(f"✅ No dataset moved more than {args.threshold:.0%} against its last {args.window} loads")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
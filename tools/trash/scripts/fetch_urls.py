@@ -8,28 +8,12 @@ import requests
 from bs4 import BeautifulSoup
 import json
 
+from datasets import DATASETS, URLS_PATH
+
 BASE_URL = "https://opendata.hccg.gov.tw"
 
-# Map of data source names to their page URLs
-DATA_SOURCES = {
-    "parks": "https://opendata.hccg.gov.tw/OpenDataDetail.aspx?n=1&s=71",
-    "playgrounds": "https://opendata.hccg.gov.tw/OpenDataDetail.aspx?n=13&s=571",
-    "public_toilets": "https://opendata.hccg.gov.tw/OpenDataDetail.aspx?n=1&s=904",
-    "street_lights": "https://opendata.hccg.gov.tw/OpenDataDetail.aspx?n=1&s=159",
-    "bridge_inspections": "https://opendata.hccg.gov.tw/OpenDataDetail.aspx?n=1&s=430",
-    "road_noise": "https://opendata.hccg.gov.tw/OpenDataDetail.aspx?n=1&s=302",
-    "sidewalks": "https://opendata.hccg.gov.tw/OpenDataDetail.aspx?n=1&s=280",
-    "youbike": "https://opendata.hccg.gov.tw/OpenDataDetail.aspx?n=1&s=59",
-    "fire_hazards": "https://opendata.hccg.gov.tw/OpenDataDetail.aspx?n=1&s=916",
-    "cctv": "https://opendata.hccg.gov.tw/OpenDataDetail.aspx?n=1&s=155",
-    "evacuation": "https://opendata.hccg.gov.tw/OpenDataDetail.aspx?n=1&s=909",
-    "land_prices": "https://opendata.hccg.gov.tw/OpenDataDetail.aspx?n=1&s=842",
-    "building_permits": "https://opendata.hccg.gov.tw/OpenDataDetail.aspx?n=1&s=948",
-    "construction_projects": "https://opendata.hccg.gov.tw/OpenDataDetail.aspx?n=12&s=956",
-    "garbage_collection": "https://opendata.hccg.gov.tw/OpenDataDetail.aspx?n=1&s=165",
-    "air_quality": "https://opendata.hccg.gov.tw/OpenDataDetail.aspx?n=1&s=157",
-    "special_foods": "https://opendata.hccg.gov.tw/OpenDataDetail.aspx?n=1&s=1550",
-}
+# Detail page of every registered dataset
+DATA_SOURCES = {key: spec.page for key, spec in DATASETS.items()}
 
 
 def fetch_csv_url(page_url):
@@ -93,7 +77,7 @@ def fetch_all_urls():
     return urls
 
 
-def save_urls_to_file(urls, filename="data_urls.json"):
+def save_urls_to_file(urls, filename=URLS_PATH):
     """Save URLs to JSON file"""
     with open(filename, 'w', encoding='utf-8') as f:
         json.dump(urls, f, indent=2, ensure_ascii=False)
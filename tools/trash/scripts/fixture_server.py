@@ -0,0 +1,143 @@
+"""
+Local stand-in for the open data portal
+Serves in-memory or on-disk fixture files over HTTP so downloads can be
+exercised and measured without network access
+"""
+
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional
+
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    """Serves server.files[path]; honours keep-alive and ETag revalidation"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        server.record_request(self)
+
+        body = server.lookup(self.path)
+        if body is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        if server.latency:
+            time.sleep(server.latency)
+
+        etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+        if self.headers.get('If-None-Match') == etag:
+            server.record_not_modified()
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep benchmark and harness output quiet
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, files, latency):
+        super().__init__(address, _FixtureHandler)
+        self.files = files
+        self.latency = latency
+        self.request_count = 0
+        self.not_modified_count = 0
+        self.connections = set()
+        self._stats_lock = threading.Lock()
+
+    def lookup(self, path: str) -> Optional[bytes]:
+        # Match on the path only; portal URLs carry opaque query strings
+        return self.files.get(path.split('?', 1)[0].lstrip('/'))
+
+    def record_request(self, handler):
+        with self._stats_lock:
+            self.request_count += 1
+            self.connections.add(handler.client_address)
+
+    def record_not_modified(self):
+        with self._stats_lock:
+            self.not_modified_count += 1
+
+
+class FixtureServer:
+    """
+    HTTP server on 127.0.0.1 serving fixture files by name
+
+    Usage:
+        with FixtureServer({'parks.xlsx': data}, latency=0.05) as server:
+            content = download_file(server.url('parks.xlsx'))
+
+    Args:
+        files: Mapping of file name to bytes
+        directory: Directory whose files are served by name (merged into files)
+        latency: Seconds to sleep before each response, to mimic the portal
+    """
+
+    def __init__(self, files: Optional[Dict[str, bytes]] = None, directory: Optional[Path] = None,
+                 latency: float = 0.0):
+        files = dict(files or {})
+        if directory:
+            for path in Path(directory).iterdir():
+                if path.is_file():
+                    files.setdefault(path.name, path.read_bytes())
+
+        self._server = _Server(('127.0.0.1', 0), files, latency)
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def files(self) -> Dict[str, bytes]:
+        return self._server.files
+
+    @property
+    def request_count(self) -> int:
+        return self._server.request_count
+
+    @property
+    def not_modified_count(self) -> int:
+        return self._server.not_modified_count
+
+    @property
+    def connection_count(self) -> int:
+        """Number of distinct client connections seen (lower means better reuse)"""
+        return len(self._server.connections)
+
+    def url(self, name: str) -> str:
+        return f"{self.base_url}/{name}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,308 @@
+"""
+Synthetic source files for scale tests
+Writes CSV or XLSX files of any size in the column layout each scraper
+expects, built from the recorded fixtures, with controllable null rates,
+dirty values and encodings
+
+Usage:
+    uv run python scripts/generate_synthetic.py --datasets street_lights road_noise --rows 1000000
+    uv run python scripts/generate_synthetic.py --rows 5000000 --encoding big5 --null-rate 0.05 --dirty-rate 0.01
+    uv run python scripts/generate_synthetic.py --datasets parks --rows 500000 --format xlsx
+"""
+
+import argparse
+import csv
+import io
+import logging
+import random
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+from bench_pipeline import FIXTURES_DIR, fixture_as_csv, load_manifest
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Largest sheet openpyxl can write, minus the header row
+XLSX_MAX_ROWS = 1048575
+
+ENCODINGS = ['utf-8-sig', 'utf-8', 'big5', 'cp950']
+
+# Numeric values move by up to this share of the column's observed range
+JITTER = 0.05
+
+PROGRESS_EVERY = 1000000
+
+# Dirty variants seen in portal files; the loaders must clean or reject them
+DIRTY_TEXT = [
+    lambda v: f" {v} ",
+    lambda v: f"　{v}",
+    lambda v: f"{v}\t",
+    lambda v: '-',
+    lambda v: 'N/A',
+]
+DIRTY_NUMBER = [
+    lambda v: f"{v} ",
+    lambda v: f"{v:,}",
+    lambda v: str(v).translate(str.maketrans('0123456789.', '０１２３４５６７８９．')),
+    lambda v: '-',
+    lambda v: '無',
+    lambda v: f"{v}*",
+]
+
+
+@dataclass
+class Column:
+    """One source column: header text, value kind and the fixture statistics it is drawn from"""
+    name: str
+    kind: str = 'text'
+    unique: bool = False
+    low: float = 0.0
+    high: float = 0.0
+    decimals: int = 0
+
+
+def _converter_kind(converter) -> str:
+    name = getattr(converter, '__name__', '')
+    if name == 'safe_int':
+        return 'int'
+    if name == 'safe_float':
+        return 'float'
+    return 'text'
+
+
+def _decimals(text: str) -> int:
+    return len(text.split('.', 1)[1]) if '.' in text else 0
+
+
+def scraper_layout(dataset: str, entry: dict, header: List[str]) -> List[Column]:
+    """
+    Columns a dataset's loader expects, resolved against the fixture header
+
+    The registered column mapping or header rules decide each column's
+    kind (through its converter). Source columns the fixture lacks are
+    appended so every DB column gets data.
+    """
+    import datasets
+    from column_resolver import resolve_columns
+
+    mapping = datasets.get(dataset).column_spec()
+    plan = resolve_columns(header, mapping, exact=True)
+
+    columns = [Column(name, unique=name in entry['unique_columns']) for name in header]
+    for db_col, source, pos, converter in plan.fields:
+        if pos is not None:
+            columns[pos].kind = _converter_kind(converter)
+            continue
+        if not isinstance(mapping, dict):
+            logger.warning(f"{dataset}: no fixture column for {db_col}")
+            continue
+        # First alternative of the mapping key is the canonical header
+        for key, (mapped_col, _) in mapping.items():
+            if mapped_col == db_col:
+                name = key[0] if isinstance(key, tuple) else key
+                columns.append(Column(name, kind=_converter_kind(converter)))
+                break
+    return columns
+
+
+def load_templates(entry: dict, columns: List[Column]) -> List[list]:
+    """Fixture rows padded to the layout, with numeric ranges recorded on the columns"""
+    content = (FIXTURES_DIR / entry['file']).read_bytes()
+    rows = list(csv.reader(io.StringIO(fixture_as_csv(content))))
+    body = [row + [''] * (len(columns) - len(row)) for row in rows[1:] if any(row)]
+    if not body:
+        raise ValueError(f"{entry['file']}: fixture has no rows")
+
+    for i, column in enumerate(columns):
+        if column.kind == 'text':
+            continue
+        numbers = []
+        for row in body:
+            try:
+                numbers.append(float(row[i]))
+                column.decimals = max(column.decimals, _decimals(row[i]))
+            except ValueError:
+                pass
+        if numbers:
+            column.low, column.high = min(numbers), max(numbers)
+        else:
+            # No usable sample: small positive numbers
+            column.low, column.high = 0.0, 100.0
+    return body
+
+
+class RowGenerator:
+    """
+    Deterministic stream of synthetic rows
+
+    Row i copies fixture row i % n. Unique columns get a '-<copy>' suffix
+    after the first pass (the same scheme as bench_pipeline's scaled
+    fixtures), numbers are jittered within the column's observed range,
+    and cells are blanked or made dirty at the given rates.
+
+    Args:
+        columns: Layout from scraper_layout()
+        templates: Fixture rows from load_templates()
+        null_rate: Share of cells left empty
+        dirty_rate: Share of cells replaced by a dirty variant
+        seed: Random seed
+    """
+
+    def __init__(self, columns: List[Column], templates: List[list], null_rate: float = 0.0,
+                 dirty_rate: float = 0.0, seed: int = 0):
+        self.columns = columns
+        self.templates = templates
+        self.null_rate = null_rate
+        self.dirty_rate = dirty_rate
+        self.rng = random.Random(seed)
+
+    @property
+    def header(self) -> List[str]:
+        return [column.name for column in self.columns]
+
+    def _number(self, column: Column, template: str):
+        rng = self.rng
+        try:
+            value = float(template)
+        except ValueError:
+            value = rng.uniform(column.low, column.high)
+        value += rng.uniform(-JITTER, JITTER) * (column.high - column.low)
+        value = min(max(value, column.low), column.high)
+        if column.kind == 'int' or not column.decimals:
+            return int(round(value))
+        return round(value, column.decimals)
+
+    def row(self, i: int) -> list:
+        rng = self.rng
+        copy, template = divmod(i, len(self.templates))
+        template = self.templates[template]
+
+        values = []
+        for column, cell in zip(self.columns, template):
+            if column.unique:
+                values.append(f"{cell}-{copy}" if copy else cell)
+                continue
+            if rng.random() < self.null_rate:
+                values.append(None)
+                continue
+            value = self._number(column, cell) if column.kind != 'text' else (cell or None)
+            if value is not None and rng.random() < self.dirty_rate:
+                value = rng.choice(DIRTY_NUMBER if column.kind != 'text' else DIRTY_TEXT)(value)
+            values.append(value)
+        return values
+
+    def rows(self, count: int):
+        for i in range(count):
+            yield self.row(i)
+
+
+def _progress(dataset: str, written: int):
+    if written and written % PROGRESS_EVERY == 0:
+        logger.info(f"{dataset}: {written} rows written")
+
+
+def write_csv(path: Path, dataset: str, generator: RowGenerator, count: int, encoding: str = 'utf-8-sig'):
+    """Write rows as CSV; characters the encoding lacks (e.g. in Big5) become '?'"""
+    with open(path, 'w', encoding=encoding, errors='replace', newline='') as f:
+        writer = csv.writer(f, lineterminator='\r\n')
+        writer.writerow(generator.header)
+        for written, row in enumerate(generator.rows(count), 1):
+            writer.writerow(['' if value is None else value for value in row])
+            _progress(dataset, written)
+
+
+def write_xlsx(path: Path, dataset: str, generator: RowGenerator, count: int):
+    """Write rows as a single-sheet XLSX, streaming through openpyxl's write-only mode"""
+    from openpyxl import Workbook
+
+    if count > XLSX_MAX_ROWS:
+        raise ValueError(f"XLSX holds at most {XLSX_MAX_ROWS} rows per sheet; use --format csv for {count}")
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(generator.header)
+    for written, row in enumerate(generator.rows(count), 1):
+        sheet.append(row)
+        _progress(dataset, written)
+    workbook.save(path)
+
+
+def generate(dataset: str, output_dir: Path, rows: int, fmt: str = 'csv', encoding: str = 'utf-8-sig',
+             null_rate: float = 0.0, dirty_rate: float = 0.0, seed: int = 0,
+             manifest: Optional[dict] = None) -> Path:
+    """
+    Write one synthetic source file for a dataset
+
+    Args:
+        dataset: Dataset name from fixtures/manifest.json
+        output_dir: Directory for the file
+        rows: Number of data rows
+        fmt: 'csv' or 'xlsx'
+        encoding: CSV encoding (ignored for XLSX)
+        null_rate: Share of non-key cells left empty
+        dirty_rate: Share of non-key cells replaced by a dirty variant
+        seed: Random seed; the same arguments always give the same file
+        manifest: Parsed manifest (loaded when omitted)
+
+    Returns:
+        Path of the written file
+    """
+    entry = (manifest or load_manifest())[dataset]
+    content = (FIXTURES_DIR / entry['file']).read_bytes()
+    header = next(csv.reader(io.StringIO(fixture_as_csv(content))))
+
+    columns = scraper_layout(dataset, entry, header)
+    generator = RowGenerator(columns, load_templates(entry, columns), null_rate, dirty_rate, seed)
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    path = output_dir / f"{dataset}_{rows}.{fmt}"
+    if fmt == 'xlsx':
+        write_xlsx(path, dataset, generator, rows)
+    else:
+        write_csv(path, dataset, generator, rows, encoding)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate synthetic source files in each scraper\'s layout')
+    parser.add_argument('--datasets', nargs='+', help='Datasets to generate (default: all in the manifest)')
+    parser.add_argument('--rows', type=int, default=1000000, help='Data rows per file (default: 1000000)')
+    parser.add_argument('--format', choices=['csv', 'xlsx'], default='csv', help='Output format (default: csv)')
+    parser.add_argument('--encoding', choices=ENCODINGS, default='utf-8-sig',
+                        help='CSV encoding (default: utf-8-sig)')
+    parser.add_argument('--null-rate', type=float, default=0.0, help='Share of cells left empty (default: 0)')
+    parser.add_argument('--dirty-rate', type=float, default=0.0,
+                        help='Share of cells given a dirty value such as "N/A" or "1,234" (default: 0)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    parser.add_argument('--output-dir', type=Path, default=Path(__file__).parent.parent / 'synthetic',
+                        help='Directory for the generated files (default: synthetic/)')
+    args = parser.parse_args(argv)
+
+    manifest = load_manifest()
+    datasets = args.datasets or list(manifest)
+    unknown = [d for d in datasets if d not in manifest]
+    if unknown:
+        parser.error(f"unknown datasets: {', '.join(unknown)}")
+
+    failed = 0
+    for dataset in datasets:
+        start = time.perf_counter()
+        try:
+            path = generate(dataset, args.output_dir, args.rows, args.format, args.encoding,
+                            args.null_rate, args.dirty_rate, args.seed, manifest)
+        except Exception as e:
+            print(f"❌ {dataset}: {e}")
+            failed += 1
+            continue
+        elapsed = time.perf_counter() - start
+        print(f"✅ {dataset}: {args.rows} rows -> {path} "
+              f"({path.stat().st_size / 1048576:.1f} MB, {elapsed:.1f}s)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
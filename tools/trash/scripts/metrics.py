@@ -0,0 +1,233 @@
+"""
+Prometheus metrics for the ETL pipeline
+Turns timing events and job results into counters, gauges and histograms in
+the Prometheus text format, written atomically to a textfile (for the
+node_exporter textfile collector) or served on a local HTTP endpoint
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'hsinchu_etl_'
+
+# Stage latency buckets in seconds
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+# name -> (type, help)
+METRICS = {
+    'rows_ingested_total': ('counter', 'Source rows read per dataset'),
+    'rows_written_total': ('counter', 'Rows inserted or updated per dataset'),
+    'rows_rejected_total': ('counter', 'Source rows rejected per dataset'),
+    'download_bytes_total': ('counter', 'Bytes downloaded per dataset (0 for 304 revalidations)'),
+    'cache_requests_total': ('counter', 'Dataset downloads by cache result (hit = 304 Not Modified)'),
+    'cache_hit_ratio': ('gauge', 'Share of dataset downloads answered from the cache'),
+    'runs_total': ('counter', 'Dataset runs by status'),
+    'last_success_timestamp_seconds': ('gauge', 'Unix time of the last successful run per dataset'),
+    'stage_duration_seconds': ('histogram', 'Wall time per dataset and lifecycle stage'),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(**labels) -> Labels:
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Labels, extra: str = '') -> str:
+    parts = [f'{key}="{_escape(value)}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of the pipeline metrics
+
+    Also a timing sink: add it with timing.add_sink() and every dataset run
+    updates the row, byte, cache and latency metrics.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[str, Dict[Labels, float]] = {name: {} for name in METRICS}
+        # histogram labels -> [bucket counts..., sum, count]
+        self._histograms: Dict[str, Dict[Labels, list]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _labels(**labels)
+        with self._lock:
+            self._values[name][key] = self._values[name].get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._values[name][_labels(**labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _labels(**labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = [0] * len(LATENCY_BUCKETS) + [0.0, 0]
+            counts = series[key]
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+    def emit(self, event):
+        """timing sink interface: fold one StageEvent into the metrics"""
+        self.observe('stage_duration_seconds', event.wall_s, dataset=event.dataset, stage=event.stage)
+        if event.stage != 'total':
+            return
+
+        attrs = event.attrs
+        dataset = event.dataset
+        self.inc('download_bytes_total', event.bytes, dataset=dataset)
+        for attr, name in [('rows_in', 'rows_ingested_total'), ('rows_out', 'rows_written_total'),
+                           ('rows_rejected', 'rows_rejected_total')]:
+            if attrs.get(attr) is not None:
+                self.inc(name, attrs[attr], dataset=dataset)
+
+        if 'cache_hit' in attrs:
+            self.inc('cache_requests_total', dataset=dataset, result='hit' if attrs['cache_hit'] else 'miss')
+            with self._lock:
+                requests = self._values['cache_requests_total']
+                hits = sum(v for k, v in requests.items() if ('result', 'hit') in k)
+                total = sum(requests.values())
+                self._values['cache_hit_ratio'][()] = hits / total if total else 0.0
+
+    def close(self):
+        pass
+
+    def record_job(self, dataset: str, status: str, finished_at: Optional[float] = None):
+        """Count one orchestrator result; successes move the dataset's last-success time"""
+        self.inc('runs_total', dataset=dataset, status=status)
+        if status == 'success':
+            self.set('last_success_timestamp_seconds', finished_at or time.time(), dataset=dataset)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, (kind, help_text) in METRICS.items():
+                full = PREFIX + name
+                lines.append(f"# HELP {full} {help_text}")
+                lines.append(f"# TYPE {full} {kind}")
+                if kind == 'histogram':
+                    for labels, counts in sorted(self._histograms.get(name, {}).items()):
+                        for bound, count in zip(LATENCY_BUCKETS, counts):
+                            bucket = _format_labels(labels, 'le="%s"' % bound)
+                            lines.append(f"{full}_bucket{bucket} {count}")
+                        bucket = _format_labels(labels, 'le="+Inf"')
+                        lines.append(f"{full}_bucket{bucket} {counts[-1]}")
+                        lines.append(f"{full}_sum{_format_labels(labels)} {_format_value(counts[-2])}")
+                        lines.append(f"{full}_count{_format_labels(labels)} {counts[-1]}")
+                else:
+                    for labels, value in sorted(self._values[name].items()):
+                        lines.append(f"{full}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path):
+        """Write the metrics to a file atomically, so a collector never reads half a file"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(self.render())
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = self.server.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer:
+    """
+    Serves a registry on http://<host>:<port>/metrics from a daemon thread
+
+    Usage:
+        with MetricsServer(registry, port=9464):
+            ... long run ...
+    """
+
+    def __init__(self, registry: MetricsRegistry, port: int, host: str = '127.0.0.1'):
+        self._server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self._server.daemon_threads = True
+        self._server.registry = registry
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics', daemon=True)
+        self._thread.start()
+        logger.info(f"Serving metrics on {self.url}")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def seed_last_success(registry: MetricsRegistry, conn):
+    """
+    Load each dataset's last successful run from the ETL history
+
+    A textfile is rewritten on every run, so without this a dataset that
+    failed this time would drop its last-success series instead of going stale.
+    """
+    rows = conn.execute("""
+        SELECT dataset, MAX(finished_at) FROM etl_dataset_runs WHERE status = 'success' GROUP BY dataset
+    """).fetchall()
+    for dataset, finished_at in rows:
+        if finished_at:
+            timestamp = time.mktime(time.strptime(finished_at, '%Y-%m-%d %H:%M:%S'))
+            registry.set('last_success_timestamp_seconds', timestamp, dataset=dataset)
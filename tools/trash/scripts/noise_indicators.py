@@ -0,0 +1,399 @@
+"""
+Road noise indicators and queries
+Rebuilds the long-form hourly readings and the energy-averaged day, evening,
+night, Ldn and Lden levels per station-day and station-month from
+road_noise_measurements, vectorized with NumPy, and reads hourly series and
+24-hour profiles by station and date range as NumPy arrays
+
+Usage:
+    uv run python scripts/noise_indicators.py refresh
+    uv run python scripts/noise_indicators.py monthly --station N00 --start 2024-01 --end 2024-12
+
+    from noise_indicators import noise_series, noise_profile
+    dates, levels = noise_series('N00', '2024-01-01', '2024-03-31', hours='night')
+    curves = noise_profile(start='2024-01-01', weekdays=range(5))
+"""
+
+import argparse
+import logging
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from db_schema import ROAD_NOISE_DERIVED_SCHEMA, ensure_road_noise_dates, get_connection, reading
+
+logger = logging.getLogger(__name__)
+
+HOUR_COLUMNS = [f"hour_{h:02d}_{h + 1:02d}" for h in range(24)]
+
+# Assessment periods as hour-of-day ranges (EU END 2002/49/EC for Lden,
+# ISO 1996-1 for Ldn); (23, 7) wraps past midnight
+LDEN_PERIODS = {'day': (7, 19), 'evening': (19, 23), 'night': (23, 7)}
+LDN_PERIODS = {'day': (7, 22), 'night': (22, 7)}
+
+# dB added to a period before it is averaged into Ldn / Lden
+PENALTIES = {'day': 0, 'evening': 5, 'night': 10}
+
+INDICATOR_COLUMNS = ['hours', 'leq_24h', 'leq_day', 'leq_evening', 'leq_night', 'ldn', 'lden',
+                     'loudest_hour', 'loudest_hour_db']
+
+DERIVED_TABLES = ['road_noise_hourly', 'road_noise_daily', 'road_noise_monthly']
+
+# Stored levels are rounded to this many decimals
+DECIMALS = 2
+
+
+def ensure_tables(conn):
+    """Create the derived tables and the date key in databases initialised before they existed"""
+    ensure_road_noise_dates(conn)
+    for statement in ROAD_NOISE_DERIVED_SCHEMA:
+        conn.execute(statement)
+
+
+def _period_hours(start: int, end: int) -> List[int]:
+    """Hours of a period in clock order, e.g. (23, 7) -> 23, 0, 1, ... 6"""
+    return [(start + i) % 24 for i in range((end - start) % 24)]
+
+
+def _period_mask(start: int, end: int) -> np.ndarray:
+    mask = np.zeros(24, dtype=bool)
+    mask[_period_hours(start, end)] = True
+    return mask
+
+
+def _to_db(energy: np.ndarray) -> np.ndarray:
+    """10·log10 of mean energies; zero or missing energy gives NaN"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        levels = 10 * np.log10(energy)
+    levels[~np.isfinite(levels)] = np.nan
+    return levels
+
+
+def _mean_energy(sums: np.ndarray, counts: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    total = sums[:, mask].sum(axis=1)
+    n = counts[:, mask].sum(axis=1)
+    return np.divide(total, n, out=np.zeros_like(total), where=n > 0)
+
+
+def _day_night_level(sums: np.ndarray, counts: np.ndarray, periods: dict) -> np.ndarray:
+    """Ldn / Lden: penalised period levels averaged by period length; NaN unless every period has readings"""
+    total = np.zeros(len(sums))
+    complete = np.ones(len(sums), dtype=bool)
+    for period, hours in periods.items():
+        mask = _period_mask(*hours)
+        energy = _mean_energy(sums, counts, mask)
+        total += mask.sum() * energy * 10 ** (PENALTIES[period] / 10)
+        complete &= energy > 0
+    levels = _to_db(total / 24)
+    levels[~complete] = np.nan
+    return levels
+
+
+def indicators(sums: np.ndarray, counts: np.ndarray) -> dict:
+    """
+    Energy-averaged noise indicators
+
+    Works on sums rather than levels so a station-day and a station-month are
+    the same computation: row i of sums holds, per hour of the day, the summed
+    energies 10^(L/10) of counts[i] readings.
+
+    Args:
+        sums: (n, 24) summed hourly energies
+        counts: (n, 24) readings behind each sum
+
+    Returns:
+        Dict of INDICATOR_COLUMNS -> (n,) arrays; levels are NaN where a
+        period has no readings, and Ldn / Lden need every one of their periods
+    """
+    out = {'hours': counts.sum(axis=1), 'leq_24h': _to_db(_mean_energy(sums, counts, np.ones(24, dtype=bool)))}
+    for period, hours in LDEN_PERIODS.items():
+        out[f"leq_{period}"] = _to_db(_mean_energy(sums, counts, _period_mask(*hours)))
+    out['ldn'] = _day_night_level(sums, counts, LDN_PERIODS)
+    out['lden'] = _day_night_level(sums, counts, LDEN_PERIODS)
+
+    hourly = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+    loudest = hourly.argmax(axis=1)
+    out['loudest_hour'] = np.where(counts.any(axis=1), loudest, -1)
+    out['loudest_hour_db'] = _to_db(hourly[np.arange(len(sums)), loudest])
+    return out
+
+
+def _group_starts(keys: list) -> np.ndarray:
+    """Start offsets of the runs of equal keys in an already sorted list"""
+    return np.array([i for i in range(len(keys)) if i == 0 or keys[i] != keys[i - 1]], dtype=np.intp)
+
+
+def aggregate(rows: List[tuple]) -> Tuple[tuple, tuple]:
+    """
+    Daily and monthly energy sums from measurement rows
+
+    Args:
+        rows: (station_id, ISO date, 24 hourly levels) sorted by station and date;
+            several rows for the same station-day are averaged together
+
+    Returns:
+        ((day keys, sums, counts), (month keys, sums, counts, days)), keys
+        being (station_id, date) and (station_id, 'YYYY-MM') tuples
+    """
+    empty = np.zeros((0, 24))
+    if not rows:
+        return ([], empty, empty), ([], empty, empty, np.zeros(0, dtype=np.intp))
+
+    levels = np.array([row[2:] for row in rows], dtype=float)
+    readings = ~np.isnan(levels)
+    energy = np.where(readings, np.power(10.0, np.where(readings, levels, 0) / 10), 0.0)
+
+    keys = [(row[0], row[1]) for row in rows]
+    starts = _group_starts(keys)
+    day_keys = [keys[i] for i in starts]
+    day_sums = np.add.reduceat(energy, starts, axis=0)
+    day_counts = np.add.reduceat(readings.astype(np.int64), starts, axis=0)
+
+    months = [(station, day[:7]) for station, day in day_keys]
+    starts = _group_starts(months)
+    month_keys = [months[i] for i in starts]
+    month_sums = np.add.reduceat(day_sums, starts, axis=0)
+    month_counts = np.add.reduceat(day_counts, starts, axis=0)
+    month_days = np.diff(np.append(starts, len(day_keys)))
+    return (day_keys, day_sums, day_counts), (month_keys, month_sums, month_counts, month_days)
+
+
+def _indicator_rows(keys: list, sums: np.ndarray, counts: np.ndarray, extra: Optional[np.ndarray] = None):
+    values = indicators(sums, counts)
+    columns = []
+    for name in INDICATOR_COLUMNS:
+        if name in ('hours', 'loudest_hour'):
+            columns.append([v if v >= 0 else None for v in values[name].tolist()])
+        else:
+            columns.append([None if v != v else v for v in np.round(values[name], DECIMALS).tolist()])
+    if extra is not None:
+        keys = [(*key, n) for key, n in zip(keys, extra.tolist())]
+    return [(*key, *row) for key, row in zip(keys, zip(*columns))]
+
+
+def _hourly_rows(day_keys: list, sums: np.ndarray, counts: np.ndarray):
+    days, hours = np.nonzero(counts)
+    levels = np.round(_to_db(sums[days, hours] / counts[days, hours]), DECIMALS)
+    for day, hour, level in zip(days.tolist(), hours.tolist(), levels.tolist()):
+        yield (*day_keys[day], hour, level)
+
+
+def _scope_filter(conn, months: Iterable[tuple]) -> str:
+    """Load (station_id, year, month) triples into a temp table and return the join clause"""
+    conn.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS noise_scope (
+            station_id TEXT, measurement_year INTEGER, measurement_month INTEGER
+        )
+    """)
+    conn.execute("DELETE FROM temp.noise_scope")
+    conn.executemany("INSERT INTO temp.noise_scope VALUES (?, ?, ?)", months)
+    return "JOIN temp.noise_scope s USING (station_id, measurement_year, measurement_month)"
+
+
+def refresh(conn, months: Optional[Iterable[tuple]] = None) -> dict:
+    """
+    Rebuild the derived road noise tables from road_noise_measurements
+
+    Nothing is committed: run it in the load's transaction so the derived
+    tables change together with the measurements.
+
+    Args:
+        conn: Open connection
+        months: (station_id, measurement_year, measurement_month) triples, as
+            stored in road_noise_measurements, to rebuild; None rebuilds all
+
+    Returns:
+        Dict of rows written per derived table, plus 'invalid_dates'
+    """
+    ensure_tables(conn)
+    join = ''
+    if months is not None:
+        months = sorted({tuple(m) for m in months if None not in m})
+        if not months:
+            return {**{table: 0 for table in DERIVED_TABLES}, 'invalid_dates': 0}
+        join = _scope_filter(conn, months)
+
+    columns = ', '.join(f"m.{col}" for col in ['station_id', 'measurement_date', *HOUR_COLUMNS])
+    rows = conn.execute(f"""
+        SELECT {columns} FROM road_noise_measurements m {join}
+        WHERE m.station_id IS NOT NULL ORDER BY m.station_id, m.measurement_date
+    """).fetchall()
+    valid = [row for row in rows if row[1] is not None]
+    invalid = len(rows) - len(valid)
+    if invalid:
+        logger.warning(f"Skipped {invalid} road noise measurements with invalid dates")
+
+    (day_keys, day_sums, day_counts), (month_keys, month_sums, month_counts, month_days) = aggregate(valid)
+
+    # Clear what is being rebuilt: everything, or the months in scope
+    if months is None:
+        for table in DERIVED_TABLES:
+            conn.execute(f"DELETE FROM {table}")
+    else:
+        for table in ('road_noise_hourly', 'road_noise_daily'):
+            conn.executemany(f"DELETE FROM {table} WHERE station_id = ? AND measurement_date BETWEEN ? AND ?",
+                             [(station_id, f"{month}-01", f"{month}-31") for station_id, month in month_keys])
+        conn.executemany("DELETE FROM road_noise_monthly WHERE station_id = ? AND month = ?", month_keys)
+
+    placeholders = ', '.join('?' for _ in INDICATOR_COLUMNS)
+    conn.executemany("INSERT INTO road_noise_hourly VALUES (?, ?, ?, ?)",
+                     _hourly_rows(day_keys, day_sums, day_counts))
+    conn.executemany(f"INSERT INTO road_noise_daily (station_id, measurement_date, {', '.join(INDICATOR_COLUMNS)}) "
+                     f"VALUES (?, ?, {placeholders})",
+                     _indicator_rows(day_keys, day_sums, day_counts))
+    conn.executemany(f"INSERT INTO road_noise_monthly (station_id, month, days, {', '.join(INDICATOR_COLUMNS)}) "
+                     f"VALUES (?, ?, ?, {placeholders})",
+                     _indicator_rows(month_keys, month_sums, month_counts, month_days))
+
+    return {
+        'road_noise_hourly': int((day_counts > 0).sum()),
+        'road_noise_daily': len(day_keys),
+        'road_noise_monthly': len(month_keys),
+        'invalid_dates': invalid,
+    }
+
+
+def _hour_list(hours) -> List[int]:
+    """None (all 24), a LDEN_PERIODS name or an iterable of hours 0-23"""
+    if hours is None:
+        return list(range(24))
+    if isinstance(hours, str):
+        if hours not in LDEN_PERIODS:
+            raise ValueError(f"Unknown period {hours!r}, expected one of: {', '.join(LDEN_PERIODS)}")
+        return _period_hours(*LDEN_PERIODS[hours])
+    hours = [int(h) for h in hours]
+    if not hours or any(not 0 <= h < 24 for h in hours):
+        raise ValueError(f"Hours must be between 0 and 23, got {hours}")
+    return hours
+
+
+def _iso_day(value, default: str) -> str:
+    if value is None:
+        return default
+    return value.strftime('%Y-%m-%d') if hasattr(value, 'strftime') else str(value)
+
+
+def _read_levels(conn, station_id: str, start, end, hours: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+    columns = ', '.join(HOUR_COLUMNS[h] for h in hours)
+    rows = conn.execute(f"""
+        SELECT measurement_date, {columns} FROM road_noise_measurements
+        WHERE station_id = ? AND measurement_date BETWEEN ? AND ?
+        ORDER BY measurement_date
+    """, (station_id, _iso_day(start, '0000-01-01'), _iso_day(end, '9999-12-31'))).fetchall()
+    dates = np.array([row[0] for row in rows], dtype='datetime64[D]')
+    levels = np.array([row[1:] for row in rows], dtype=float).reshape(len(rows), len(hours))
+    return dates, levels
+
+
+def noise_series(station_id: str, start=None, end=None, hours=None, conn=None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hourly levels of one station over a date range
+
+    Args:
+        station_id: Station id
+        start: First date, 'YYYY-MM-DD' or a date (default: the first measurement)
+        end: Last date, inclusive (default: the last measurement)
+        hours: None for all 24 hours, a period name ('day', 'evening',
+            'night') or an iterable of hours 0-23; columns follow this order
+        conn: Connection to read from (default: a new read connection)
+
+    Returns:
+        (dates, levels): datetime64[D] array of the n measurement days and an
+        (n, len(hours)) array of dB(A), NaN where a reading is missing
+    """
+    hours = _hour_list(hours)
+    with reading(conn) as conn:
+        return _read_levels(conn, station_id, start, end, hours)
+
+
+def noise_profile(station_ids=None, start=None, end=None, weekdays=None, conn=None) -> Dict[str, np.ndarray]:
+    """
+    Energy-averaged 24-hour curves per station over a date range
+
+    Args:
+        station_ids: Station id or list of ids (default: every station)
+        start: First date, 'YYYY-MM-DD' or a date (default: the first measurement)
+        end: Last date, inclusive (default: the last measurement)
+        weekdays: Days of the week to include, 0 = Monday (default: all)
+        conn: Connection to read from (default: a new read connection)
+
+    Returns:
+        Dict of station id -> (24,) array of dB(A) per hour of the day, NaN
+        for hours without readings; stations without readings are left out
+    """
+    with reading(conn) as conn:
+        if station_ids is None:
+            station_ids = [row[0] for row in conn.execute(
+                "SELECT DISTINCT station_id FROM road_noise_measurements WHERE station_id IS NOT NULL")]
+        elif isinstance(station_ids, str):
+            station_ids = [station_ids]
+
+        profiles = {}
+        for station_id in station_ids:
+            dates, levels = _read_levels(conn, station_id, start, end, list(range(24)))
+            if weekdays is not None:
+                # 1970-01-01 was a Thursday
+                levels = levels[np.isin((dates.astype(np.int64) + 3) % 7, list(weekdays))]
+            readings = ~np.isnan(levels)
+            if not readings.any():
+                continue
+            sums = np.where(readings, np.power(10.0, np.where(readings, levels, 0) / 10), 0.0).sum(axis=0)
+            counts = readings.sum(axis=0)
+            profiles[station_id] = _to_db(np.divide(sums, counts, out=np.zeros(24), where=counts > 0))
+        return profiles
+
+
+def monthly_indicators(conn, station_id: Optional[str] = None, start: Optional[str] = None,
+                       end: Optional[str] = None) -> List[tuple]:
+    """Stored monthly indicators, optionally for one station and a 'YYYY-MM' range (inclusive)"""
+    clauses, params = [], []
+    for clause, value in [('station_id = ?', station_id), ('month >= ?', start), ('month <= ?', end)]:
+        if value is not None:
+            clauses.append(clause)
+            params.append(value)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    return conn.execute(f"""
+        SELECT station_id, month, days, {', '.join(INDICATOR_COLUMNS)}
+        FROM road_noise_monthly {where} ORDER BY station_id, month
+    """, params).fetchall()
+
+
+def _fmt(value, spec='.1f') -> str:
+    return '-' if value is None else format(value, spec)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Rebuild and show the road noise indicators')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('refresh', help='Rebuild the derived tables from road_noise_measurements')
+    monthly = commands.add_parser('monthly', help='Show monthly indicators')
+    monthly.add_argument('--station', help='Station id (default: all)')
+    monthly.add_argument('--start', help='First month, YYYY-MM')
+    monthly.add_argument('--end', help='Last month, YYYY-MM')
+    args = parser.parse_args(argv)
+
+    conn = get_connection('bulk' if args.command == 'refresh' else 'read')
+    try:
+        if args.command == 'refresh':
+            counts = refresh(conn)
+            conn.commit()
+            print(f"✅ Rebuilt {counts['road_noise_daily']} station-days, {counts['road_noise_monthly']} "
+                  f"station-months ({counts['road_noise_hourly']} hourly readings)")
+            return 0
+
+        ensure_tables(conn)
+        print(f"{'station':<10}{'month':<9}{'days':>5}{'Leq24':>7}{'Ld':>7}{'Le':>7}{'Ln':>7}"
+              f"{'Ldn':>7}{'Lden':>7}  loudest")
+        for (station, month, days, hours, leq, day, evening, night, ldn, lden,
+             loudest, loudest_db) in monthly_indicators(conn, args.station, args.start, args.end):
+            print(f"{station:<10}{month:<9}{days:>5}{_fmt(leq):>7}{_fmt(day):>7}{_fmt(evening):>7}"
+                  f"{_fmt(night):>7}{_fmt(ldn):>7}{_fmt(lden):>7}  "
+                  f"{'-' if loudest is None else f'{loudest:02d}h {loudest_db:.1f}'}")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
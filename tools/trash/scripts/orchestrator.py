@@ -0,0 +1,165 @@
+"""
+Concurrent job orchestrator for the scraper pipeline
+Runs independent dataset jobs in a worker pool and streams results as they finish
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Scrapers spend most of their time waiting on the portal, so threads are enough
+DEFAULT_WORKERS = 8
+
+# Per-job timeout in seconds (None disables it)
+DEFAULT_TIMEOUT = 300
+
+# How often the scheduler wakes up to check for timed-out jobs
+POLL_INTERVAL = 0.5
+
+# Seconds a timed-out job gets to stop before it is given up on
+CANCEL_GRACE = 60
+
+# Stop event of the job running in the current worker thread
+_stop: ContextVar = ContextVar('stop', default=None)
+
+
+class JobCancelled(Exception):
+    """Raised by check_cancelled() in a job that run_jobs() asked to stop"""
+
+
+def cancelled() -> bool:
+    """Whether the job running in this thread was asked to stop (False outside run_jobs())"""
+    stop = _stop.get()
+    return stop is not None and stop.is_set()
+
+
+def check_cancelled():
+    """
+    Stop the current job if it timed out
+
+    Jobs call this between steps (chunks, reports) and right before they
+    commit; the JobCancelled it raises rolls back whatever the job had not
+    committed yet.
+    """
+    if cancelled():
+        raise JobCancelled("Cancelled by the orchestrator")
+
+
+@dataclass
+class ScraperJob:
+    """A single dataset job: display name plus the callable that loads it"""
+    name: str
+    func: Callable
+    args: tuple = ()
+    kwargs: dict = field(default_factory=dict)
+
+
+@dataclass
+class JobResult:
+    """Outcome of one job, yielded by run_jobs() as soon as it is known"""
+    name: str
+    status: str  # 'success', 'failed' or 'timeout'
+    duration: float
+    result: object = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 'success'
+
+
+def _execute(job: ScraperJob, started: dict, stop: threading.Event, timeout: Optional[float]) -> JobResult:
+    """Run a job inside a worker thread, never letting an exception escape"""
+    start = time.monotonic()
+    started[job.name] = start
+
+    token = _stop.set(stop)
+    try:
+        value = job.func(*job.args, **job.kwargs)
+        return JobResult(job.name, 'success', time.monotonic() - start, result=value)
+    except JobCancelled:
+        return JobResult(job.name, 'timeout', time.monotonic() - start, error=f"Timed out after {timeout}s")
+    except Exception as e:
+        return JobResult(job.name, 'failed', time.monotonic() - start, error=str(e))
+    finally:
+        _stop.reset(token)
+
+
+def run_jobs(jobs: Iterable[ScraperJob], workers: int = DEFAULT_WORKERS,
+             timeout: Optional[float] = DEFAULT_TIMEOUT) -> Iterator[JobResult]:
+    """
+    Run jobs concurrently and yield each result as it completes
+
+    Jobs have no dependencies on each other, so they are all submitted at once
+    and the pool picks them up in order.
+
+    Args:
+        jobs: Jobs to run (names must be unique)
+        workers: Maximum number of jobs running at the same time
+        timeout: Seconds a job may run before it is reported as timed out
+
+    Yields:
+        JobResult for every job, in completion order
+
+    Note:
+        Python threads cannot be killed, so a timed-out job is only asked to
+        stop: its check_cancelled() calls raise and its load is rolled back.
+        Its result is yielded once its thread has returned, as 'timeout', or
+        with its real outcome if it finished first. A job that does not stop
+        within CANCEL_GRACE seconds is reported as timed out and abandoned;
+        it keeps its worker busy until it returns on its own, but its
+        check before committing still stops it from committing.
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return
+
+    started = {}
+    stops = {job.name: threading.Event() for job in jobs}
+    cancelled_at = {}
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, min(workers, len(jobs))),
+        thread_name_prefix='scraper'
+    )
+    pending = {executor.submit(_execute, job, started, stops[job.name], timeout): job for job in jobs}
+
+    try:
+        while pending:
+            done, _ = wait(pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                job = pending.pop(future)
+                result = future.result()
+                if job.name in cancelled_at and result.status != 'timeout':
+                    logger.warning(f"{job.name} {result.status} after being cancelled; reporting its outcome")
+                yield result
+
+            if not timeout:
+                continue
+
+            now = time.monotonic()
+            for future, job in list(pending.items()):
+                start = started.get(job.name)
+                if start is None:
+                    continue
+                if job.name not in cancelled_at:
+                    if now - start > timeout:
+                        stops[job.name].set()
+                        cancelled_at[job.name] = now
+                        logger.warning(f"{job.name} exceeded {timeout}s, cancelling it")
+                elif now - cancelled_at[job.name] > CANCEL_GRACE:
+                    del pending[future]
+                    logger.error(f"{job.name} did not stop within {CANCEL_GRACE}s of its timeout, abandoning it")
+                    yield JobResult(job.name, 'timeout', now - start,
+                                    error=f"Timed out after {timeout}s and did not stop")
+    finally:
+        # Stop jobs still running if the caller gave up early; queued ones are cancelled
+        for stop in stops.values():
+            stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,246 @@
+"""
+Profiling mode for scraper runs
+Writes a cProfile stats file (and optionally a tracemalloc snapshot with a
+top-N allocation report) per dataset, and merges them across datasets into
+one hot-spot summary
+
+Usage:
+    uv run python scripts/run_all.py --profile --profile-memory 25
+    uv run python scripts/run_all.py --datasets street_lights --profile
+    uv run python scripts/profiling.py summary                # latest run
+    uv run python scripts/profiling.py summary profiles/run-12 --top 40 --sort cumulative
+"""
+
+import argparse
+import cProfile
+import linecache
+import logging
+import pstats
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = Path(__file__).parent.parent / "profiles"
+
+# Frames kept per allocation traceback
+TRACEMALLOC_FRAMES = 10
+
+# Seconds between checks of traced memory while looking for the peak
+SAMPLE_INTERVAL = 0.5
+
+SORT_KEYS = ['tottime', 'cumulative', 'ncalls']
+
+
+def new_run_id() -> str:
+    """Run id for runs not recorded in etl_runs, e.g. a single scraper"""
+    return datetime.now().strftime('%Y%m%d-%H%M%S')
+
+
+def _snapshot():
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, cProfile.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ])
+
+
+class _PeakSampler(threading.Thread):
+    """
+    Keeps a snapshot from the moment traced memory was highest
+
+    Memory is mostly freed by the end of a load, so a final snapshot would
+    show almost nothing; this one shows what was alive at (close to) the peak.
+    """
+
+    def __init__(self):
+        super().__init__(name='tracemalloc-sampler', daemon=True)
+        self.snapshot = None
+        self.size = -1
+        self._done = threading.Event()
+
+    def sample(self):
+        current, _ = tracemalloc.get_traced_memory()
+        if current > self.size:
+            self.size = current
+            self.snapshot = _snapshot()
+
+    def run(self):
+        while not self._done.wait(SAMPLE_INTERVAL):
+            self.sample()
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self.sample()
+
+
+def write_allocation_report(path: Path, snapshot, dataset: str, top: int, peak: int):
+    """Top allocation sites of a snapshot, by size, as plain text"""
+    stats = snapshot.statistics('lineno')
+    lines = [f"{dataset}: peak traced memory {peak / 1048576:.1f} MB, "
+             f"{sum(s.size for s in stats) / 1048576:.1f} MB live in the sampled snapshot", ""]
+    for i, stat in enumerate(stats[:top], 1):
+        frame = stat.traceback[0]
+        lines.append(f"{i:>3}. {frame.filename}:{frame.lineno}: {stat.size / 1024:.1f} KiB in {stat.count} blocks")
+        source = linecache.getline(frame.filename, frame.lineno).strip()
+        if source:
+            lines.append(f"       {source}")
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+
+@contextmanager
+def profile(dataset: str, run_id: Optional[str] = None, directory: Path = PROFILE_DIR, memory_top: int = 0):
+    """
+    Profile a block as one dataset of a run
+
+    Writes <directory>/<run_id>/<dataset>.prof, and with memory_top > 0 also
+    <dataset>.tracemalloc and a <dataset>.alloc.txt report of the top sites,
+    taken from the largest snapshot sampled while the block ran.
+
+    cProfile only sees the calling thread, and tracemalloc traces the whole
+    process, so run datasets one at a time when profiling (run_all does).
+
+    Args:
+        dataset: Dataset name, used as the file name
+        run_id: Run directory name (defaults to a timestamp)
+        directory: Root directory for profile runs
+        memory_top: Number of allocation sites in the report; 0 disables tracemalloc
+    """
+    out_dir = Path(directory) / (run_id or new_run_id())
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    sampler = None
+    if memory_top > 0 and not tracemalloc.is_tracing():
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        sampler = _PeakSampler()
+        sampler.start()
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield out_dir
+    finally:
+        profiler.disable()
+        profiler.dump_stats(out_dir / f"{dataset}.prof")
+
+        if sampler:
+            sampler.stop()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            sampler.snapshot.dump(str(out_dir / f"{dataset}.tracemalloc"))
+            write_allocation_report(out_dir / f"{dataset}.alloc.txt", sampler.snapshot, dataset, memory_top, peak)
+
+        logger.info(f"Profile for {dataset} written to {out_dir}")
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Add --profile / --profile-memory to an entry point's parser"""
+    parser.add_argument('--profile', nargs='?', const=PROFILE_DIR, type=Path, metavar='DIR',
+                        help=f'Write cProfile stats per dataset (default directory: {PROFILE_DIR})')
+    parser.add_argument('--profile-memory', type=int, default=0, metavar='N',
+                        help='With --profile, also trace allocations and report the top N sites')
+
+
+def from_args(args, dataset: str, run_id: Optional[str] = None):
+    """profile() configured from parsed arguments, or a no-op without --profile"""
+    if not args.profile:
+        return nullcontext()
+    return profile(dataset, run_id, args.profile, args.profile_memory)
+
+
+def run_entry_point(func, dataset: str, argv=None):
+    """
+    Command line entry point of a single scraper, with the profiling options
+
+    Usage (at the bottom of an NN_*.py scraper):
+        if __name__ == "__main__":
+            run_entry_point(scrape_playgrounds, 'playgrounds')
+    """
+    parser = argparse.ArgumentParser(description=(func.__doc__ or '').strip().split('\n')[0])
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    with from_args(args, dataset):
+        return func()
+
+
+def latest_run(directory: Path = PROFILE_DIR) -> Optional[Path]:
+    runs = [path for path in Path(directory).iterdir() if path.is_dir()] if Path(directory).exists() else []
+    return max(runs, key=lambda path: path.stat().st_mtime) if runs else None
+
+
+def merged_stats(paths: List[Path]) -> pstats.Stats:
+    """One pstats.Stats over several .prof files"""
+    stats = pstats.Stats(str(paths[0]))
+    for path in paths[1:]:
+        stats.add(str(path))
+    return stats
+
+
+def merged_allocations(paths: List[Path], top: int):
+    """
+    Allocation sites summed over several tracemalloc snapshots
+
+    Returns:
+        List of ((filename, lineno), size, count), largest first
+    """
+    totals = {}
+    for path in paths:
+        for stat in tracemalloc.Snapshot.load(str(path)).statistics('lineno'):
+            frame = stat.traceback[0]
+            size, count = totals.get((frame.filename, frame.lineno), (0, 0))
+            totals[(frame.filename, frame.lineno)] = (size + stat.size, count + stat.count)
+    ranked = sorted(totals.items(), key=lambda item: item[1][0], reverse=True)
+    return [(site, size, count) for site, (size, count) in ranked[:top]]
+
+
+def summary(run_dir: Path, top: int = 30, sort: str = 'tottime', datasets: Optional[List[str]] = None,
+            stream=None) -> int:
+    """Print the hottest functions (and allocation sites) merged across a run's datasets"""
+    stream = stream or sys.stdout
+    profiles = sorted(run_dir.glob('*.prof'))
+    if datasets:
+        profiles = [path for path in profiles if path.stem in datasets]
+    if not profiles:
+        print(f"❌ No profiles in {run_dir}", file=stream)
+        return 1
+
+    print(f"Profile summary for {run_dir.name}: {', '.join(path.stem for path in profiles)}", file=stream)
+    stats = merged_stats(profiles)
+    stats.stream = stream
+    stats.strip_dirs().sort_stats(sort).print_stats(top)
+
+    snapshots = [run_dir / f"{path.stem}.tracemalloc" for path in profiles]
+    snapshots = [path for path in snapshots if path.exists()]
+    if snapshots:
+        print(f"Top allocation sites across {len(snapshots)} datasets (sampled near each peak):", file=stream)
+        for (filename, lineno), size, count in merged_allocations(snapshots, top):
+            print(f"  {size / 1024:>10.1f} KiB {count:>9} blocks  {Path(filename).name}:{lineno}", file=stream)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Summarise profiles written with --profile')
+    commands = parser.add_subparsers(dest='command', required=True)
+    merge = commands.add_parser('summary', help='Merge the profiles of a run and show the hottest functions')
+    merge.add_argument('run_dir', nargs='?', type=Path, help='Run directory (default: latest under profiles/)')
+    merge.add_argument('--top', type=int, default=30, help='Number of functions to show (default: 30)')
+    merge.add_argument('--sort', choices=SORT_KEYS, default='tottime', help='Sort key (default: tottime)')
+    merge.add_argument('--datasets', nargs='+', help='Only merge these datasets')
+    args = parser.parse_args(argv)
+
+    run_dir = args.run_dir or latest_run()
+    if run_dir is None:
+        print(f"❌ No profile runs under {PROFILE_DIR}")
+        return 1
+    return summary(run_dir, args.top, args.sort, args.datasets)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
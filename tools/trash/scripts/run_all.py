@@ -1,10 +1,12 @@
 """
 Master script to run all data scrapers
-Executes all 18 data collection scripts in sequence
+Loads every dataset in the registry (datasets.py) concurrently in a worker pool
 """
 
 import logging
+import os
 import sys
+from contextlib import nullcontext
 from pathlib import Path
 
 # Setup logging
@@ -18,81 +20,111 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Import all scrapers
-try:
-    # Note: 01_population requires manual ODS file download
-    # from 01_population import scrape_population_manual
-    from scripts import (
-        parks, playgrounds, public_toilets, street_lights,
-        bridge_inspections, road_noise, sidewalks, youbike,
-        fire_hazards, cctv, evacuation, land_prices,
-        building_permits, construction_projects,
-        garbage_collection, air_quality, special_foods
-    )
-except ImportError:
-    # If running from within scripts directory
-    import sys
-    sys.path.insert(0, str(Path(__file__).parent))
+# Make the pipeline modules importable when run from the repository root
+sys.path.insert(0, str(Path(__file__).parent))
+
+import profiling
+import timing
+from datasets import DATASETS, load
+from etl_history import RunHistory
+from metrics import MetricsRegistry, MetricsServer, seed_last_success
+from orchestrator import ScraperJob, run_jobs, DEFAULT_WORKERS, DEFAULT_TIMEOUT
+from utils import force_refresh
 
 
-def run_all_scrapers(skip_population=True):
+def run_scraper(dataset, profile=None):
     """
-    Run all data scrapers in sequence
+    Load one registered dataset
+
+    Args:
+        dataset: Dataset key in datasets.DATASETS
+        profile: profiling.profile() keyword arguments, or None to run unprofiled
+
+    Returns:
+        The dataset's timing.RunTimer, holding its stage timings and counts
+    """
+    profiler = profiling.profile(dataset, **profile) if profile else nullcontext()
+    with profiler, timing.run(dataset) as timer:
+        load(dataset)
+    return timer
+
+
+def build_jobs(datasets=None, profile=None):
+    """Turn dataset keys (default: all registered) into orchestrator jobs named after the datasets"""
+    return [
+        ScraperJob(DATASETS[key].name, run_scraper, (key,), {'profile': profile})
+        for key in datasets or DATASETS
+    ]
+
+
+def run_all_scrapers(skip_population=True, workers=DEFAULT_WORKERS, timeout=DEFAULT_TIMEOUT, datasets=None,
+                     profile_dir=None, profile_memory=0, metrics_file=None, metrics_port=None):
+    """
+    Run all data scrapers concurrently
 
     Args:
         skip_population: Skip population scraper (requires manual ODS download)
+        workers: Number of scrapers allowed to run at the same time
+        timeout: Seconds a single scraper may run before it is counted as failed
+        datasets: Dataset keys to load (default: every registered dataset)
+        profile_dir: Write per-dataset profiles under this directory (runs scrapers one at a time)
+        profile_memory: With profile_dir, report the top N allocation sites per dataset
+        metrics_file: Write Prometheus metrics to this file when the run ends
+        metrics_port: Serve Prometheus metrics on this local port while the run lasts
     """
+    if profile_dir and workers != 1:
+        # cProfile sees one thread and tracemalloc the whole process
+        logger.info("Profiling: running scrapers one at a time")
+        workers = 1
+
     logger.info("=" * 80)
     logger.info("Starting Hsinchu City Open Data ETL Pipeline")
+    logger.info(f"Workers: {workers}, per-dataset timeout: {timeout}s")
     logger.info("=" * 80)
 
-    scrapers = [
-        # (name, module, function)
-        ("Parks", "02_parks", "scrape_parks"),
-        ("Playgrounds", "03_playgrounds", "scrape_playgrounds"),
-        ("Public Toilets", "04_public_toilets", "scrape_public_toilets"),
-        ("Street Lights", "05_street_lights", "scrape_street_lights"),
-        ("Bridge Inspections", "06_bridge_inspections", "scrape_bridge_inspections"),
-        ("Road Noise", "07_road_noise", "scrape_road_noise"),
-        ("Sidewalks", "08_sidewalks", "scrape_sidewalks"),
-        ("YouBike Stations", "09_youbike", "scrape_youbike"),
-        ("Fire Hazards", "10_fire_hazards", "scrape_fire_hazards"),
-        ("CCTV Cameras", "11_cctv", "scrape_cctv"),
-        ("Evacuation Guides", "12_evacuation", "scrape_evacuation"),
-        ("Land Prices", "13_land_prices", "scrape_land_prices"),
-        ("Building Permits", "14_building_permits", "scrape_building_permits"),
-        ("Construction Projects", "15_construction_projects", "scrape_construction_projects"),
-        ("Garbage Collection", "16_garbage_collection", "scrape_garbage_collection"),
-        ("Air Quality", "17_air_quality", "scrape_air_quality"),
-        ("Special Foods", "18_special_foods", "scrape_special_foods"),
-    ]
-
+    datasets = list(datasets or DATASETS)
     total_success = 0
     total_failed = 0
 
-    for name, module_name, func_name in scrapers:
-        logger.info(f"\n{'=' * 60}")
-        logger.info(f"📥 Scraping: {name}")
-        logger.info(f"{'=' * 60}")
+    keys = {DATASETS[key].name: key for key in datasets}
+    history = RunHistory(workers=workers, forced=force_refresh())
 
-        try:
-            # Dynamically import and execute
-            module = __import__(module_name)
-            scraper_func = getattr(module, func_name)
-            scraper_func()
-            total_success += 1
-            logger.info(f"✅ {name}: SUCCESS")
+    profile = None
+    if profile_dir:
+        profile = {'run_id': f"run-{history.run_id}", 'directory': profile_dir, 'memory_top': profile_memory}
+
+    registry = None
+    server = None
+    if metrics_file or metrics_port:
+        registry = timing.add_sink(MetricsRegistry())
+        seed_last_success(registry, history.conn)
+        if metrics_port:
+            server = MetricsServer(registry, metrics_port).start()
 
+    for result in run_jobs(build_jobs(datasets, profile), workers=workers, timeout=timeout):
+        try:
+            history.record(result, keys[result.name])
         except Exception as e:
+            logger.warning(f"Could not record run history for {result.name}: {e}")
+        if registry:
+            registry.record_job(keys[result.name], result.status)
+
+        if result.ok:
+            total_success += 1
+            logger.info(f"✅ {result.name}: SUCCESS ({result.duration:.1f}s)")
+        elif result.status == 'timeout':
             total_failed += 1
-            logger.error(f"❌ {name}: FAILED - {e}")
+            logger.error(f"⏱️  {result.name}: TIMEOUT - {result.error}")
+        else:
+            total_failed += 1
+            logger.error(f"❌ {result.name}: FAILED - {result.error} ({result.duration:.1f}s)")
 
     # Summary
     logger.info("\n" + "=" * 80)
     logger.info("ETL Pipeline Summary")
     logger.info("=" * 80)
-    logger.info(f"✅ Successful: {total_success}/{len(scrapers)}")
-    logger.info(f"❌ Failed: {total_failed}/{len(scrapers)}")
+    logger.info(f"✅ Successful: {total_success}/{len(datasets)}")
+    logger.info(f"❌ Failed: {total_failed}/{len(datasets)}")
 
     if not skip_population:
         logger.info("\n⚠️  Note: Population data (01_population.py) requires manual ODS file download")
@@ -100,6 +132,24 @@ def run_all_scrapers(skip_population=True):
 
     logger.info("=" * 80)
 
+    try:
+        history.finish()
+        logger.info(f"Run history saved as etl_runs #{history.run_id} (see etl_history.py)")
+    except Exception as e:
+        logger.warning(f"Could not record run history: {e}")
+
+    if registry:
+        timing.remove_sink(registry)
+        if metrics_file:
+            registry.write_textfile(metrics_file)
+            logger.info(f"Metrics written to {metrics_file}")
+        if server:
+            server.stop()
+
+    if profile:
+        logger.info(f"Profiles in {Path(profile_dir) / profile['run_id']} "
+                    f"(summarise with: python scripts/profiling.py summary)")
+
     return total_success, total_failed
 
 
@@ -112,10 +162,64 @@ if __name__ == "__main__":
         action='store_true',
         help='Include population scraper (requires manual ODS files)'
     )
+    parser.add_argument(
+        '--datasets',
+        nargs='+',
+        choices=list(DATASETS),
+        metavar='DATASET',
+        help=f"Datasets to load (default: all): {', '.join(DATASETS)}"
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Reload datasets even if their content is unchanged since the last run'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f'Number of scrapers to run concurrently (default: {DEFAULT_WORKERS})'
+    )
+    parser.add_argument(
+        '--timeout',
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help=f'Per-dataset timeout in seconds, 0 to disable (default: {DEFAULT_TIMEOUT})'
+    )
+    parser.add_argument(
+        '--timings',
+        metavar='SINK',
+        help="Report per-stage timings to 'stdout' or 'jsonl:<path>' (comma-separated for both)"
+    )
+    parser.add_argument(
+        '--metrics-file',
+        type=Path,
+        help='Write Prometheus metrics to this file (atomically) when the run ends'
+    )
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        help='Serve Prometheus metrics on http://127.0.0.1:PORT/metrics while the run lasts'
+    )
+    profiling.add_arguments(parser)
 
     args = parser.parse_args()
 
-    success, failed = run_all_scrapers(skip_population=not args.include_population)
+    if args.force:
+        os.environ['HSINCHU_FORCE_REFRESH'] = '1'
+    if args.timings:
+        os.environ['HSINCHU_TIMINGS'] = args.timings
+
+    success, failed = run_all_scrapers(
+        skip_population=not args.include_population,
+        workers=args.workers,
+        timeout=args.timeout or None,
+        datasets=args.datasets,
+        profile_dir=args.profile,
+        profile_memory=args.profile_memory,
+        metrics_file=args.metrics_file,
+        metrics_port=args.metrics_port
+    )
 
     # Exit with error code if any scrapers failed
     sys.exit(0 if failed == 0 else 1)
@@ -1,57 +1,47 @@
 """
-Run all scrapers in sequence
+Run all scrapers concurrently in a single interpreter
 """
 
-import subprocess
+import argparse
 import sys
 from pathlib import Path
 
-def run_scraper(script_path):
-    """Run a single scraper"""
-    print(f"\n{'='*80}")
-    print(f"Running {script_path.name}...")
-    print('='*80)
+sys.path.insert(0, str(Path(__file__).parent))
 
-    try:
-        result = subprocess.run(
-            ['uv', 'run', 'python', str(script_path)],
-            cwd=script_path.parent,
-            timeout=60
-        )
-        return result.returncode == 0
-    except subprocess.TimeoutExpired:
-        print(f"⏱️  Timeout: {script_path.name}")
-        return False
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        return False
-
-def main():
-    """Run all scrapers"""
-    scripts_dir = Path(__file__).parent
+from datasets import DATASETS, load
+from orchestrator import ScraperJob, run_jobs, DEFAULT_WORKERS, DEFAULT_TIMEOUT
 
-    # Skip population (manual), 09_youbike.py (use 09_youbike_fixed.py instead)
-    skip_files = ['01_population.py', '09_youbike.py', 'run_all.py']
 
-    scraper_files = [
-        f for f in sorted(scripts_dir.glob('[0-9][0-9]_*.py'))
-        if f.name not in skip_files
-    ]
+def main(argv=None):
+    """Run all scrapers"""
+    parser = argparse.ArgumentParser(description='Run all Hsinchu City scrapers concurrently')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Number of scrapers to run concurrently (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help=f'Per-dataset timeout in seconds, 0 to disable (default: {DEFAULT_TIMEOUT})')
+    args = parser.parse_args(argv)
+
+    jobs = [ScraperJob(spec.name, load, (key,)) for key, spec in DATASETS.items()]
 
     success = 0
     failed = 0
 
-    for script_path in scraper_files:
-        if run_scraper(script_path):
+    for result in run_jobs(jobs, workers=args.workers, timeout=args.timeout or None):
+        if result.ok:
             success += 1
+            print(f"✅ {result.name} ({result.duration:.1f}s)")
+        elif result.status == 'timeout':
+            failed += 1
+            print(f"⏱️  Timeout: {result.name}")
         else:
             failed += 1
+            print(f"❌ Error: {result.name}: {result.error}")
 
     print(f"\n{'='*80}")
     print("SUMMARY")
     print('='*80)
-    print(f"✅ Success: {success}/{len(scraper_files)}")
-    print(f"❌ Failed: {failed}/{len(scraper_files)}")
+    print(f"✅ Success: {success}/{len(jobs)}")
+    print(f"❌ Failed: {failed}/{len(jobs)}")
 
     return 0 if failed == 0 else 1
 
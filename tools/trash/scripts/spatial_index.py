@@ -0,0 +1,147 @@
+"""
+Spatial queries over street lights
+Bounding-box, radius and k-nearest lookups served by the street_lights_rtree
+R*Tree, so "lights within 50 m of this point" probes an index instead of
+scanning every light
+
+Usage:
+    from spatial_index import lights_in_bbox, lights_within, nearest_lights
+    lights_within(24.8066, 120.9686, 50)      # [(distance_m, id, light_code, lat, lon), ...]
+    nearest_lights(24.8066, 120.9686, k=5)
+"""
+
+import logging
+import math
+from typing import List, Tuple
+
+from db_schema import STREET_LIGHTS_RTREE_SCHEMA, reading
+
+logger = logging.getLogger(__name__)
+
+# Mean Earth radius (IUGG), metres
+EARTH_RADIUS_M = 6371008.8
+
+# k-nearest searches start at this radius and double until k lights are found
+KNN_START_RADIUS_M = 100
+KNN_MAX_RADIUS_M = 100_000
+
+# A circle's bounding box is widened by this factor, as a margin on its
+# spherical approximation. R*Tree entries are 32-bit floats rounded outwards,
+# so every candidate is checked again against its stored position.
+BOX_MARGIN = 1.001
+
+
+def ensure_index(conn) -> bool:
+    """
+    Create the R*Tree and its triggers in databases initialised before they existed
+
+    Returns:
+        True when the R*Tree was created here and still needs a rebuild()
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'street_lights_rtree'"
+    ).fetchone()
+    for statement in STREET_LIGHTS_RTREE_SCHEMA:
+        conn.execute(statement)
+    return not exists
+
+
+def rebuild(conn) -> int:
+    """Refill the R*Tree from street_lights; returns the lights indexed"""
+    # Dropping is far cheaper than deleting every entry of a large R*Tree
+    conn.execute("DROP TABLE IF EXISTS street_lights_rtree")
+    ensure_index(conn)
+    return conn.execute("""
+        INSERT INTO street_lights_rtree
+        SELECT id, wgs84_latitude, wgs84_latitude, wgs84_longitude, wgs84_longitude
+        FROM street_lights
+        WHERE wgs84_latitude IS NOT NULL AND wgs84_longitude IS NOT NULL
+    """).rowcount
+
+
+def after_load(conn, replaced: bool):
+    """
+    Dataset after_load hook of street_lights
+
+    In-place upserts are mirrored by the triggers; a swapped-in staging table
+    brought new ids, so the R*Tree is rebuilt.
+    """
+    if ensure_index(conn) or replaced:
+        logger.info(f"street_lights_rtree: indexed {rebuild(conn)} lights")
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in metres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _box(lat: float, lon: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """(min_lat, min_lon, max_lat, max_lon) enclosing a circle"""
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M) * BOX_MARGIN
+    dlon = dlat / max(math.cos(math.radians(lat)), 1e-12)
+    return lat - dlat, lon - dlon, lat + dlat, lon + dlon
+
+
+def _probe(conn, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[tuple]:
+    return conn.execute("""
+        SELECT s.id, s.light_code, s.wgs84_latitude, s.wgs84_longitude
+        FROM street_lights_rtree r JOIN street_lights s ON s.id = r.id
+        WHERE r.max_lat >= ? AND r.min_lat <= ? AND r.max_lon >= ? AND r.min_lon <= ?
+    """, (min_lat, max_lat, min_lon, max_lon)).fetchall()
+
+
+def lights_in_bbox(min_lat: float, min_lon: float, max_lat: float, max_lon: float, conn=None) -> List[tuple]:
+    """
+    Street lights inside a WGS84 bounding box (edges included)
+
+    Returns:
+        List of (id, light_code, latitude, longitude)
+    """
+    with reading(conn) as conn:
+        return [row for row in _probe(conn, min_lat, min_lon, max_lat, max_lon)
+                if min_lat <= row[2] <= max_lat and min_lon <= row[3] <= max_lon]
+
+
+def lights_within(lat: float, lon: float, radius_m: float, conn=None) -> List[tuple]:
+    """
+    Street lights within radius_m metres of a point, nearest first
+
+    Returns:
+        List of (distance_m, id, light_code, latitude, longitude)
+    """
+    with reading(conn) as conn:
+        return _within(conn, lat, lon, radius_m)
+
+
+def _within(conn, lat: float, lon: float, radius_m: float) -> List[tuple]:
+    found = []
+    for light_id, code, light_lat, light_lon in _probe(conn, *_box(lat, lon, radius_m)):
+        distance = haversine_m(lat, lon, light_lat, light_lon)
+        if distance <= radius_m:
+            found.append((distance, light_id, code, light_lat, light_lon))
+    found.sort()
+    return found
+
+
+def nearest_lights(lat: float, lon: float, k: int = 1, max_radius_m: float = KNN_MAX_RADIUS_M,
+                   conn=None) -> List[tuple]:
+    """
+    The k street lights nearest to a point
+
+    The search radius doubles from KNN_START_RADIUS_M until it holds k
+    lights; everything outside it is farther than all of those, so the
+    result is exact. Fewer than k come back when max_radius_m is reached.
+
+    Returns:
+        List of (distance_m, id, light_code, latitude, longitude), nearest first
+    """
+    radius = min(KNN_START_RADIUS_M, max_radius_m)
+    with reading(conn) as conn:
+        while True:
+            found = _within(conn, lat, lon, radius)
+            if len(found) >= k or radius >= max_radius_m:
+                return found[:k]
+            radius = min(radius * 2, max_radius_m)
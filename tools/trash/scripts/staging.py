@@ -0,0 +1,118 @@
+"""
+Staging-table loads with an atomic swap
+A full reload fills an empty copy of the table, builds its indexes after the
+bulk insert, validates it and renames it over the live table in the same
+transaction, so readers only ever see the old or the new version
+"""
+
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+STAGING_SUFFIX = '__staging'
+OLD_SUFFIX = '__old'
+
+
+class LoadValidationError(Exception):
+    """A loaded table failed validation and was not swapped in"""
+
+
+def table_is_empty(conn, table: str) -> bool:
+    return conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() is None
+
+
+def _retarget(sql: str, pattern: str, table: str, new_name: str) -> str:
+    """Point a CREATE statement from sqlite_master at another table name"""
+    rewritten, count = re.subn(pattern.format(re.escape(table)), lambda m: m.group(1) + new_name, sql,
+                               count=1, flags=re.IGNORECASE)
+    if not count:
+        raise ValueError(f"Cannot rewrite schema statement for {table}: {sql}")
+    return rewritten
+
+
+class StagingTable:
+    """
+    Empty copy of a live table that replaces it on swap()
+
+    Usage:
+        staging = StagingTable(conn, 'parks')
+        staging.create()
+        ... insert into staging.name ...
+        staging.validate()
+        staging.swap()
+        conn.commit()
+
+    Nothing is committed here: run create() through swap() in one transaction
+    and a failure anywhere rolls back to the previous version untouched.
+
+    Args:
+        conn: Open connection
+        table: Live table name
+    """
+
+    def __init__(self, conn, table: str):
+        self.conn = conn
+        self.table = table
+        self.name = table + STAGING_SUFFIX
+
+    def _schema(self, kind: str):
+        return self.conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = ? AND tbl_name = ? AND sql IS NOT NULL",
+            (kind, self.table)
+        ).fetchall()
+
+    def create(self):
+        """Create the staging table with the live table's columns and constraints, but no indexes"""
+        tables = self._schema('table')
+        if not tables:
+            raise ValueError(f"Table {self.table} does not exist")
+
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.execute(f"DROP TABLE IF EXISTS {self.name}")
+        self.conn.execute(_retarget(tables[0][1], r'^(CREATE\s+TABLE\s+)"?{}"?', self.table, self.name))
+
+    def row_count(self) -> int:
+        return self.conn.execute(f"SELECT COUNT(*) FROM {self.name}").fetchone()[0]
+
+    def validate(self, min_rows: int = 1):
+        """
+        Check the staged data before it replaces the live table
+
+        Raises:
+            LoadValidationError if fewer than min_rows rows were staged
+        """
+        count = self.row_count()
+        if count < min_rows:
+            raise LoadValidationError(f"{self.table}: staged {count} rows, expected at least {min_rows}")
+
+    def swap(self):
+        """
+        Build indexes on the staging table and rename it over the live table
+
+        Index definitions are taken from the live table, so they keep their
+        names. Renames run with legacy_alter_table so foreign keys in other
+        tables keep pointing at the live name. The live table's triggers are
+        recreated on the new one; they did not fire for the staged rows.
+        """
+        conn = self.conn
+        indexes = self._schema('index')
+        triggers = self._schema('trigger')
+        for name, _ in indexes:
+            conn.execute(f"DROP INDEX {name}")
+        for _, sql in indexes:
+            conn.execute(_retarget(sql, r'(\bON\s+)"?{}"?(?=\s*\()', self.table, self.name))
+
+        old = self.table + OLD_SUFFIX
+        conn.execute("PRAGMA legacy_alter_table = ON")
+        try:
+            conn.execute(f"DROP TABLE IF EXISTS {old}")
+            conn.execute(f"ALTER TABLE {self.table} RENAME TO {old}")
+            conn.execute(f"ALTER TABLE {self.name} RENAME TO {self.table}")
+            conn.execute(f"DROP TABLE {old}")
+        finally:
+            conn.execute("PRAGMA legacy_alter_table = OFF")
+        for _, sql in triggers:
+            conn.execute(sql)
+        logger.info(f"Swapped in new {self.table} ({len(indexes)} indexes rebuilt)")
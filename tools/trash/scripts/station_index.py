@@ -0,0 +1,385 @@
+"""
+Nearest YouBike stations
+An in-memory grid over youbike_stations answers "nearest N stations" and
+"stations within r metres" in microseconds, for one point or thousands at once
+
+The grid is rebuilt from the table in a few milliseconds. station_index()
+keeps one per database and rebuilds it when the database file has changed,
+so a reload is picked up by the next query.
+
+Usage:
+    from station_index import nearest_stations, station_index, stations_within
+    nearest_stations(24.8066, 120.9686, k=3)    # [(distance_m, id, station_name, lat, lon), ...]
+    stations_within(24.8066, 120.9686, 500)
+    distances, ids = station_index().nearest_many(park_lats, park_lons, k=3)
+
+    uv run python scripts/station_index.py nearest 24.8066 120.9686 --k 3
+    uv run python scripts/station_index.py within 24.8066 120.9686 500
+"""
+
+import argparse
+import math
+import os
+import sys
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+import db_schema
+from spatial_index import BOX_MARGIN, EARTH_RADIUS_M
+
+# Metres per degree of latitude
+METRES_PER_DEGREE = EARTH_RADIUS_M * math.pi / 180
+
+# Grid cells are sized for about this many stations each, and never narrower
+# than MIN_CELL_M
+STATIONS_PER_CELL = 4
+MIN_CELL_M = 50.0
+
+
+def _haversine(lat: np.ndarray, lon: np.ndarray, cos_lat: np.ndarray,
+               station_lat: np.ndarray, station_lon: np.ndarray, station_cos: np.ndarray) -> np.ndarray:
+    """Great-circle metres between points and stations, all in radians; broadcasts"""
+    a = (np.sin((station_lat - lat) / 2) ** 2
+         + cos_lat * station_cos * np.sin((station_lon - lon) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class StationIndex:
+    """
+    Uniform latitude/longitude grid over station positions
+
+    Stations are stored sorted by cell, row-major, so the cells of one grid
+    row inside a search window are a single contiguous slice. A search
+    window of ring r (the query's cell and r cells around it) holds every
+    station within r cells of the query; distances are then exact haversine
+    on those candidates only.
+    """
+
+    def __init__(self, ids, names, latitudes, longitudes):
+        ids = np.asarray(ids, dtype=np.int64)
+        lat = np.asarray(latitudes, dtype=float)
+        lon = np.asarray(longitudes, dtype=float)
+        located = np.isfinite(lat) & np.isfinite(lon)
+        names = [name for name, keep in zip(names, located) if keep]
+        ids, lat, lon = ids[located], lat[located], lon[located]
+        self.size = len(ids)
+
+        if self.size:
+            self.lat0, self.lon0 = lat.min(), lon.min()
+            # Cells are at least cell_m wide everywhere up to the farthest
+            # station from the equator
+            self.cos_limit = math.cos(math.radians(np.abs(lat).max()))
+            height = (lat.max() - self.lat0) * METRES_PER_DEGREE
+            width = (lon.max() - self.lon0) * METRES_PER_DEGREE * self.cos_limit
+            self.cell_m = max(MIN_CELL_M, math.sqrt(height * width * STATIONS_PER_CELL / self.size))
+        else:
+            self.lat0 = self.lon0 = 0.0
+            self.cos_limit, self.cell_m = 1.0, MIN_CELL_M
+            height = width = 0.0
+        self.cell_lat = self.cell_m / METRES_PER_DEGREE
+        self.cell_lon = self.cell_lat / self.cos_limit
+        self.rows = int(height // self.cell_m) + 1
+        self.cols = int(width // self.cell_m) + 1
+
+        row, col = self._cells(lat, lon)
+        cells = row * self.cols + col
+        order = np.argsort(cells, kind='stable')
+        self.ids = ids[order]
+        self.names = [names[i] for i in order]
+        self.latitude, self.longitude = lat[order], lon[order]
+        self._lat, self._lon = np.radians(self.latitude), np.radians(self.longitude)
+        self._cos = np.cos(self._lat)
+        # Stations of cell c are [offsets[c], offsets[c + 1])
+        self.offsets = np.searchsorted(cells[order], np.arange(self.rows * self.cols + 1))
+
+    @classmethod
+    def from_table(cls, conn) -> 'StationIndex':
+        """Index every youbike_stations row with a position"""
+        rows = conn.execute("""
+            SELECT id, station_name, latitude, longitude FROM youbike_stations
+            WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+        """).fetchall()
+        ids, names, lat, lon = zip(*rows) if rows else ((), (), (), ())
+        return cls(ids, names, lat, lon)
+
+    def _cells(self, lat, lon) -> Tuple[np.ndarray, np.ndarray]:
+        """Grid (row, col) of points; points off the grid take the nearest edge cell"""
+        row = np.clip(np.floor((np.asarray(lat) - self.lat0) / self.cell_lat), 0, self.rows - 1)
+        col = np.clip(np.floor((np.asarray(lon) - self.lon0) / self.cell_lon), 0, self.cols - 1)
+        return row.astype(np.int64), col.astype(np.int64)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        """_cells() of one point, without NumPy's per-call overhead"""
+        row = min(max(math.floor((lat - self.lat0) / self.cell_lat), 0), self.rows - 1)
+        col = min(max(math.floor((lon - self.lon0) / self.cell_lon), 0), self.cols - 1)
+        return row, col
+
+    def _window(self, row: int, col: int, ring: int) -> np.ndarray:
+        """Positions of the stations within ring cells of (row, col)"""
+        first, last = max(col - ring, 0), min(col + ring, self.cols - 1)
+        slices = [(self.offsets[r * self.cols + first], self.offsets[r * self.cols + last + 1])
+                  for r in range(max(row - ring, 0), min(row + ring, self.rows - 1) + 1)]
+        if len(slices) == 1:
+            return np.arange(*slices[0])
+        return np.concatenate([np.arange(start, stop) for start, stop in slices])
+
+    def _whole_grid(self, row: int, col: int, ring: int) -> bool:
+        return (row - ring <= 0 and col - ring <= 0
+                and row + ring >= self.rows - 1 and col + ring >= self.cols - 1)
+
+    def _ring_m(self, lat) -> float:
+        """
+        Metres each ring is guaranteed to add around a point at latitude lat
+
+        Anything outside ring r is at least r times this far from a point in
+        the centre cell. Cells narrow in metres towards the poles, so points
+        farther from the equator than every station get less.
+        """
+        cos_lat = math.cos(math.radians(float(np.max(np.abs(lat)))))
+        return self.cell_m * min(1.0, cos_lat / self.cos_limit) / BOX_MARGIN
+
+    def _rings(self, radius_m: float, ring_m: float) -> int:
+        return int(math.ceil(radius_m / ring_m)) if math.isfinite(radius_m) else self.rows + self.cols
+
+    def _distances(self, lat, lon, positions: np.ndarray) -> np.ndarray:
+        """Metres from points (column vectors for several) to the stations at positions"""
+        lat, lon = np.radians(lat), np.radians(lon)
+        return _haversine(lat, lon, np.cos(lat),
+                          self._lat[positions], self._lon[positions], self._cos[positions])
+
+    def _results(self, distances: np.ndarray, positions: np.ndarray) -> List[tuple]:
+        return [(d, int(self.ids[p]), self.names[p], float(self.latitude[p]), float(self.longitude[p]))
+                for d, p in zip(distances.tolist(), positions.tolist())]
+
+    def nearest(self, lat: float, lon: float, k: int = 1, max_distance_m: Optional[float] = None) -> List[tuple]:
+        """
+        The k stations nearest to a point
+
+        The search window grows until the k-th nearest candidate lies inside
+        the distance it guarantees, so the result is exact.
+
+        Args:
+            max_distance_m: Drop stations farther than this
+
+        Returns:
+            List of (distance_m, id, station_name, latitude, longitude), nearest first
+        """
+        k = min(k, self.size)
+        if k <= 0:
+            return []
+        row, col = self._cell(lat, lon)
+        ring_m = self._ring_m(lat)
+        # Ring 0 guarantees nothing beyond the query's own cell
+        ring = 1
+        while True:
+            positions = self._window(row, col, ring)
+            whole = self._whole_grid(row, col, ring)
+            if len(positions) < k and not whole:
+                ring += 1
+                continue
+            distances = self._distances(lat, lon, positions)
+            if len(positions) > k:
+                keep = np.argpartition(distances, k - 1)[:k]
+                positions, distances = positions[keep], distances[keep]
+            farthest = distances.max()
+            if whole or farthest <= ring * ring_m:
+                break
+            ring = max(ring + 1, self._rings(farthest, ring_m))
+
+        order = np.argsort(distances, kind='stable')
+        distances, positions = distances[order], positions[order]
+        if max_distance_m is not None:
+            inside = distances <= max_distance_m
+            distances, positions = distances[inside], positions[inside]
+        return self._results(distances, positions)
+
+    def within(self, lat: float, lon: float, radius_m: float) -> List[tuple]:
+        """
+        Stations within radius_m metres of a point
+
+        Returns:
+            List of (distance_m, id, station_name, latitude, longitude), nearest first
+        """
+        if not self.size:
+            return []
+        row, col = self._cell(lat, lon)
+        positions = self._window(row, col, self._rings(radius_m, self._ring_m(lat)))
+        distances = self._distances(lat, lon, positions)
+        inside = distances <= radius_m
+        distances, positions = distances[inside], positions[inside]
+        order = np.argsort(distances, kind='stable')
+        return self._results(distances[order], positions[order])
+
+    def _groups(self, lats, lons):
+        """
+        Query points grouped by grid cell
+
+        Yields:
+            (row, col, point positions) for each cell holding valid points
+        """
+        lats, lons = np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+        valid = np.flatnonzero(np.isfinite(lats) & np.isfinite(lons))
+        row, col = self._cells(lats[valid], lons[valid])
+        cells = row * self.cols + col
+        order = np.argsort(cells, kind='stable')
+        cells, valid = cells[order], valid[order]
+        starts = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1]])
+        for start, stop in zip(starts, np.r_[starts[1:], len(cells)]):
+            yield int(cells[start] // self.cols), int(cells[start] % self.cols), valid[start:stop]
+
+    def nearest_many(self, lats, lons, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The k nearest stations to each of many points
+
+        Points sharing a grid cell are searched together, as one distance
+        matrix against one candidate window.
+
+        Returns:
+            (distances_m, ids), both (points, k) and nearest first; NaN and -1
+            where a point has no coordinates or fewer than k stations exist
+        """
+        lats, lons = np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+        distances = np.full((len(lats), k), np.nan)
+        ids = np.full((len(lats), k), -1, dtype=np.int64)
+        found = min(k, self.size)
+        if found <= 0:
+            return distances, ids
+
+        for row, col, points in self._groups(lats, lons):
+            lat, lon = lats[points, None], lons[points, None]
+            ring_m = self._ring_m(lat)
+            # Ring 0 guarantees nothing beyond the query's own cell
+            ring = 1
+            while True:
+                positions = self._window(row, col, ring)
+                whole = self._whole_grid(row, col, ring)
+                if len(positions) < found and not whole:
+                    ring += 1
+                    continue
+                matrix = self._distances(lat, lon, positions)
+                if len(positions) > found:
+                    keep = np.argpartition(matrix, found - 1, axis=1)[:, :found]
+                else:
+                    keep = np.broadcast_to(np.arange(len(positions)), matrix.shape)
+                nearest = np.take_along_axis(matrix, keep, axis=1)
+                farthest = nearest.max()
+                if whole or farthest <= ring * ring_m:
+                    break
+                ring = max(ring + 1, self._rings(farthest, ring_m))
+
+            order = np.argsort(nearest, axis=1, kind='stable')
+            distances[points, :found] = np.take_along_axis(nearest, order, axis=1)
+            ids[points, :found] = self.ids[positions[np.take_along_axis(keep, order, axis=1)]]
+        return distances, ids
+
+    def within_many(self, lats, lons, radius_m: float) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Stations within radius_m metres of each of many points
+
+        Returns:
+            One (distances_m, ids) pair of arrays per point, nearest first;
+            empty for points without coordinates
+        """
+        lats, lons = np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+        empty = (np.empty(0), np.empty(0, dtype=np.int64))
+        results = [empty] * len(lats)
+        if not self.size:
+            return results
+
+        for row, col, points in self._groups(lats, lons):
+            lat, lon = lats[points, None], lons[points, None]
+            positions = self._window(row, col, self._rings(radius_m, self._ring_m(lat)))
+            matrix = self._distances(lat, lon, positions)
+            for point, distances in zip(points, matrix):
+                inside = np.flatnonzero(distances <= radius_m)
+                inside = inside[np.argsort(distances[inside], kind='stable')]
+                results[point] = (distances[inside], self.ids[positions[inside]])
+        return results
+
+
+# Database path -> (file stamp when built, StationIndex)
+_indexes = {}
+
+
+def _stamp(path: Path) -> tuple:
+    """Modification time and size of the database and its WAL; a commit changes one of them"""
+    stamp = []
+    for file in (path, Path(f"{path}-wal")):
+        try:
+            stat = os.stat(file)
+            stamp.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def station_index(conn=None) -> StationIndex:
+    """
+    The station index of the current database
+
+    Without a connection the index is cached per database and rebuilt after
+    the database file changes (any commit, not only station reloads). With
+    one, a fresh index is built from it, e.g. inside a load's transaction.
+    """
+    if conn is not None:
+        return StationIndex.from_table(conn)
+    path = db_schema.database_path()
+    # Stamped before reading: a commit racing the build makes the next call rebuild
+    stamp = _stamp(path)
+    cached = _indexes.get(path)
+    if cached is None or cached[0] != stamp:
+        with db_schema.reading() as conn:
+            cached = _indexes[path] = (stamp, StationIndex.from_table(conn))
+    return cached[1]
+
+
+def nearest_stations(lat: float, lon: float, k: int = 1, max_distance_m: Optional[float] = None,
+                     conn=None) -> List[tuple]:
+    """
+    The k YouBike stations nearest to a point
+
+    Returns:
+        List of (distance_m, id, station_name, latitude, longitude), nearest first
+    """
+    return station_index(conn).nearest(lat, lon, k, max_distance_m)
+
+
+def stations_within(lat: float, lon: float, radius_m: float, conn=None) -> List[tuple]:
+    """
+    YouBike stations within radius_m metres of a point
+
+    Returns:
+        List of (distance_m, id, station_name, latitude, longitude), nearest first
+    """
+    return station_index(conn).within(lat, lon, radius_m)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Nearest YouBike stations')
+    commands = parser.add_subparsers(dest='command', required=True)
+    nearest = commands.add_parser('nearest', help='The k stations nearest to a point')
+    nearest.add_argument('lat', type=float)
+    nearest.add_argument('lon', type=float)
+    nearest.add_argument('--k', type=int, default=5, help='Stations to list (default: 5)')
+    within = commands.add_parser('within', help='Stations within a radius of a point')
+    within.add_argument('lat', type=float)
+    within.add_argument('lon', type=float)
+    within.add_argument('radius', type=float, help='Radius in metres')
+    args = parser.parse_args(argv)
+
+    if args.command == 'nearest':
+        stations = nearest_stations(args.lat, args.lon, args.k)
+    else:
+        stations = stations_within(args.lat, args.lon, args.radius)
+    if not stations:
+        print("❌ No stations found")
+        return 1
+    for distance, _, name, lat, lon in stations:
+        print(f"{distance:>9.1f} m  {name}  ({lat:.6f}, {lon:.6f})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
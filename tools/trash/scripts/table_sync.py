@@ -0,0 +1,254 @@
+"""
+Natural-key synchronisation of scraped rows into SQLite tables
+Matches incoming rows to stored rows by natural key and content hash, so a
+reload only writes rows that are new or changed and removes rows that
+disappeared from the source
+"""
+
+import hashlib
+import logging
+import sqlite3
+from dataclasses import astuple, dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from db_schema import NATURAL_KEYS
+
+logger = logging.getLogger(__name__)
+
+# Column holding the content hash of the mapped values
+HASH_COLUMN = 'row_hash'
+
+
+@dataclass
+class SyncStats:
+    """Outcome of one table sync"""
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+    errors: int = 0
+
+    @property
+    def written(self) -> int:
+        return self.inserted + self.updated
+
+    def __add__(self, other: 'SyncStats') -> 'SyncStats':
+        """Totals of two syncs, e.g. of one table synced scope by scope"""
+        return SyncStats(*(a + b for a, b in zip(astuple(self), astuple(other))))
+
+    def __str__(self):
+        return (f"{self.inserted} inserted, {self.updated} updated, {self.unchanged} unchanged, "
+                f"{self.deleted} deleted, {self.errors} errors")
+
+
+def row_hash(values: Sequence) -> str:
+    """Content hash of a converted row"""
+    return hashlib.sha1(repr(tuple(values)).encode('utf-8')).hexdigest()
+
+
+def write_batch(conn, sql, rows, row_ids) -> Tuple[int, int]:
+    """
+    Run a statement for a batch with executemany(), falling back to row-by-row on failure
+
+    The batch runs inside a savepoint so a constraint violation in one row
+    rolls back only that batch, which is then retried row by row to keep
+    per-row error accounting.
+
+    Returns:
+        Tuple of (written, errors)
+    """
+    if not rows:
+        return 0, 0
+
+    cursor = conn.cursor()
+    if not conn.in_transaction:
+        cursor.execute("BEGIN IMMEDIATE")
+
+    cursor.execute("SAVEPOINT batch_write")
+    try:
+        cursor.executemany(sql, rows)
+        cursor.execute("RELEASE SAVEPOINT batch_write")
+        return len(rows), 0
+    except sqlite3.Error:
+        cursor.execute("ROLLBACK TO SAVEPOINT batch_write")
+        cursor.execute("RELEASE SAVEPOINT batch_write")
+
+    written = 0
+    errors = 0
+    for idx, row in zip(row_ids, rows):
+        try:
+            cursor.execute(sql, row)
+            written += 1
+        except Exception as e:
+            logger.error(f"Error processing row {idx}: {e}")
+            errors += 1
+    return written, errors
+
+
+def ensure_hash_column(conn, table: str) -> List[str]:
+    """
+    Add the row hash column to a table created before it existed
+
+    Returns:
+        The table's column names
+    """
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    if not columns:
+        raise ValueError(f"Table {table} does not exist")
+    if HASH_COLUMN not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {HASH_COLUMN} TEXT")
+        columns.append(HASH_COLUMN)
+    return columns
+
+
+class TableSync:
+    """
+    Upserts rows into one table by natural key
+
+    Usage:
+        sync = TableSync(conn, 'parks', plan.columns)
+        sync.apply(rows, row_ids)   # once per batch
+        stats = sync.finish()       # after the whole source was read
+
+    Rows sharing a key are matched one to one (identical content first), so
+    tables whose key is not unique in the source still reload idempotently.
+    Stored rows not matched by the end of the load are deleted by finish();
+    only call it when the whole source was read.
+
+    Args:
+        conn: Open connection; nothing is committed here
+        table: Table name
+        columns: DB columns of the incoming rows, in row order
+        key_columns: Natural key (defaults to db_schema.NATURAL_KEYS[table])
+        scope: {column: value} limiting the stored rows this load owns, e.g.
+            one report month of a table fed by several files
+    """
+
+    def __init__(self, conn, table: str, columns: Sequence[str],
+                 key_columns: Optional[Sequence[str]] = None, scope: Optional[Dict[str, object]] = None):
+        if key_columns is None:
+            if table not in NATURAL_KEYS:
+                raise ValueError(f"No natural key defined for {table}")
+            key_columns = NATURAL_KEYS[table]
+
+        self.conn = conn
+        self.table = table
+        self.columns = list(columns)
+        self.key_columns = list(key_columns)
+        self.scope = dict(scope or {})
+        self.stats = SyncStats()
+
+        missing = [c for c in self.key_columns if c not in self.columns]
+        if missing:
+            raise ValueError(f"{table}: key columns not loaded: {', '.join(missing)}")
+        self._key_idx = [self.columns.index(c) for c in self.key_columns]
+
+        table_columns = ensure_hash_column(conn, table)
+        touch = ", updated_at = CURRENT_TIMESTAMP" if 'updated_at' in table_columns else ""
+        self.insert_sql = (f"INSERT INTO {table} ({', '.join(self.columns)}, {HASH_COLUMN}) "
+                           f"VALUES ({', '.join('?' for _ in range(len(self.columns) + 1))})")
+        self.update_sql = (f"UPDATE {table} SET {', '.join(f'{c} = ?' for c in self.columns)}, "
+                           f"{HASH_COLUMN} = ?{touch} WHERE id = ?")
+
+        self._existing = self._load_existing()
+
+    def _load_existing(self) -> Dict[tuple, List[Tuple[int, Optional[str]]]]:
+        """{key: [(id, row_hash), ...]} for the stored rows in scope"""
+        sql = f"SELECT id, {HASH_COLUMN}, {', '.join(self.key_columns)} FROM {self.table}"
+        params = list(self.scope.values())
+        if self.scope:
+            sql += " WHERE " + " AND ".join(f"{c} IS ?" for c in self.scope)
+
+        existing = {}
+        for row_id, digest, *key in self.conn.execute(sql, params):
+            existing.setdefault(tuple(key), []).append((row_id, digest))
+        return existing
+
+    def key(self, row: Sequence) -> tuple:
+        return tuple(row[i] for i in self._key_idx)
+
+    def match(self, row: Sequence, digest: str) -> Tuple[str, Optional[int]]:
+        """
+        Claim the stored row an incoming row replaces
+
+        Returns:
+            ('new', None), ('changed', id) or ('unchanged', id)
+        """
+        candidates = self._existing.get(self.key(row))
+        if not candidates:
+            return 'new', None
+        for i, (row_id, stored) in enumerate(candidates):
+            if stored == digest:
+                del candidates[i]
+                return 'unchanged', row_id
+        row_id, _ = candidates.pop(0)
+        return 'changed', row_id
+
+    def apply(self, rows: List[tuple], row_ids: List) -> Tuple[int, int]:
+        """
+        Sync a batch of rows
+
+        Returns:
+            Tuple of (written, errors)
+        """
+        inserts, insert_ids = [], []
+        updates, update_ids = [], []
+        for idx, row in zip(row_ids, rows):
+            digest = row_hash(row)
+            status, row_id = self.match(row, digest)
+            if status == 'new':
+                inserts.append((*row, digest))
+                insert_ids.append(idx)
+            elif status == 'changed':
+                updates.append((*row, digest, row_id))
+                update_ids.append(idx)
+            else:
+                self.stats.unchanged += 1
+
+        inserted, insert_errors = write_batch(self.conn, self.insert_sql, inserts, insert_ids)
+        updated, update_errors = write_batch(self.conn, self.update_sql, updates, update_ids)
+        self.stats.inserted += inserted
+        self.stats.updated += updated
+        self.stats.errors += insert_errors + update_errors
+        return inserted + updated, insert_errors + update_errors
+
+    def upsert(self, row: Sequence, digest: Optional[str] = None) -> Tuple[str, int]:
+        """
+        Sync a single row, for loaders that need the row id (e.g. to write child rows)
+
+        Args:
+            row: Converted row
+            digest: Hash to store; pass one covering child data so a change
+                there also marks the row as changed (defaults to row_hash(row))
+
+        Returns:
+            Tuple of (status, id) with status 'new', 'changed' or 'unchanged'
+        """
+        digest = digest or row_hash(row)
+        status, row_id = self.match(row, digest)
+        if status == 'new':
+            row_id = self.conn.execute(self.insert_sql, (*row, digest)).lastrowid
+            self.stats.inserted += 1
+        elif status == 'changed':
+            self.conn.execute(self.update_sql, (*row, digest, row_id))
+            self.stats.updated += 1
+        else:
+            self.stats.unchanged += 1
+        return status, row_id
+
+    def finish(self, delete_missing: bool = True) -> SyncStats:
+        """
+        Delete stored rows the source no longer contains
+
+        Args:
+            delete_missing: Pass False to keep unmatched rows, e.g. when some
+                source rows failed and may be among them
+        """
+        stale = [(row_id,) for candidates in self._existing.values() for row_id, _ in candidates]
+        if not delete_missing:
+            stale = []
+        if stale:
+            self.conn.executemany(f"DELETE FROM {self.table} WHERE id = ?", stale)
+        self.stats.deleted += len(stale)
+        self._existing = {}
+        return self.stats
@@ -1,86 +1,371 @@
 """
-Test all scrapers and report results
+Test all scrapers against the recorded fixtures
+Runs every scraper in-process and in parallel, each against its own scratch
+database, with downloads served by a local stand-in for the portal, and
+checks the row counts and content checksums of the loaded tables; then runs
+them all again into one shared database, as run_all.py does, and once more
+from fixtures scaled up the way bench_pipeline.py serves them, and checks
+that a timed-out load is rolled back
+
+Usage:
+    uv run python scripts/test_all_scrapers.py
+    uv run python scripts/test_all_scrapers.py --datasets parks cctv --workers 4
+    uv run python scripts/test_all_scrapers.py --update    # record expected counts and checksums
 """
 
-import subprocess
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import logging
+import os
 import sys
+import tempfile
+import time
 from pathlib import Path
+from typing import Optional
 
-def test_scraper(script_path):
-    """Test a single scraper"""
-    try:
-        result = subprocess.run(
-            ['uv', 'run', 'python', script_path.name],
-            cwd=script_path.parent,
-            capture_output=True,
-            text=True,
-            timeout=60
-        )
-
-        # Check for success indicators
-        if result.returncode == 0 and ('✅' in result.stdout or 'inserted' in result.stdout.lower()):
-            # Extract record count if available
-            lines = result.stdout.split('\n')
-            for line in lines:
-                if '✅ Completed' in line or 'inserted' in line.lower():
-                    return ('success', line.strip())
-            return ('success', 'Completed successfully')
-        else:
-            error_msg = result.stderr if result.stderr else result.stdout
-            return ('error', error_msg[:200])
-
-    except subprocess.TimeoutExpired:
-        return ('timeout', 'Script timeout after 60s')
-    except Exception as e:
-        return ('error', str(e)[:200])
-
-def main():
-    """Test all scraper scripts"""
-    scripts_dir = Path(__file__).parent
-
-    results = []
-    print("Testing all scrapers...\n")
-
-    # Get all numbered scraper files
-    scraper_files = sorted([
-        f for f in scripts_dir.glob('[0-9][0-9]_*.py')
-        if 'fixed' not in f.name and 'youbike.py' not in f.name  # Skip old youbike
-    ])
-
-    for script_path in scraper_files:
-        script_name = script_path.name
-        print(f"Testing {script_name}...", end=' ')
-
-        status, message = test_scraper(script_path)
-        results.append((script_name, status, message))
-
-        if status == 'success':
-            print(f"✅ {message}")
-        elif status == 'timeout':
-            print(f"⏱️  {message}")
+from bench_pipeline import FIXTURES_DIR, load_manifest, scale_fixture, served_name
+
+EXPECTED_PATH = FIXTURES_DIR / "expected_loads.json"
+
+# Per-scraper time limit in seconds
+DEFAULT_TIMEOUT = 60
+
+DEFAULT_WORKERS = 8
+
+# Columns that differ between otherwise identical loads
+VOLATILE_COLUMNS = {'id', 'created_at', 'updated_at'}
+
+# Row multiplier of the scaled pass (only row counts are compared there)
+SCALE = 3
+
+# Population reports are not downloaded, so this multi-sheet workbook (two
+# report sheets with different headers, one notes sheet) is loaded from disk
+POPULATION = 'population'
+POPULATION_FIXTURE = FIXTURES_DIR / "202401-新竹市-區域年齡層月報表.xlsx"
+POPULATION_TABLES = ['population_age_by_neighborhood']
+
+# Timeout of the cancellation check; the job holding the write lock would run for CANCEL_HOLD
+CANCEL_TIMEOUT = 0.5
+CANCEL_HOLD = 30
+
+
+def table_checksum(conn, table: str):
+    """
+    Row count and an order-independent checksum of a table's content
+
+    Surrogate ids, timestamps and foreign keys to surrogate ids are left
+    out, so the checksum only depends on what was loaded.
+
+    Returns:
+        Dict with 'rows' and 'checksum'
+    """
+    foreign = {row[3] for row in conn.execute(f"PRAGMA foreign_key_list({table})")}
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")
+               if row[1] not in VOLATILE_COLUMNS and row[1] not in foreign]
+    rows = sorted(repr(row) for row in conn.execute(f"SELECT {', '.join(columns)} FROM {table}"))
+    digest = hashlib.sha256('\n'.join(rows).encode('utf-8')).hexdigest()
+    return {'rows': len(rows), 'checksum': digest[:16]}
+
+
+def load_dataset(dataset: str, url: str, tables: list, db_path: Path) -> dict:
+    """Load one dataset from url into the database at db_path and summarise the loaded tables"""
+    from datasets import load
+    from db_schema import get_connection, use_database
+
+    with use_database(db_path):
+        load(dataset, url=url)
+        conn = get_connection()
+        try:
+            return {table: table_checksum(conn, table) for table in tables}
+        finally:
+            conn.close()
+
+
+def load_population(db_path: Path) -> dict:
+    """Load every sheet of the population fixture into the database at db_path and summarise the table"""
+    import importlib
+    from db_schema import get_connection, use_database
+
+    population = importlib.import_module('01_population')
+    with use_database(db_path):
+        if population.load_reports([POPULATION_FIXTURE], workers=1):
+            raise RuntimeError(f"{POPULATION_FIXTURE.name} did not load")
+        conn = get_connection()
+        try:
+            return {table: table_checksum(conn, table) for table in POPULATION_TABLES}
+        finally:
+            conn.close()
+
+
+def check(loaded: dict, expected: Optional[dict], required: bool = True, scale: int = 1) -> list:
+    """
+    Compare loaded tables with the expected counts and checksums
+
+    Args:
+        expected: Recorded counts and checksums of the dataset, None if never recorded
+        required: Whether a dataset without recorded values fails
+        scale: Row multiplier the fixture was served with; scaled loads only compare row counts
+
+    Returns:
+        List of problems (empty when the load matches)
+    """
+    problems = [f"{table} is empty" for table, summary in loaded.items() if not summary['rows']]
+    if expected is None:
+        if required:
+            problems.append("no expected values; run with --update")
+        return problems
+    for table, want in expected.items():
+        got = loaded.get(table)
+        if got is None:
+            problems.append(f"{table} not checked")
+        elif got['rows'] != want['rows'] * scale:
+            problems.append(f"{table} has {got['rows']} rows, expected {want['rows'] * scale}")
+        elif scale == 1 and got['checksum'] != want['checksum']:
+            problems.append(f"{table} checksum {got['checksum']} != expected {want['checksum']}")
+    return problems
+
+
+def run_loads(jobs, reference: dict, required: bool, workers: int, timeout: float, scale: int = 1) -> tuple:
+    """
+    Run load_dataset jobs and print one line per dataset
+
+    Returns:
+        Tuple of ({dataset: loaded table summaries} of the jobs that ran,
+        {dataset: list of problems}, empty for the datasets that passed)
+    """
+    from orchestrator import run_jobs
+
+    loaded = {}
+    problems = {}
+    for result in run_jobs(jobs, workers=workers, timeout=timeout):
+        if not result.ok:
+            icon = '⏱️ ' if result.status == 'timeout' else '❌'
+            print(f"{icon} {result.name}: {result.status} - {result.error}")
+            problems[result.name] = [f"{result.status}: {result.error}"]
+            continue
+
+        loaded[result.name] = result.result
+        problems[result.name] = check(result.result, reference.get(result.name), required=required, scale=scale)
+        summary = ', '.join(f"{table} {s['rows']}" for table, s in result.result.items())
+        if problems[result.name]:
+            print(f"❌ {result.name}: {'; '.join(problems[result.name])}")
         else:
-            print(f"❌ {message}")
+            print(f"✅ {result.name}: {summary} ({result.duration:.2f}s)")
+    return loaded, problems
 
-    # Summary
-    print("\n" + "="*80)
-    print("SUMMARY")
-    print("="*80)
 
-    success_count = sum(1 for _, status, _ in results if status == 'success')
-    error_count = sum(1 for _, status, _ in results if status == 'error')
-    timeout_count = sum(1 for _, status, _ in results if status == 'timeout')
+def hold_write_lock(db_path: Path, held):
+    """Write to the database, then keep the load open until the orchestrator cancels it"""
+    from db_schema import use_database, writing
+    from orchestrator import check_cancelled
+
+    with use_database(db_path), writing() as conn:
+        conn.execute("CREATE TABLE cancel_probe (x)")
+        held.set()
+        deadline = time.monotonic() + CANCEL_HOLD
+        while time.monotonic() < deadline:
+            check_cancelled()
+            time.sleep(0.05)
+        conn.commit()
+
+
+def check_cancellation(dataset: str, url: str, tables: list, db_path: Path) -> list:
+    """
+    Time out a load holding the write lock and one queued behind it
+
+    Returns:
+        List of problems (empty when both time out and neither committed)
+    """
+    import threading
+
+    from db_schema import get_connection, use_database
+    from orchestrator import ScraperJob, run_jobs
+
+    held = threading.Event()
+
+    def queued():
+        held.wait()
+        return load_dataset(dataset, url, tables, db_path)
+
+    jobs = [ScraperJob('lock holder', hold_write_lock, (db_path, held)), ScraperJob(dataset, queued)]
+    problems = [f"{result.name}: {result.status}, expected a timeout"
+                for result in run_jobs(jobs, workers=2, timeout=CANCEL_TIMEOUT) if result.status != 'timeout']
+
+    with use_database(db_path):
+        conn = get_connection()
+        try:
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'cancel_probe'").fetchone():
+                problems.append("lock holder committed after its timeout")
+            problems += [f"{table} loaded after its timeout" for table in tables
+                         if table_checksum(conn, table)['rows']]
+        finally:
+            conn.close()
+    return problems
+
+
+def encoding_cases() -> dict:
+    """
+    CSV payloads whose encoding a prefix probe alone gets wrong or right
+
+    Returns:
+        {name: (content, expected last row, expected row count)}
+    """
+    ascii_rows = 'name,value\n' + ''.join(f"row{i},{i}\n" for i in range(20000))
+    return {
+        'ASCII prefix, Big5 after it': (ascii_rows.encode('ascii') + '新竹市,1\n'.encode('big5'),
+                                        ('新竹市', '1'), 20001),
+        'Big5 throughout': ('名稱,值\n新竹市,1\n'.encode('big5'), ('新竹市', '1'), 1),
+        'UTF-8 with BOM': ('\ufeff名稱,值\n新竹市,1\n'.encode('utf-8'), ('新竹市', '1'), 1),
+    }
+
+
+def check_encodings() -> list:
+    """
+    Stream each encoding case, twice so the remembered encoding is used too
+
+    Returns:
+        List of problems (empty when every case decodes)
+    """
+    from utils import iter_excel_chunks
+
+    problems = []
+    for name, (content, last_row, rows) in encoding_cases().items():
+        for attempt in ('probed', 'remembered'):
+            try:
+                chunks = list(iter_excel_chunks(content, chunk_size=5000, dataset=f"encoding test: {name}"))
+            except ValueError as e:
+                problems.append(f"{name} ({attempt}): {e}")
+                break
+            got = sum(len(chunk) for chunk in chunks)
+            if got != rows or chunks[-1].rows[-1] != last_row:
+                problems.append(f"{name} ({attempt}): {got} rows ending {chunks[-1].rows[-1]}, "
+                                f"expected {rows} ending {last_row}")
+                break
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Test all scrapers offline against the recorded fixtures')
+    parser.add_argument('--datasets', nargs='+', help='Datasets to test (default: all in the manifest)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Scrapers to run at the same time (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help=f'Per-scraper timeout in seconds (default: {DEFAULT_TIMEOUT})')
+    parser.add_argument('--update', action='store_true',
+                        help=f'Store the loaded counts and checksums as expected ({EXPECTED_PATH.name})')
+    args = parser.parse_args(argv)
+
+    manifest = load_manifest()
+    datasets = args.datasets or [*manifest, POPULATION]
+    unknown = [d for d in datasets if d not in manifest and d != POPULATION]
+    if unknown:
+        parser.error(f"unknown datasets: {', '.join(unknown)}")
+    # Datasets downloaded from the fixture server (all but population)
+    served = [d for d in datasets if d in manifest]
+
+    expected = json.loads(EXPECTED_PATH.read_text(encoding='utf-8')) if EXPECTED_PATH.exists() else {}
+    # When re-recording, only check that every table got rows
+    reference = {} if args.update else expected
+
+    # Scraper logging is noise here; failures are reported below
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        # Must be set before the scrapers import the cache modules
+        os.environ['HSINCHU_CACHE_DIR'] = str(tmp / 'cache')
+        os.environ['HSINCHU_FORCE_REFRESH'] = ''
+
+        import db_schema
+        import utils
+        from fixture_server import FixtureServer
+        from orchestrator import ScraperJob
+
+        # Schema creation prints; do it up front, one scratch database per dataset and one per later pass
+        databases = {dataset: tmp / f"{dataset}.db" for dataset in datasets}
+        shared_database = tmp / "shared.db"
+        scaled_database = tmp / "scaled.db"
+        cancel_database = tmp / "cancel.db"
+        with contextlib.redirect_stdout(io.StringIO()):
+            for path in [*databases.values(), shared_database, scaled_database, cancel_database]:
+                with db_schema.use_database(path):
+                    db_schema.create_tables()
+
+        encoding_problems = check_encodings()
+        for problem in encoding_problems:
+            print(f"❌ CSV encoding: {problem}")
+        if not encoding_problems:
+            print(f"✅ CSV encoding: {len(encoding_cases())} cases")
+
+        print(f"\nTesting {len(datasets)} scrapers with {args.workers} workers...\n")
+        start = time.perf_counter()
+
+        # Scaled copies keep their fixture's format, as in the benchmark, so XLSX is streamed at scale too
+        files = {served_name(dataset, manifest[dataset], SCALE):
+                 scale_fixture((FIXTURES_DIR / manifest[dataset]['file']).read_bytes(), SCALE,
+                               manifest[dataset]['unique_columns'])
+                 for dataset in served}
+
+        with FixtureServer(files, directory=FIXTURES_DIR) as server:
+            utils.BASE_URL = server.base_url
+
+            def jobs(database=None, scale=1):
+                """Load jobs for the datasets, each into its own database unless one is given"""
+                selected = [ScraperJob(dataset, load_dataset,
+                                       (dataset, server.url(served_name(dataset, manifest[dataset], scale)),
+                                        manifest[dataset]['tables'], database or databases[dataset]))
+                            for dataset in served]
+                if POPULATION in datasets and scale == 1:
+                    selected.append(ScraperJob(POPULATION, load_population, (database or databases[POPULATION],)))
+                return selected
+
+            loaded, problems = run_loads(jobs(), reference, not args.update, args.workers, args.timeout)
+
+            # The same loads all into one database: writers must queue for it, not fail on "database is locked".
+            # The download cache is warm from the first pass, but this database has loaded nothing yet.
+            print(f"\nLoading all {len(datasets)} datasets into one shared database...\n")
+            _, shared = run_loads(jobs(shared_database), reference, not args.update, args.workers, args.timeout)
+
+            print(f"\nLoading {len(served)} datasets scaled x{SCALE}...\n")
+            _, scaled = run_loads(jobs(scaled_database, SCALE), reference, not args.update, args.workers,
+                                  args.timeout, scale=SCALE)
+
+            # A timed-out job is only reported once it has stopped, and its load is rolled back
+            cancel_problems = []
+            if served:
+                dataset = served[0]
+                cancel_problems = check_cancellation(dataset, server.url(manifest[dataset]['file']),
+                                                     manifest[dataset]['tables'], cancel_database)
+                print()
+                for problem in cancel_problems:
+                    print(f"❌ Cancellation: {problem}")
+                if not cancel_problems:
+                    print(f"✅ Cancellation: {dataset} timed out behind a held write lock, nothing committed")
+
+        elapsed = time.perf_counter() - start
+
+    failed = [dataset for dataset in datasets
+              if problems.get(dataset, ['not run']) or shared.get(dataset, ['not run'])
+              or (dataset in served and scaled.get(dataset, ['not run']))]
+
+    print("\n" + "=" * 80)
+    print("SUMMARY")
+    print("=" * 80)
+    print(f"✅ Passed: {len(datasets) - len(failed)}/{len(datasets)}")
+    print(f"❌ Failed: {len(failed)}/{len(datasets)}")
+    print(f"Total time: {elapsed:.1f}s")
 
-    print(f"✅ Success: {success_count}/{len(results)}")
-    print(f"❌ Errors: {error_count}/{len(results)}")
-    print(f"⏱️  Timeouts: {timeout_count}/{len(results)}")
+    if args.update:
+        expected.update(loaded)
+        EXPECTED_PATH.write_text(json.dumps(expected, ensure_ascii=False, indent=2, sort_keys=True) + '\n',
+                                 encoding='utf-8')
+        print(f"Expected values for {len(loaded)} datasets written to {EXPECTED_PATH}")
 
-    if error_count > 0:
-        print("\nFailed scrapers:")
-        for name, status, message in results:
-            if status == 'error':
-                print(f"  - {name}: {message}")
+    return 1 if failed or encoding_problems or cancel_problems else 0
 
-    return 0 if error_count == 0 else 1
 
 if __name__ == "__main__":
     sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+Encoding detection for CSV sources
+Probes a bounded prefix instead of decoding whole files repeatedly, and
+remembers which encoding worked for each dataset so later runs decode once
+"""
+
+import codecs
+import io
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Common Chinese/Taiwan encodings, strictest first
+CANDIDATE_ENCODINGS = ['utf-8-sig', 'utf-8', 'big5', 'cp950', 'gb2312', 'gbk', 'latin-1']
+
+# Bytes probed when no encoding is remembered for a dataset
+PROBE_BYTES = 64 * 1024
+
+# Per-dataset memory of the encoding that last decoded a whole file
+MEMORY_PATH = Path(os.environ.get('HSINCHU_CACHE_DIR') or Path(__file__).parent.parent / ".cache") / "encodings.json"
+
+
+def probe_encoding(head: bytes, preferred: Optional[str] = None) -> Optional[str]:
+    """
+    Pick the first encoding that decodes a sample cleanly
+
+    Args:
+        head: Leading bytes of the file (a truncated trailing character is fine)
+        preferred: Encoding to try before the candidate list
+
+    Returns:
+        Encoding name, or None if nothing fits
+    """
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+
+    candidates = CANDIDATE_ENCODINGS
+    if preferred:
+        candidates = [preferred] + [e for e in CANDIDATE_ENCODINGS if e != preferred]
+
+    for encoding in candidates:
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(head, final=False)
+            return encoding
+        except (UnicodeDecodeError, LookupError):
+            continue
+    return None
+
+
+class EncodingMemory:
+    """JSON-backed {dataset: encoding} map, safe to share between threads"""
+
+    def __init__(self, path: Path = MEMORY_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._data = None
+
+    def _load(self) -> dict:
+        if self._data is None:
+            try:
+                self._data = json.loads(self.path.read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(self._data, indent=2, sort_keys=True), encoding='utf-8')
+        tmp.replace(self.path)
+
+    def get(self, dataset: str) -> Optional[str]:
+        with self._lock:
+            return self._load().get(dataset)
+
+    def remember(self, dataset: str, encoding: str):
+        with self._lock:
+            if self._load().get(dataset) != encoding:
+                self._data[dataset] = encoding
+                self._save()
+
+    def forget(self, dataset: str):
+        with self._lock:
+            if self._load().pop(dataset, None) is not None:
+                self._save()
+
+
+_memory = None
+_memory_lock = threading.Lock()
+
+
+def get_memory() -> EncodingMemory:
+    """Return the process-wide encoding memory"""
+    global _memory
+    with _memory_lock:
+        if _memory is None:
+            _memory = EncodingMemory()
+        return _memory
+
+
+def detect_encoding(head: bytes, dataset: Optional[str] = None) -> Optional[str]:
+    """
+    Encoding for a file, using the dataset's remembered encoding when known
+
+    A remembered encoding is trusted without probing, so the file is decoded
+    exactly once (by the parser). It is confirmed or forgotten by the caller
+    via confirm_encoding() / reject_encoding() once the full decode is done.
+    """
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if dataset:
+        remembered = get_memory().get(dataset)
+        if remembered:
+            return remembered
+    return probe_encoding(head)
+
+
+def confirm_encoding(dataset: Optional[str], encoding: str):
+    """Record that an encoding decoded a dataset's whole file"""
+    if dataset:
+        get_memory().remember(dataset, encoding)
+
+
+def reject_encoding(dataset: Optional[str]):
+    """Drop a remembered encoding that failed part-way through a file"""
+    if dataset:
+        get_memory().forget(dataset)
+
+
+def fallback_encoding(binary, tried) -> Optional[str]:
+    """
+    First candidate encoding, other than those tried, that decodes a whole file
+
+    For files whose probed prefix fit an encoding the rest does not. Each
+    candidate is checked block by block, so the file is never held decoded.
+
+    Args:
+        binary: Seekable binary file object, rewound for each candidate
+        tried: Encodings that already failed
+
+    Returns:
+        Encoding name, or None if nothing fits
+    """
+    failed = {codecs.lookup(encoding).name for encoding in tried}
+    for encoding in CANDIDATE_ENCODINGS:
+        if codecs.lookup(encoding).name in failed:
+            continue
+        binary.seek(0)
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            for block in iter(lambda: binary.read(1 << 20), b''):
+                decoder.decode(block)
+            decoder.decode(b'', final=True)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+def text_stream(binary, encoding: str) -> io.TextIOWrapper:
+    """
+    Decode a binary file on the fly for a text parser
+
+    Avoids building a full-size decoded string; a bad byte sequence beyond
+    the probed prefix raises UnicodeDecodeError from the parser's read.
+    """
+    return io.TextIOWrapper(binary, encoding=encoding, newline='')
+
+
+def transcode_to_utf8(content: bytes, encoding: str, block_size: int = 1 << 20) -> bytes:
+    """
+    Re-encode content as UTF-8 block by block
+
+    UTF-8 input is only validated and returned as is.
+
+    Raises:
+        UnicodeDecodeError / LookupError if content is not valid in encoding
+    """
+    already_utf8 = codecs.lookup(encoding).name == 'utf-8'
+    decoder = codecs.getincrementaldecoder(encoding)()
+    out = bytearray()
+
+    for start in range(0, len(content), block_size):
+        text = decoder.decode(content[start:start + block_size])
+        if not already_utf8:
+            out += text.encode('utf-8')
+    text = decoder.decode(b'', final=True)
+
+    if already_utf8:
+        return content
+    out += text.encode('utf-8')
+    return bytes(out)
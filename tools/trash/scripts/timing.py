@@ -0,0 +1,321 @@
+"""
+Per-stage timing for scraper runs
+Records wall time, CPU time, bytes and rows for each lifecycle stage of a
+dataset load and hands them to pluggable sinks as structured events
+"""
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Lifecycle stages in execution order
+STAGES = ('resolve', 'download', 'parse', 'map', 'convert', 'insert', 'commit')
+
+# Sink spec read when no sink was added explicitly: 'stdout' or 'jsonl:<path>'
+ENV_VAR = 'HSINCHU_TIMINGS'
+
+
+@dataclass
+class StageEvent:
+    """Totals for one stage of one run, or the whole run when stage == 'total'"""
+    run_id: str
+    dataset: str
+    stage: str
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    bytes: int = 0
+    rows: int = 0
+    calls: int = 0
+    status: str = 'ok'
+    started_at: str = ''
+    # Run-level facts set through annotate(), on the 'total' event only
+    attrs: dict = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class MemorySink:
+    """Keeps events in a list, e.g. for benchmarks and tests"""
+
+    def __init__(self):
+        self.events: List[StageEvent] = []
+        self._lock = threading.Lock()
+
+    def emit(self, event: StageEvent):
+        with self._lock:
+            self.events.append(event)
+
+    def for_dataset(self, dataset: str) -> Dict[str, StageEvent]:
+        """Latest event per stage for a dataset"""
+        with self._lock:
+            return {e.stage: e for e in self.events if e.dataset == dataset}
+
+    def close(self):
+        pass
+
+
+class JsonLinesSink:
+    """Appends one JSON object per event to a file"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def emit(self, event: StageEvent):
+        line = json.dumps(event.to_dict(), ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class StdoutSink:
+    """Prints a one-line summary per event"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def emit(self, event: StageEvent):
+        line = (f"⏱  {event.dataset:<24} {event.stage:<9} {event.wall_s:8.3f}s wall {event.cpu_s:8.3f}s cpu "
+                f"{event.rows:>9} rows {event.bytes:>11} bytes")
+        with self._lock:
+            print(line, file=self.stream)
+
+    def close(self):
+        pass
+
+
+_sinks = []
+_sinks_lock = threading.Lock()
+_env_checked = False
+
+
+def add_sink(sink):
+    """Register a sink for all runs in this process"""
+    with _sinks_lock:
+        _sinks.append(sink)
+    return sink
+
+
+def remove_sink(sink):
+    with _sinks_lock:
+        if sink in _sinks:
+            _sinks.remove(sink)
+    sink.close()
+
+
+def sink_from_spec(spec: str):
+    """Build a sink from 'stdout', 'memory' or 'jsonl:<path>'"""
+    if spec == 'stdout':
+        return StdoutSink()
+    if spec == 'memory':
+        return MemorySink()
+    if spec.startswith('jsonl:'):
+        return JsonLinesSink(spec[len('jsonl:'):])
+    raise ValueError(f"Unknown timing sink: {spec}")
+
+
+def _active_sinks():
+    global _env_checked
+    with _sinks_lock:
+        if not _env_checked:
+            _env_checked = True
+            spec = os.environ.get(ENV_VAR)
+            if spec:
+                _sinks.extend(sink_from_spec(s.strip()) for s in spec.split(',') if s.strip())
+        return list(_sinks)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (0 where unsupported)"""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class RunTimer:
+    """
+    Accumulates stage totals for one dataset run
+
+    A stage may be entered many times (e.g. once per chunk); each call adds
+    to the stage's totals and finish() emits one event per stage.
+    """
+
+    def __init__(self, dataset: str):
+        self.dataset = dataset
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.stages: Dict[str, StageEvent] = {}
+        self.attrs = {}
+        self.events: List[StageEvent] = []
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+
+    def _event(self, name: str) -> StageEvent:
+        if name not in self.stages:
+            self.stages[name] = StageEvent(self.run_id, self.dataset, name,
+                                           started_at=datetime.now().isoformat(timespec='seconds'))
+        return self.stages[name]
+
+    def add(self, name: str, wall_s: float = 0.0, cpu_s: float = 0.0, bytes: int = 0, rows: int = 0):
+        event = self._event(name)
+        event.wall_s += wall_s
+        event.cpu_s += cpu_s
+        event.bytes += bytes
+        event.rows += rows
+        event.calls += 1
+
+    def annotate(self, **attrs):
+        """Attach run-level facts (e.g. row counts, content hash) to the 'total' event"""
+        self.attrs.update(attrs)
+
+    @contextmanager
+    def stage(self, name: str, bytes: int = 0, rows: int = 0):
+        """Time a block; the yielded counter's bytes/rows may be set inside it"""
+        counter = _Counter(bytes, rows)
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield counter
+        except BaseException:
+            self._event(name).status = 'error'
+            raise
+        finally:
+            self.add(name, time.perf_counter() - wall, time.thread_time() - cpu, counter.bytes, counter.rows)
+
+    def finish(self, status: str = 'ok') -> List[StageEvent]:
+        """Emit one event per stage (in lifecycle order) plus a 'total' event"""
+        order = {name: i for i, name in enumerate(STAGES)}
+        events = sorted(self.stages.values(), key=lambda e: order.get(e.stage, len(STAGES)))
+        total = StageEvent(self.run_id, self.dataset, 'total',
+                           wall_s=time.perf_counter() - self._wall, cpu_s=time.thread_time() - self._cpu,
+                           bytes=self.stages['download'].bytes if 'download' in self.stages else 0,
+                           rows=self.stages['parse'].rows if 'parse' in self.stages else 0,
+                           status=status, started_at=self.started_at,
+                           attrs=dict(self.attrs, peak_rss_mb=round(peak_rss_mb(), 1)))
+        events.append(total)
+        self.events = events
+
+        for sink in _active_sinks():
+            for event in events:
+                sink.emit(event)
+        return events
+
+
+@dataclass
+class _Counter:
+    bytes: int = 0
+    rows: int = 0
+
+
+class _NullTimer:
+    """Stand-in when no run is active; stages cost nothing"""
+    dataset = None
+
+    def add(self, *args, **kwargs):
+        pass
+
+    def annotate(self, **attrs):
+        pass
+
+    @contextmanager
+    def stage(self, name: str, bytes: int = 0, rows: int = 0):
+        yield _Counter(bytes, rows)
+
+
+_NULL = _NullTimer()
+_current: ContextVar = ContextVar('timing_run', default=_NULL)
+
+
+def current():
+    """The timer of the run active in this thread, or a no-op timer"""
+    return _current.get()
+
+
+def stage(name: str, bytes: int = 0, rows: int = 0):
+    """Time a block as a stage of the active run (no-op outside a run)"""
+    return current().stage(name, bytes=bytes, rows=rows)
+
+
+def annotate(**attrs):
+    """Attach run-level facts to the active run (no-op outside a run)"""
+    current().annotate(**attrs)
+
+
+@contextmanager
+def run(dataset: str) -> Iterator[RunTimer]:
+    """
+    Make a dataset run active for this thread and emit its events on exit
+
+    A run started while another is active joins it, so a caller such as
+    run_all can own the run of a scraper that opens its own.
+
+    Usage:
+        with timing.run('parks'):
+            with timing.stage('download') as s:
+                s.bytes = len(content)
+    """
+    active = current()
+    if isinstance(active, RunTimer):
+        yield active
+        return
+
+    timer = RunTimer(dataset)
+    token = _current.set(timer)
+    status = 'ok'
+    try:
+        yield timer
+    except BaseException:
+        status = 'error'
+        raise
+    finally:
+        _current.reset(token)
+        timer.finish(status)
+
+
+def timed_run(dataset: str):
+    """Decorator form of run() for a scraper entry point"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with run(dataset):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_chunks(chunks: Iterable, name: str = 'parse') -> Iterator:
+    """Yield from an iterator of DataFrame chunks, timing each next() as a stage"""
+    iterator = iter(chunks)
+    while True:
+        with stage(name) as counter:
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+            counter.rows = len(chunk)
+        yield chunk
@@ -1,18 +1,111 @@
 """
 Universal scraper template for Hsinchu Open Data (XLSX format)
-Handles flexible column mapping and data insertion
+Handles flexible column mapping and batched data insertion
 """
 
-import pandas as pd
 import logging
-from io import BytesIO
-from utils import get_connection, clean_text, safe_int, safe_float, log_progress
+import timing
+from column_resolver import resolve_columns
+from db_schema import NATURAL_KEYS, writing
+from orchestrator import check_cancelled
+from staging import LoadValidationError, StagingTable, table_is_empty
+from table_sync import TableSync
+from utils import (
+    clean_text, safe_int, safe_float, log_progress,
+    download_dataset, mark_dataset_loaded, iter_excel_chunks, force_refresh
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Rows per executemany() call
+BATCH_SIZE = 5000
 
-def scrape_data(url, table_name, column_mapping, required_columns=None):
+
+def convert_column(values, converter, bad_rows):
+    """
+    Apply a converter to a whole column
+
+    Args:
+        values: Raw column values
+        converter: Conversion function, or None to keep raw values
+        bad_rows: Dict collecting {row position: exception} for failed conversions
+
+    Returns:
+        List of converted values (None where conversion failed)
+    """
+    if converter is None:
+        return values
+
+    try:
+        return [converter(v) for v in values]
+    except Exception:
+        pass
+
+    # Slow path: find the offending cells
+    result = []
+    for i, value in enumerate(values):
+        try:
+            result.append(converter(value))
+        except Exception as e:
+            bad_rows.setdefault(i, e)
+            result.append(None)
+    return result
+
+
+def prepare_rows(chunk, plan, required_columns=None, transform=None):
+    """
+    Convert one chunk of source rows into insert-ready row tuples
+
+    Rows with a failed conversion count as processed errors; rows missing a
+    required column are skipped without being counted. transform, if given,
+    gets the converted columns as transform(names, columns) and returns them
+    with derived values filled in.
+
+    Returns:
+        Tuple of (rows, row_ids, processed, errors)
+    """
+    columns = plan.columns
+    row_count = len(chunk)
+    index = chunk.index
+
+    # Convert whole columns at once
+    bad_rows = {}
+    converted = []
+    for _, _, pos, converter in plan.fields:
+        if pos is None:
+            converted.append([None] * row_count)
+        else:
+            converted.append(convert_column(chunk.column(pos), converter, bad_rows))
+    if transform:
+        converted = transform(columns, converted)
+
+    required_idx = [columns.index(c) for c in (required_columns or []) if c in columns]
+    missing_required = bool(required_columns) and len(required_idx) < len(set(required_columns))
+
+    rows = []
+    row_ids = []
+    processed = 0
+    errors = 0
+
+    for i, row in enumerate(zip(*converted)):
+        idx = index[i]
+        if i in bad_rows:
+            logger.error(f"Error processing row {idx}: {bad_rows[i]}")
+            errors += 1
+            processed += 1
+            continue
+        if missing_required or any(not row[j] for j in required_idx):
+            continue
+        rows.append(row)
+        row_ids.append(idx)
+        processed += 1
+
+    return rows, row_ids, processed, errors
+
+
+def scrape_data(url, table_name, column_mapping, required_columns=None, dataset=None, exact=False,
+                transform=None, after_load=None):
     """
     Universal scraper function
 
@@ -25,91 +118,119 @@ def scrape_data(url, table_name, column_mapping, required_columns=None):
                 '公園名稱': ('park_name', clean_text),
                 '面積公頃': ('area_hectares', safe_float)
             }
+            A source may also be a tuple of alternative names, and the whole
+            mapping may instead be a list of (db_col, predicate, converter)
+            rules (see column_resolver.resolve_rules)
         required_columns: List of DB columns that must have values
+        dataset: Download cache key (defaults to table_name)
+        exact: Only match source columns by exact name (no substring fallback)
+        transform: Called per chunk on the converted columns (see prepare_rows)
+        after_load: Called as after_load(conn, replaced) before the commit, to
+            update anything derived from the table in the same transaction
+
+    Rows are upserted by the table's natural key (db_schema.NATURAL_KEYS):
+    unchanged rows are left alone and rows missing from the source are
+    deleted, so reruns are idempotent. Forced reloads and loads into an empty
+    table instead fill a staging table that is swapped in when complete.
+    Either way the load is one transaction, so readers never see partial
+    data and a failed load leaves the previous version in place.
+
+    Each run is timed stage by stage (see timing.py).
 
     Returns:
-        Tuple of (processed, inserted, errors)
+        Tuple of (processed, written, errors); written counts inserted and updated rows
     """
-    from utils import download_file
+    with timing.run(dataset or table_name):
+        return _scrape(url, table_name, column_mapping, required_columns, dataset, exact, transform, after_load)
 
+
+def _scrape(url, table_name, column_mapping, required_columns, dataset, exact, transform, after_load):
+    """Body of scrape_data, run inside its timing context"""
     logger.info(f"Starting {table_name} data scraping...")
 
-    # Download file
-    content = download_file(url)
-    if not content:
+    # Download file (skipped when unchanged since the last successful load)
+    download = download_dataset(dataset or table_name, url, table=table_name)
+    if not download:
         logger.error(f"Failed to download {table_name} data")
         return (0, 0, 1)
+    if not download.changed:
+        logger.info(f"{table_name} data unchanged since last load, skipping")
+        return (0, 0, 0)
 
-    try:
-        # Parse XLSX
-        df = pd.read_excel(BytesIO(content), engine='openpyxl')
-
-        logger.info(f"Downloaded {len(df)} {table_name} records")
-        logger.info(f"Available columns: {df.columns.tolist()}")
-
-        # Connect to database
-        conn = get_connection()
-        cursor = conn.cursor()
-
-        records_processed = 0
-        records_inserted = 0
-        errors = 0
-
-        for idx, row in df.iterrows():
-            try:
-                # Build data dict
-                data = {}
-
-                # Map columns
-                for source_col, (db_col, converter) in column_mapping.items():
-                    if source_col in df.columns:
-                        raw_value = row[source_col]
-                        data[db_col] = converter(raw_value) if converter else raw_value
-                    else:
-                        # Try flexible matching (contains, case-insensitive)
-                        matched = False
-                        for col in df.columns:
-                            if source_col.lower() in str(col).lower():
-                                raw_value = row[col]
-                                data[db_col] = converter(raw_value) if converter else raw_value
-                                matched = True
-                                break
-                        if not matched:
-                            data[db_col] = None
-
-                # Check required columns
-                if required_columns:
-                    skip = False
-                    for req_col in required_columns:
-                        if not data.get(req_col):
-                            skip = True
-                            break
-                    if skip:
-                        continue
-
-                # Build INSERT statement
-                columns = list(data.keys())
-                placeholders = ', '.join(['?' for _ in columns])
-                sql = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})"
-
-                cursor.execute(sql, tuple(data.values()))
-                records_inserted += 1
-
-            except Exception as e:
-                logger.error(f"Error processing row {idx}: {e}")
-                errors += 1
-
-            records_processed += 1
-
-        conn.commit()
-        conn.close()
-
-        log_progress(table_name, records_processed, records_inserted, errors)
-        return (records_processed, records_inserted, errors)
-
-    except Exception as e:
-        logger.error(f"Error parsing {table_name} data: {e}")
-        raise
+    # Bulk-load profile; the whole dataset goes in as one transaction, one writer at a time
+    with writing() as conn:
+        try:
+            # Full reloads go through a staging table; otherwise only changed rows are written in place
+            staging = None
+            if force_refresh() or table_is_empty(conn, table_name):
+                staging = StagingTable(conn, table_name)
+
+            plan = None
+            sync = None
+            total_rows = 0
+            records_processed = 0
+            records_written = 0
+            errors = 0
+
+            # Parse and insert chunk by chunk so memory stays bounded
+            for chunk in timing.timed_chunks(iter_excel_chunks(download.path, dataset=download.dataset)):
+                check_cancelled()
+                if plan is None:
+                    logger.info(f"Available columns: {chunk.columns}")
+
+                    # Resolve the source column for each DB column once per file
+                    with timing.stage('map'):
+                        plan = resolve_columns(chunk.columns, column_mapping, exact=exact)
+                    plan.log(table_name)
+
+                    # Upsert by natural key; only new or changed rows are written
+                    with timing.stage('insert'):
+                        target = table_name
+                        if staging:
+                            staging.create()
+                            target = staging.name
+                        sync = TableSync(conn, target, plan.columns, key_columns=NATURAL_KEYS[table_name])
+
+                total_rows += len(chunk)
+                with timing.stage('convert') as counter:
+                    rows, row_ids, processed, failed = prepare_rows(chunk, plan, required_columns, transform)
+                    counter.rows = len(rows)
+                records_processed += processed
+                errors += failed
+
+                with timing.stage('insert', rows=len(rows)):
+                    for start in range(0, len(rows), BATCH_SIZE):
+                        written, failed = sync.apply(rows[start:start + BATCH_SIZE], row_ids[start:start + BATCH_SIZE])
+                        records_written += written
+                        errors += failed
+
+            # Never replace or prune a table from a file that yielded nothing
+            if not records_processed:
+                raise LoadValidationError(f"{table_name}: no usable rows in source file")
+
+            with timing.stage('insert'):
+                # Rows gone from the source; kept if any row failed, since it may be one of them
+                logger.info(f"{table_name}: {sync.finish(delete_missing=errors == 0)}")
+
+                if staging:
+                    staging.validate()
+                    staging.swap()
+
+                if after_load:
+                    after_load(conn, staging is not None)
+
+            with timing.stage('commit'):
+                mark_dataset_loaded(conn, download)
+                check_cancelled()
+                conn.commit()
+
+            logger.info(f"Parsed {total_rows} {table_name} records")
+            log_progress(table_name, records_processed, records_written, errors)
+            return (records_processed, records_written, errors)
+
+        except Exception as e:
+            logger.error(f"Error parsing {table_name} data: {e}")
+            raise
 
 
 # Example usage for different data sources
@@ -133,7 +254,8 @@ if __name__ == "__main__":
         urls['youbike'],
         'youbike_stations',
         youbike_mapping,
-        required_columns=['station_name']
+        required_columns=['station_name'],
+        dataset='youbike'
     )
 
     # Example 2: Special Foods
@@ -2,34 +2,55 @@
 Utility functions for data scraping scripts
 """
 
-import requests
+import os
 import sqlite3
+from itertools import islice
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
 import logging
 
+import timing
+from db_schema import DATASET_LOADS_SCHEMA, DB_TIMEOUT, apply_bulk_load_pragmas, database_path, reading, writing
+from http_client import get_client
+from staging import StagingTable, table_is_empty
+from download_cache import Download, get_cache
+from text_encoding import (
+    CANDIDATE_ENCODINGS, PROBE_BYTES, detect_encoding, confirm_encoding,
+    fallback_encoding, reject_encoding, text_stream, transcode_to_utf8
+)
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
-# Database path
-DB_PATH = Path(__file__).parent.parent / "hsinchu_data.db"
-
 # Base URL for Hsinchu Open Data
 BASE_URL = "https://opendata.hccg.gov.tw"
 
 
-def get_connection():
-    """Get database connection"""
-    return sqlite3.connect(DB_PATH)
+def get_connection(profile: str = 'read'):
+    """
+    Get database connection
+
+    Args:
+        profile: 'read' keeps SQLite defaults; 'bulk' applies the ETL load
+            profile (WAL, relaxed synchronous, larger cache, mmap, memory temp
+            store, see db_schema.BULK_LOAD_PRAGMAS)
+    """
+    conn = sqlite3.connect(database_path(), timeout=DB_TIMEOUT)
+    if profile == 'bulk':
+        apply_bulk_load_pragmas(conn)
+    return conn
 
 
 def download_file(url: str, timeout: int = 30, encoding: str = None) -> Optional[bytes]:
     """
     Download file from URL
 
+    Goes through the shared pooled client (see http_client.py), so repeated
+    downloads from the portal reuse keep-alive connections.
+
     Args:
         url: URL to download from
         timeout: Request timeout in seconds
@@ -38,53 +59,119 @@ def download_file(url: str, timeout: int = 30, encoding: str = None) -> Optional
     Returns:
         File content as bytes, or None if failed
     """
-    try:
-        # Construct full URL if relative
-        if url.startswith('/'):
-            url = BASE_URL + url
+    # Construct full URL if relative
+    if url.startswith('/'):
+        url = BASE_URL + url
 
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-        }
+    content = get_client().fetch(url, timeout=timeout)
+    if content is None:
+        return None
 
-        response = requests.get(url, headers=headers, timeout=timeout)
-        response.raise_for_status()
+    # If specific encoding requested, transcode to UTF-8 block by block
+    if encoding:
+        try:
+            return transcode_to_utf8(content, encoding)
+        except (UnicodeDecodeError, LookupError):
+            logging.warning(f"Failed to decode with {encoding}, returning raw bytes")
+            return content
 
-        # If specific encoding requested, decode and re-encode
-        if encoding:
-            try:
-                text = response.content.decode(encoding)
-                return text.encode('utf-8')
-            except (UnicodeDecodeError, LookupError):
-                logging.warning(f"Failed to decode with {encoding}, returning raw bytes")
-                return response.content
+    return content
+
+
+def download_files(urls, max_workers: int = None) -> dict:
+    """
+    Download several files concurrently through the shared client
+
+    Args:
+        urls: URLs to download (relative URLs are resolved against BASE_URL)
+        max_workers: Optional thread count
+
+    Returns:
+        Dict mapping each URL as given to its content, or None if it failed
+    """
+    full_urls = {url: BASE_URL + url if url.startswith('/') else url for url in urls}
+    bodies = get_client().fetch_many(full_urls.values(), max_workers=max_workers)
+    return {url: bodies[full] for url, full in full_urls.items()}
 
-        return response.content
 
-    except requests.RequestException as e:
-        logging.error(f"Failed to download from {url}: {e}")
+def force_refresh() -> bool:
+    """True when unchanged datasets should be reloaded anyway (HSINCHU_FORCE_REFRESH=1)"""
+    return os.environ.get('HSINCHU_FORCE_REFRESH', '').lower() in ('1', 'true', 'yes')
+
+
+def loaded_version(conn, dataset: str) -> Optional[str]:
+    """SHA-256 of the dataset version last loaded into the database, None if never (see mark_dataset_loaded())"""
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'dataset_loads'").fetchone():
         return None
+    row = conn.execute("SELECT sha256 FROM dataset_loads WHERE dataset = ?", (dataset,)).fetchone()
+    return row[0] if row else None
 
 
-def try_decode_csv(content: bytes) -> Optional[str]:
+def download_dataset(dataset: str, url: str, timeout: int = 30, table: str = None) -> Optional[Download]:
+    """
+    Download a dataset through the content-addressed cache
+
+    Sends If-None-Match / If-Modified-Since for files seen before. The returned
+    Download has changed=False when the content hash matches the version last
+    loaded into the current database and its table has rows, so the caller
+    can skip parsing and inserting.
+
+    Args:
+        dataset: Dataset name (cache key, e.g. 'parks')
+        url: URL to download from
+        timeout: Request timeout in seconds
+        table: Table the dataset loads into; an empty one is always reloaded
+
+    Returns:
+        Download, or None if failed
+    """
+    if url.startswith('/'):
+        url = BASE_URL + url
+
+    with reading() as conn:
+        loaded = loaded_version(conn, dataset)
+        empty = table is not None and table_is_empty(conn, table)
+
+    download = get_cache().fetch(dataset, url, timeout=timeout, loaded=loaded, force=force_refresh() or empty)
+    if download:
+        timing.annotate(content_hash=download.sha256, content_changed=download.changed,
+                        cache_hit=download.not_modified)
+    return download
+
+
+def mark_dataset_loaded(conn, download: Download):
+    """Record the loaded version in the load's own transaction, so it commits (or rolls back) with the data"""
+    conn.execute(DATASET_LOADS_SCHEMA)
+    conn.execute("INSERT OR REPLACE INTO dataset_loads (dataset, sha256, loaded_at) VALUES (?, ?, CURRENT_TIMESTAMP)",
+                 (download.dataset, download.sha256))
+
+
+def try_decode_csv(content: bytes, dataset: str = None) -> Optional[str]:
     """
     Try to decode CSV content with multiple encodings
 
+    The encoding is chosen from a bounded prefix (or the dataset's remembered
+    encoding), so the full payload is normally decoded once.
+
     Args:
         content: Raw bytes content
+        dataset: Optional dataset name whose winning encoding is remembered
 
     Returns:
         Decoded text or None if all attempts fail
     """
-    # Try common Chinese/Taiwan encodings in order
-    encodings = ['utf-8-sig', 'utf-8', 'big5', 'cp950', 'gb2312', 'gbk', 'latin-1']
+    first = detect_encoding(content[:PROBE_BYTES], dataset)
+    encodings = [first] + [e for e in CANDIDATE_ENCODINGS if e != first] if first else CANDIDATE_ENCODINGS
 
     for encoding in encodings:
         try:
             text = content.decode(encoding)
             logging.debug(f"Successfully decoded with {encoding}")
+            confirm_encoding(dataset, encoding)
             return text
         except (UnicodeDecodeError, LookupError):
+            if encoding == first:
+                reject_encoding(dataset)
             continue
 
     logging.error("Failed to decode content with any known encoding")
@@ -139,7 +226,13 @@ def read_excel_file(content: bytes):
         # XLS format (OLE2/CFBF)
         return pd.read_excel(BytesIO(content), engine='xlrd')
     elif content[:3] == b'\xef\xbb\xbf' or b',' in content[:1000]:
-        # CSV format (with or without UTF-8 BOM)
+        # CSV format (with or without UTF-8 BOM), decoded on the fly
+        encoding = detect_encoding(content[:PROBE_BYTES])
+        if encoding:
+            try:
+                return pd.read_csv(text_stream(BytesIO(content), encoding), on_bad_lines='skip')
+            except UnicodeDecodeError:
+                pass
         text = try_decode_csv(content)
         if text:
             return pd.read_csv(StringIO(text), on_bad_lines='skip')
@@ -161,17 +254,358 @@ def read_excel_file(content: bytes):
                     raise ValueError("Unknown file format")
 
 
+# Rows per chunk yielded by iter_excel_chunks()
+CHUNK_ROWS = 10000
+
+
+def _read_head(source, size: int) -> bytes:
+    """First bytes of a file given as bytes or a path"""
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source[:size])
+    with open(source, 'rb') as f:
+        return f.read(size)
+
+
+def _open_binary(source):
+    """Binary file object over bytes or a path"""
+    from io import BytesIO
+
+    if isinstance(source, (bytes, bytearray)):
+        return BytesIO(source)
+    return open(source, 'rb')
+
+
+def _header_names(row) -> list:
+    """Header row -> unique column names, following pandas' naming of blanks and duplicates"""
+    names = []
+    seen = {}
+    for i, value in enumerate(row):
+        name = f"Unnamed: {i}" if value is None or value == '' else value
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+class Chunk:
+    """
+    A block of source rows under the file's header
+
+    Stands in for the pandas DataFrame the loaders used to get, with just
+    what they use, so CSV and XLSX sources load without importing pandas.
+
+    Args:
+        columns: Column names
+        rows: Row tuples, each as wide as columns
+        start: Position of the first row in the file; numbering continues across chunks
+    """
+
+    __slots__ = ('columns', 'rows', 'start')
+
+    def __init__(self, columns: list, rows: list, start: int = 0):
+        self.columns = columns
+        self.rows = rows
+        self.start = start
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def index(self) -> range:
+        """Row numbers within the file"""
+        return range(self.start, self.start + len(self.rows))
+
+    def column(self, pos: int) -> list:
+        """Values of one column, by position"""
+        return [row[pos] for row in self.rows]
+
+
+def _fit_rows(header: list, rows):
+    """Rows padded or cut to the header width"""
+    width = len(header)
+    padding = (None,) * width
+    for row in rows:
+        yield row if len(row) == width else (tuple(row) + padding)[:width]
+
+
+def _chunk_rows(header: list, rows, chunk_size: int, offset: int = 0):
+    """Group rows into Chunks of the header width, numbered from offset"""
+    batch = []
+    for row in _fit_rows(header, rows):
+        batch.append(row)
+
+        if len(batch) >= chunk_size:
+            yield Chunk(header, batch, offset)
+            offset += len(batch)
+            batch = []
+
+    if batch:
+        yield Chunk(header, batch, offset)
+
+
+def _sheet_rows(sheet):
+    """
+    Header and data rows of an openpyxl worksheet
+
+    The first non-blank row is the header; fully blank rows carry no data.
+
+    Returns:
+        (header names, row iterator), or (None, None) for a blank sheet
+    """
+    rows = sheet.iter_rows(values_only=True)
+    for row in rows:
+        if any(value is not None for value in row):
+            return _header_names(row), (row for row in rows if any(value is not None for value in row))
+    return None, None
+
+
+def _iter_xlsx_chunks(source, chunk_size: int):
+    """Stream the first worksheet with openpyxl in read-only mode"""
+    from openpyxl import load_workbook
+
+    with _open_binary(source) as f:
+        workbook = load_workbook(f, read_only=True, data_only=True)
+        try:
+            header, rows = _sheet_rows(workbook.worksheets[0])
+            if header is not None:
+                yield from _chunk_rows(header, rows, chunk_size)
+        finally:
+            workbook.close()
+
+
+def _csv_records(reader, width: int, skipped: list):
+    """
+    Data rows of a csv.reader as tuples, with empty cells as None
+
+    Blank lines are dropped. Rows with more fields than the header are
+    malformed and skipped (counted in skipped[0]), as pandas'
+    on_bad_lines='skip' did.
+    """
+    for row in reader:
+        if not any(row):
+            continue
+        if len(row) > width:
+            skipped[0] += 1
+            continue
+        yield tuple([value or None for value in row])
+
+
+def _iter_csv_chunks(source, chunk_size: int, encoding: str, dataset: Optional[str]):
+    """
+    Stream a CSV file with the stdlib csv reader, transcoding on the fly
+
+    The encoding comes from a prefix probe, so the rest of the file may not
+    fit it. On a decode error the file is re-read in the first candidate
+    encoding that decodes it whole, skipping the rows already yielded, and
+    that encoding is remembered instead.
+    """
+    import csv
+
+    header = None
+    done = 0
+    tried = [encoding]
+    while True:
+        skipped = [0]
+        with _open_binary(source) as f:
+            try:
+                reader = csv.reader(text_stream(f, encoding))
+                first = next((row for row in reader if any(row)), None)
+                if first is None:
+                    return
+                if header is None:
+                    header = _header_names(first)
+                records = islice(_csv_records(reader, len(header), skipped), done, None)
+                for chunk in _chunk_rows(header, records, chunk_size, done):
+                    done += len(chunk)
+                    yield chunk
+                break
+            except UnicodeDecodeError as e:
+                fallback = fallback_encoding(f, tried)
+                if fallback is None:
+                    reject_encoding(dataset)
+                    raise ValueError(f"CSV content is not valid {encoding} beyond the probed prefix: {e}")
+                logging.warning(f"CSV content is not valid {encoding} after row {done} ({e}); "
+                                f"reading it as {fallback}")
+                tried.append(fallback)
+                encoding = fallback
+
+    if skipped[0]:
+        logging.warning(f"Skipped {skipped[0]} CSV lines with more fields than the header")
+
+    # The whole file decoded cleanly: trust this encoding next time
+    confirm_encoding(dataset, encoding)
+    timing.annotate(encoding=encoding)
+
+
+def _iter_xls_chunks(content: bytes, chunk_size: int):
+    """XLS (or unrecognised) content through pandas, the one format still needing it"""
+    df = read_excel_file(content)
+    yield from _chunk_rows([str(name) for name in df.columns], _frame_records(df), chunk_size)
+
+
+def _frame_records(df):
+    """Row tuples of a pandas DataFrame with NaN as None, like the streaming readers"""
+    return df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+
+def iter_excel_chunks(source, chunk_size: int = CHUNK_ROWS, dataset: str = None):
+    """
+    Read a data file (XLSX, XLS or CSV) in bounded-size chunks
+
+    XLSX is streamed with openpyxl's read-only mode and CSV with the stdlib
+    csv reader, so memory stays proportional to chunk_size rather than to
+    the file, and neither imports pandas. XLS has no streaming reader and is
+    loaded whole through pandas, then sliced.
+
+    CSV cells come back as text exactly as in the file (empty cells as
+    None); the loaders' converters do all typing.
+
+    Args:
+        source: Raw bytes, or a path to the file (preferred, avoids holding the bytes)
+        chunk_size: Maximum rows per chunk
+        dataset: Optional dataset name; its CSV encoding is remembered between runs
+
+    Yields:
+        Chunks sharing one header; row numbering continues across chunks
+    """
+    head = _read_head(source, PROBE_BYTES)
+
+    if head[:4] == b'PK\x03\x04':
+        # XLSX format (ZIP-based)
+        yield from _iter_xlsx_chunks(source, chunk_size)
+        return
+
+    is_xls = head[:8] == b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+    if not is_xls and (head[:3] == b'\xef\xbb\xbf' or b',' in head[:1000]):
+        # CSV format (with or without UTF-8 BOM); decoding streams inside the parser and
+        # is timed as part of 'parse', with the encoding used reported as a run attribute
+        encoding = detect_encoding(head, dataset)
+        if not encoding:
+            raise ValueError("Failed to decode CSV content")
+        yield from _iter_csv_chunks(source, chunk_size, encoding, dataset)
+        return
+
+    # XLS or unknown: fall back to the whole-file reader
+    content = source if isinstance(source, (bytes, bytearray)) else Path(source).read_bytes()
+    yield from _iter_xls_chunks(content, chunk_size)
+
+
+# The mimetype entry an ODS file (also a ZIP) starts with, stored uncompressed
+ODS_MIMETYPE = b'application/vnd.oasis.opendocument.spreadsheet'
+
+# Parsed workbooks allowed to wait for the loader, per parser process
+WORKBOOK_BACKLOG = 2
+
+
+def read_workbook(source) -> List[Tuple[str, Chunk]]:
+    """
+    Read every sheet of a workbook (XLSX, XLS or ODS)
+
+    XLSX is read with openpyxl alone; XLS and ODS go through pandas (with
+    xlrd / odfpy), parsing the file once for all its sheets. Blank sheets
+    are left out.
+
+    Args:
+        source: Raw bytes, or a path to the file
+
+    Returns:
+        List of (sheet name, Chunk with all of the sheet's rows), in sheet order
+    """
+    head = _read_head(source, PROBE_BYTES)
+    sheets = []
+
+    if head[:4] == b'PK\x03\x04' and ODS_MIMETYPE not in head[:100]:
+        from openpyxl import load_workbook
+
+        with _open_binary(source) as f:
+            workbook = load_workbook(f, read_only=True, data_only=True)
+            try:
+                for sheet in workbook.worksheets:
+                    header, rows = _sheet_rows(sheet)
+                    if header is not None:
+                        sheets.append((sheet.title, Chunk(header, list(_fit_rows(header, rows)))))
+            finally:
+                workbook.close()
+        return sheets
+
+    import pandas as pd
+    from io import BytesIO
+
+    engine = 'odf' if ODS_MIMETYPE in head[:100] else 'xlrd'
+    data = BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+    for name, df in pd.read_excel(data, sheet_name=None, engine=engine).items():
+        if len(df.columns):
+            header = [str(col) for col in df.columns]
+            sheets.append((str(name), Chunk(header, list(_frame_records(df)))))
+    return sheets
+
+
+def read_workbooks(paths, workers: Optional[int] = None):
+    """
+    Read many workbooks in a process pool, yielding each as soon as it is parsed
+
+    Parsing spreadsheets is CPU-bound, so files are spread over processes
+    while the caller stays the single writer and loads each result as it
+    arrives. At most WORKBOOK_BACKLOG parsed files per process wait in memory.
+    Time spent waiting for a parse is recorded as the 'parse' stage.
+
+    Args:
+        paths: Workbook files
+        workers: Parser processes (default: one per CPU, never more than files)
+
+    Yields:
+        (path, sheets, error): sheets as from read_workbook(), or None and the exception
+    """
+    paths = list(paths)
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+
+    if workers <= 1:
+        for path in paths:
+            try:
+                with timing.stage('parse'):
+                    sheets = read_workbook(path)
+            except Exception as e:
+                yield path, None, e
+                continue
+            yield path, sheets, None
+        return
+
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    todo = iter(paths)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(read_workbook, path): path for path in islice(todo, workers * WORKBOOK_BACKLOG)}
+        while pending:
+            with timing.stage('parse'):
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                # Keep the pool busy while the caller loads this one
+                for next_path in islice(todo, 1):
+                    pending[pool.submit(read_workbook, next_path)] = next_path
+                try:
+                    sheets = future.result()
+                except Exception as e:
+                    yield path, None, e
+                    continue
+                yield path, sheets, None
+
+
 def log_progress(script_name: str, records_processed: int, records_inserted: int, errors: int = 0):
-    """Log script execution progress"""
+    """Log script execution progress (and record the counts on the active timing run)"""
+    timing.annotate(rows_in=records_processed, rows_out=records_inserted, rows_rejected=errors)
     logger = logging.getLogger(script_name)
     logger.info(f"✅ Completed: {records_processed} processed, {records_inserted} inserted, {errors} errors")
 
 
 def truncate_table(table_name: str):
-    """Truncate a table (delete all records)"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(f"DELETE FROM {table_name}")
-    conn.commit()
-    conn.close()
+    """Truncate a table by swapping in an empty copy (readers never see a half-deleted table)"""
+    with writing() as conn:
+        staging = StagingTable(conn, table_name)
+        staging.create()
+        staging.swap()
+        conn.commit()
     logging.info(f"Truncated table: {table_name}")